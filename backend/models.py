@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import List, Optional
+from typing import Annotated, Any, Dict, List, Literal, Optional
 from datetime import datetime
 import uuid
 
@@ -42,6 +42,11 @@ class PatternDetection(BaseModel):
     start_index: int
     center_index: int
     end_index: int
+    # Candle timestamps the fingerprint id is derived from
+    interval_ms: Optional[int] = None
+    start_timestamp: Optional[int] = None
+    center_timestamp: Optional[int] = None
+    end_timestamp: Optional[int] = None
     detected_at: datetime = Field(default_factory=datetime.utcnow)
 
 
@@ -61,7 +66,16 @@ class PatternDetectionCreate(BaseModel):
 
 class CryptoAnalysisRequest(BaseModel):
     symbol: str
-    days: int = Field(default=30, ge=7, le=365)
+    # Windows beyond CoinGecko's 365 days are served from the candle store
+    # and rejected with 400 when none is configured (CANDLE_STORE_DIR)
+    days: int = Field(default=30, ge=7, le=3650)
+    # Registered detector names (see /crypto/pattern-types); None runs the
+    # classic head-and-shoulders scan
+    pattern_types: Optional[List[str]] = None
+    # Bars are resampled locally from the cached candles and must be a whole
+    # multiple of them (so no '1w' over the 4-day candles of days > 30);
+    # None keeps the granularity CoinGecko returns for `days`
+    timeframe: Optional[Literal['4h', '1d', '1w']] = None
 
 
 class CryptoAnalysisResponse(BaseModel):
@@ -70,4 +84,87 @@ class CryptoAnalysisResponse(BaseModel):
     price_change_24h: float
     price_change_percentage_24h: float
     data: List[CryptoData]
-    patterns: List[PatternDetection]
\ No newline at end of file
+    patterns: List[PatternDetection]
+
+
+class CryptoBatchAnalysisRequest(BaseModel):
+    requests: List[CryptoAnalysisRequest] = Field(min_length=1, max_length=50)
+
+
+class CryptoBatchAnalysisResult(BaseModel):
+    symbol: str
+    days: int
+    result: Optional[CryptoAnalysisResponse] = None
+    error: Optional[str] = None
+
+
+class CryptoBatchAnalysisResponse(BaseModel):
+    results: List[CryptoBatchAnalysisResult]
+    failed: int
+
+
+class BacktestRequest(BaseModel):
+    symbols: List[str] = Field(min_length=1, max_length=20)
+    # Above 365 days only with the candle store, as for analyze
+    days: int = Field(default=365, ge=30, le=3650)
+    # Forward-return horizons, in candles after the signal
+    horizons: List[Annotated[int, Field(ge=1, le=500)]] = Field(default=[6, 30, 90], min_length=1, max_length=5)
+    # Candles per process-pool task
+    chunk_size: int = Field(default=5000, ge=500, le=200000)
+
+
+class BacktestHorizonStats(BaseModel):
+    horizon: int
+    samples: int
+    # Returns are signed by the signal direction; positive means the call was right
+    mean_return: Optional[float] = None
+    median_return: Optional[float] = None
+    hit_rate: Optional[float] = None
+
+
+class BacktestBucket(BaseModel):
+    key: str
+    count: int
+    horizons: List[BacktestHorizonStats]
+
+
+class BacktestResponse(BaseModel):
+    symbols: List[str]
+    skipped: List[str]
+    candles: int
+    signals: int
+    horizons: List[int]
+    overall: BacktestBucket
+    by_confidence: List[BacktestBucket]
+    by_strength: List[BacktestBucket]
+    by_signal: List[BacktestBucket]
+
+
+class SweepRequest(BaseModel):
+    symbols: List[str] = Field(min_length=1, max_length=20)
+    # Above 365 days only with the candle store, as for analyze
+    days: int = Field(default=365, ge=30, le=3650)
+    # DetectionConfig field -> values to try, e.g. {"min_confidence": [60, 70]};
+    # the product is also capped (services.sweep.MAX_GRID_SIZE)
+    grid: Dict[str, Annotated[List[Any], Field(min_length=1, max_length=500)]] = Field(min_length=1)
+    horizons: List[Annotated[int, Field(ge=1, le=500)]] = Field(default=[6, 30, 90], min_length=1, max_length=5)
+    # Horizon the parameter sets are ranked by; defaults to the first one
+    rank_horizon: Optional[int] = None
+    top: int = Field(default=20, ge=1, le=500)
+
+
+class SweepResult(BaseModel):
+    rank: int
+    config: Dict[str, Any]
+    signals: int
+    horizons: List[BacktestHorizonStats]
+
+
+class SweepResponse(BaseModel):
+    symbols: List[str]
+    skipped: List[str]
+    candles: int
+    evaluated: int
+    horizons: List[int]
+    rank_horizon: int
+    results: List[SweepResult]
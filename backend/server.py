@@ -1,21 +1,56 @@
-from fastapi import FastAPI, APIRouter, HTTPException
+from fastapi import FastAPI, APIRouter, Header, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
 import os
+import asyncio
 import logging
+import multiprocessing
 from pathlib import Path
-from typing import List
+from typing import List, Optional
+import orjson
+import time
 import uuid
+from dataclasses import dataclass
 from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
 
 # Import models and services
 from models import (
     StatusCheck, StatusCheckCreate, CryptoData, PatternDetection, 
-    PatternDetectionCreate, CryptoAnalysisRequest, CryptoAnalysisResponse
+    PatternDetectionCreate, CryptoAnalysisRequest, CryptoAnalysisResponse,
+    CryptoBatchAnalysisRequest, CryptoBatchAnalysisResult, CryptoBatchAnalysisResponse,
+    BacktestRequest, BacktestResponse, SweepRequest, SweepResponse
 )
-from services.crypto_service import CoinGeckoService
-from services.pattern_service import PatternDetectionService
+from services.async_crypto_service import AsyncCoinGeckoService
+from services.backtest import backtest_chunk, plan_chunks, summarize
+from services.cache_service import CachedMarketDataService
+from services.candle_store import CandleStore
+from services.resample import TimeframeError
+from services.compact import (
+    COLUMNAR_MEDIA_TYPE, MSGPACK_MEDIA_TYPES, UnsupportedFormat,
+    columnar_payload, encode_columnar, encode_msgpack, negotiate_format
+)
+from services.metrics import (
+    PROMETHEUS_CONTENT_TYPE, REGISTRY, mongo_operation, server_timing_header, stage, start_request_timings
+)
+from services.ohlcv import OHLCVSeries
+from services.scheduler import AnalysisScheduler, LatestAnalysisStore
+from services.sweep import merge_outputs, parameter_grid, plan_sweep, rank_configs, sweep_group
+from services.live_feed import LiveFeed, format_sse, parse_symbols
+from services.jobs import AnalysisJobQueue, JobFailed, JobQueueFull
+from services.persistence import PersistenceWriter, pattern_identity
+from services.response_cache import CachedResponse, ResponseCache
+from services.retention import DAY_SECONDS, StorageCompactor
+from services.shared_cache import SharedCache, series_digest
+from services.warmup import WarmUp
+from services.indexes import ensure_indexes
+from services.pagination import InvalidCursor, paginate
+from pymongo import ASCENDING, DESCENDING
+from services.rate_limit import TokenBucket
+from services.pattern_service import PatternDetectionService, detect_patterns_in_worker
+from services.pattern_detectors import PATTERN_DETECTORS, get_detectors
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
@@ -26,8 +61,96 @@ client = AsyncIOMotorClient(mongo_url)
 db = client[os.environ['DB_NAME']]
 
 # Initialize services
-crypto_service = CoinGeckoService()
+# One token bucket in front of every upstream call made by this worker
+coingecko_rate_limiter = TokenBucket.per_minute(
+    float(os.environ.get('COINGECKO_CALLS_PER_MINUTE', '30')),
+    int(os.environ.get('COINGECKO_BURST', '10'))
+)
+crypto_service = AsyncCoinGeckoService(
+    base_url=os.environ.get('COINGECKO_BASE_URL'),
+    timeout=float(os.environ.get('COINGECKO_TIMEOUT', '10')),
+    rate_limiter=coingecko_rate_limiter
+)
+# Memory-mapped candle history on local disk; disabled unless a directory is set.
+# Only the store keeps history beyond upstream's longest window, so without
+# it requests for more than UPSTREAM_MAX_DAYS are rejected
+candle_store = CandleStore(os.environ['CANDLE_STORE_DIR']) if os.environ.get('CANDLE_STORE_DIR') else None
+UPSTREAM_MAX_DAYS = 365
+# Series and detection results shared by the uvicorn workers of this host,
+# e.g. under /dev/shm; disabled unless a directory is set
+shared_cache = SharedCache(
+    os.environ['SHARED_CACHE_DIR'],
+    max_age=float(os.environ.get('SHARED_CACHE_MAX_AGE', '3600'))
+) if os.environ.get('SHARED_CACHE_DIR') else None
+async def persist_fetched_candles(series: OHLCVSeries):
+    """Queue candles fresh from upstream for crypto_data; cache hits write nothing"""
+    await persistence_writer.enqueue_candles(series)
+
+market_data = CachedMarketDataService(
+    crypto_service,
+    db.crypto_data,
+    ttl=float(os.environ.get('OHLCV_CACHE_TTL', '60')),
+    max_bytes=int(os.environ.get('OHLCV_CACHE_MAX_MB', '64')) * 1024 * 1024,
+    candle_store=candle_store,
+    shared_cache=shared_cache,
+    on_fetched=persist_fetched_candles
+)
+# Windows preloaded for every supported coin at startup; empty disables warm-up
+WARMUP_DAYS = [int(days) for days in os.environ.get('WARMUP_DAYS', '').split(',') if days]
+warm_up = WarmUp(
+    market_data,
+    concurrency=int(os.environ.get('WARMUP_CONCURRENCY', '4')),
+    timeout=float(os.environ.get('WARMUP_TIMEOUT', '120'))
+)
+warm_up_task: Optional[asyncio.Task] = None
 pattern_service = PatternDetectionService()
+# Materialized latest results; while the scheduler keeps them fresh, entries
+# younger than ANALYSIS_MAX_AGE seconds answer /crypto/analyze directly
+# (0 disables the store for on-demand requests)
+latest_analysis = LatestAnalysisStore(db.latest_analysis)
+ANALYSIS_MAX_AGE = float(os.environ.get('ANALYSIS_MAX_AGE', '300'))
+
+# One poller per streamed symbol, shared by every subscribed client
+live_feed = LiveFeed(
+    market_data,
+    days=int(os.environ.get('LIVE_DAYS', '30')),
+    interval=float(os.environ.get('LIVE_POLL_INTERVAL', '30')),
+    max_queue=int(os.environ.get('LIVE_QUEUE_SIZE', '100'))
+)
+LIVE_MAX_SYMBOLS = int(os.environ.get('LIVE_MAX_SYMBOLS', '20'))
+LIVE_HEARTBEAT_SECONDS = float(os.environ.get('LIVE_HEARTBEAT_SECONDS', '15'))
+
+# Stage timings in a Server-Timing header on every response
+SERVER_TIMING_HEADERS = os.environ.get('SERVER_TIMING_HEADERS', 'false').lower() == 'true'
+
+# Process pool for CPU-bound batch detection, created at startup
+detection_pool: Optional[ProcessPoolExecutor] = None
+# Serialized read responses with ETag/Last-Modified; pattern writes and
+# deletes invalidate a symbol's entries, the TTL bounds staleness from
+# writes made by other workers
+response_cache = ResponseCache(
+    max_entries=int(os.environ.get('RESPONSE_CACHE_ENTRIES', '1024')),
+    ttl=float(os.environ.get('RESPONSE_CACHE_TTL', '30'))
+)
+
+def invalidate_patterns(symbols):
+    for symbol in symbols:
+        response_cache.invalidate(f"patterns:{symbol.upper()}")
+
+persistence_writer = PersistenceWriter(
+    db,
+    max_queue=int(os.environ.get('PERSISTENCE_QUEUE_SIZE', '1000')),
+    on_patterns_written=invalidate_patterns
+)
+# Retention in days; 0 keeps documents forever
+PATTERN_RETENTION_SECONDS = float(os.environ.get('PATTERN_RETENTION_DAYS', '30')) * DAY_SECONDS
+CANDLE_RETENTION_SECONDS = float(os.environ.get('CANDLE_RETENTION_DAYS', '400')) * DAY_SECONDS
+storage_compactor = StorageCompactor(
+    db,
+    pattern_retention=PATTERN_RETENTION_SECONDS,
+    candle_retention=CANDLE_RETENTION_SECONDS,
+    interval=float(os.environ.get('COMPACTION_INTERVAL_SECONDS', '3600'))
+)
 
 # Create the main app without a prefix
 app = FastAPI()
@@ -42,6 +165,25 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+def cached_response(entry: CachedResponse, request: Request) -> Response:
+    """Cached body with its validators, or 304 when the client's copy is current"""
+    headers = {**entry.headers, **entry.validators()}
+    if response_cache.is_current(entry, request.headers):
+        return Response(status_code=304, headers=headers)
+    return Response(content=entry.body, media_type=entry.media_type, headers=headers)
+
+def page_response(documents: List[dict], next_cursor: Optional[str]) -> Response:
+    """
+    Serialize projected documents as-is (no model re-validation); the cursor
+    for the next page travels in the X-Next-Cursor header
+    """
+    headers = {"X-Next-Cursor": next_cursor} if next_cursor else {}
+    return Response(
+        content=orjson.dumps(documents),
+        media_type="application/json",
+        headers=headers
+    )
+
 # Existing endpoints
 @api_router.get("/")
 async def root():
@@ -51,79 +193,237 @@ async def root():
 async def create_status_check(input: StatusCheckCreate):
     status_dict = input.dict()
     status_obj = StatusCheck(**status_dict)
-    _ = await db.status_checks.insert_one(status_obj.dict())
+    with mongo_operation('status_checks', 'insert_one'):
+        _ = await db.status_checks.insert_one(status_obj.dict())
     return status_obj
 
 @api_router.get("/status", response_model=List[StatusCheck])
-async def get_status_checks():
-    status_checks = await db.status_checks.find().to_list(1000)
-    return [StatusCheck(**status_check) for status_check in status_checks]
+async def get_status_checks(
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None
+):
+    try:
+        with mongo_operation('status_checks', 'find'):
+            status_checks, next_cursor = await paginate(
+                db.status_checks, {},
+                [("timestamp", ASCENDING), ("id", ASCENDING)],
+                limit, cursor,
+                {"_id": 0, "id": 1, "client_name": 1, "timestamp": 1}
+            )
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return page_response(status_checks, next_cursor)
 
 # New crypto endpoints
 @api_router.get("/crypto/supported")
-async def get_supported_cryptos():
+async def get_supported_cryptos(request: Request):
     """Get list of supported cryptocurrencies"""
     try:
-        supported = crypto_service.get_supported_coins()
-        return {
-            "supported_cryptos": [
-                {"symbol": symbol, "name": coin_id.replace('-', ' ').title(), "id": coin_id}
-                for symbol, coin_id in supported.items()
-            ]
-        }
+        entry = response_cache.get(("supported",))
+        if entry is None:
+            supported = crypto_service.get_supported_coins()
+            entry = response_cache.put(("supported",), orjson.dumps({
+                "supported_cryptos": [
+                    {"symbol": symbol, "name": coin_id.replace('-', ' ').title(), "id": coin_id}
+                    for symbol, coin_id in supported.items()
+                ]
+            }))
+        return cached_response(entry, request)
     except Exception as e:
         logger.error(f"Error getting supported cryptos: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to fetch supported cryptocurrencies")
 
+@dataclass
+class AnalysisResult:
+    """Outcome of one analysis, turned into a response format only at the edge"""
+    symbol: str
+    series: OHLCVSeries
+    price_info: dict
+    patterns: List[PatternDetection]
+    
+    def summary(self) -> dict:
+        current_price = self.price_info.get('current_price', 0)
+        change_percentage = self.price_info.get('price_change_24h', 0)
+        return {
+            "symbol": self.symbol,
+            "current_price": current_price,
+            "price_change_24h": current_price * change_percentage / 100,
+            "price_change_percentage_24h": change_percentage
+        }
+    
+    def to_response(self) -> CryptoAnalysisResponse:
+        # Convert to CryptoData models at the API edge only
+        return CryptoAnalysisResponse(
+            **self.summary(),
+            data=[CryptoData(**row) for row in self.series.to_rows()],
+            patterns=self.patterns
+        )
+    
+    def to_compact(self, fmt: str) -> Response:
+        """Columnar JSON or MessagePack body; no per-candle models are built"""
+        payload = columnar_payload(self.series, self.summary(), [pattern.dict() for pattern in self.patterns])
+        if fmt == "msgpack":
+            return Response(content=encode_msgpack(payload), media_type=MSGPACK_MEDIA_TYPES[0])
+        return Response(content=encode_columnar(payload), media_type=COLUMNAR_MEDIA_TYPE)
+
+async def detect_series_patterns(
+    series: OHLCVSeries, pattern_types: Optional[List[str]], in_process_pool: bool = False
+) -> List[dict]:
+    """Detection results, reused from the host's shared cache when another worker computed them"""
+    key = ("patterns", series_digest(series), tuple(pattern_types) if pattern_types is not None else None)
+    if shared_cache is not None and not series.is_fallback:
+        cached = shared_cache.get_json(key)
+        if cached is not None:
+            return cached[0]
+    
+    if in_process_pool and detection_pool is not None:
+        detected_patterns = await asyncio.get_running_loop().run_in_executor(
+            detection_pool, detect_patterns_in_worker, series, pattern_types
+        )
+    elif pattern_types is None:
+        detected_patterns = pattern_service.detect_head_and_shoulders(series)
+    else:
+        detected_patterns = pattern_service.detect_patterns(series, pattern_types)
+    
+    if shared_cache is not None and not series.is_fallback:
+        shared_cache.put_json(key, detected_patterns)
+    return detected_patterns
+
+def check_history_window(days: int):
+    """Windows beyond upstream's 365 days can only be served from the candle store"""
+    if days > UPSTREAM_MAX_DAYS and candle_store is None:
+        raise HTTPException(
+            status_code=400,
+            detail=f"days above {UPSTREAM_MAX_DAYS} require the candle store (CANDLE_STORE_DIR)"
+        )
+
+async def run_analysis(request: CryptoAnalysisRequest, in_process_pool: bool = False) -> AnalysisResult:
+    """Fetch, detect and queue persistence for one symbol"""
+    check_history_window(request.days)
+    logger.info(f"Analyzing {request.symbol} for {request.days} days ({request.timeframe or 'native'} bars)")
+    
+    if request.pattern_types is not None:
+        try:
+            get_detectors(request.pattern_types)
+        except KeyError as e:
+            raise HTTPException(status_code=400, detail=e.args[0])
+    
+    # Fetch historical data and current price info concurrently
+    try:
+        with stage('fetch'):
+            series, price_info = await market_data.get_market_snapshot(
+                request.symbol, request.days, request.timeframe
+            )
+    except TimeframeError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    if not len(series):
+        raise HTTPException(status_code=404, detail=f"No data found for {request.symbol}")
+    
+    # Detect patterns; batch requests run detection in the process pool
+    # so the CPU work neither blocks the loop nor holds its GIL
+    with stage('detect'):
+        detected_patterns = await detect_series_patterns(series, request.pattern_types, in_process_pool)
+    
+    with stage('models'):
+        # Ids are content fingerprints, so re-detections upsert in place
+        pattern_models = [
+            PatternDetection(**PatternDetectionCreate(**pattern_data).dict(), **pattern_identity(series, pattern_data))
+            for pattern_data in detected_patterns
+        ]
+    
+    # Hand patterns to the background writer; the response does not wait
+    # for Mongo. Candles are queued by market_data when it fetches them.
+    # Fallback candles are regenerated on every call, so their patterns
+    # would never dedupe and are not stored
+    with stage('enqueue'):
+        if not series.is_fallback:
+            await persistence_writer.enqueue_patterns([pattern.dict() for pattern in pattern_models])
+    
+    logger.info(f"Found {len(pattern_models)} patterns for {request.symbol}")
+    
+    return AnalysisResult(request.symbol, series, price_info, pattern_models)
+
+@api_router.get("/crypto/pattern-types")
+async def get_pattern_types():
+    """Chart patterns that can be requested via pattern_types"""
+    return {
+        "pattern_types": [
+            {"name": name, "pattern_type": detector.pattern_type, "signal": detector.signal}
+            for name, detector in PATTERN_DETECTORS.items()
+        ]
+    }
+
+def uses_latest_analysis(request: CryptoAnalysisRequest) -> bool:
+    """
+    Only default-shaped requests are precomputed by the scheduler, and only
+    while it runs is the store kept fresh enough to answer from
+    """
+    return (
+        ANALYSIS_MAX_AGE > 0 and analysis_scheduler.running
+        and request.pattern_types is None and request.timeframe is None
+    )
+
+def job_response(job: dict, status_code: int = 200) -> Response:
+    """Job document as stored; the result is passed through without re-validation"""
+    return Response(
+        content=orjson.dumps(job),
+        status_code=status_code,
+        media_type="application/json",
+        headers={"Location": f"/api/crypto/jobs/{job['id']}"}
+    )
+
 @api_router.post("/crypto/analyze", response_model=CryptoAnalysisResponse)
-async def analyze_crypto(request: CryptoAnalysisRequest):
-    """Analyze crypto data and detect patterns"""
+async def analyze_crypto(
+    request: CryptoAnalysisRequest,
+    format: Optional[str] = Query(None, description="rows (default), columnar or msgpack"),
+    accept: Optional[str] = Header(None),
+    mode: Optional[str] = Query(None, description="job: queue the analysis and return a job id at once"),
+    priority: int = Query(5, ge=0, le=9, description="Job priority, 0 runs first")
+):
+    """
+    Analyze crypto data and detect patterns.
+    The candle series can come back as parallel arrays instead of row
+    objects: ?format=columnar / msgpack, or the matching Accept header.
+    With ?mode=job the request is queued and answered with 202 and a job
+    to poll at /crypto/jobs/{job_id}.
+    """
+    if mode is not None:
+        if mode != "job":
+            raise HTTPException(status_code=400, detail=f"Unknown mode {mode!r}; use 'job'")
+        check_history_window(request.days)
+        try:
+            job, created = await analysis_jobs.submit(request.model_dump(mode="json"), priority)
+        except JobQueueFull as e:
+            raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "30"})
+        return job_response(job, 202 if created else 200)
+    
     try:
-        logger.info(f"Analyzing {request.symbol} for {request.days} days")
-        
-        # Fetch historical data
-        historical_data = crypto_service.get_historical_data(request.symbol, request.days)
-        
-        if not historical_data:
-            raise HTTPException(status_code=404, detail=f"No data found for {request.symbol}")
+        try:
+            fmt = negotiate_format(format, accept)
+        except UnsupportedFormat as e:
+            raise HTTPException(status_code=406, detail=str(e))
         
-        # Get current price info
-        price_info = crypto_service.get_current_price(request.symbol)
+        if fmt != "rows":
+            result = await run_analysis(request)
+            with stage('serialize'):
+                return result.to_compact(fmt)
         
-        # Convert to CryptoData models
-        crypto_data = [CryptoData(**item) for item in historical_data]
+        if uses_latest_analysis(request):
+            with stage('latest_lookup'):
+                cached = await latest_analysis.get(request.symbol, request.days, ANALYSIS_MAX_AGE)
+            if cached is not None:
+                return Response(content=cached, media_type="application/json")
         
-        # Detect patterns
-        detected_patterns = pattern_service.detect_head_and_shoulders(historical_data)
-        
-        # Save patterns to database
-        pattern_models = []
-        for pattern_data in detected_patterns:
-            pattern = PatternDetectionCreate(**pattern_data)
-            pattern_obj = PatternDetection(**pattern.dict())
-            
-            # Save to database
-            await db.pattern_detections.insert_one(pattern_obj.dict())
-            pattern_models.append(pattern_obj)
-        
-        # Save crypto data to database (optional, for caching)
-        for data_point in crypto_data:
-            await db.crypto_data.update_one(
-                {"symbol": data_point.symbol, "date": data_point.date},
-                {"$set": data_point.dict()},
-                upsert=True
-            )
-        
-        logger.info(f"Found {len(pattern_models)} patterns for {request.symbol}")
-        
-        return CryptoAnalysisResponse(
-            symbol=request.symbol,
-            current_price=price_info.get('current_price', 0),
-            price_change_24h=price_info.get('current_price', 0) * price_info.get('price_change_24h', 0) / 100,
-            price_change_percentage_24h=price_info.get('price_change_24h', 0),
-            data=crypto_data,
-            patterns=pattern_models
-        )
+        result = await run_analysis(request)
+        with stage('serialize'):
+            response = result.to_response()
+            if not uses_latest_analysis(request):
+                return response
+            # Serialized once, for both this response and the store
+            body = response.model_dump_json().encode()
+        latest_analysis.put_body(request.symbol, request.days, body)
+        return Response(content=body, media_type="application/json")
         
     except HTTPException:
         raise
@@ -131,16 +431,220 @@ async def analyze_crypto(request: CryptoAnalysisRequest):
         logger.error(f"Error analyzing {request.symbol}: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Analysis failed: {str(e)}")
 
+@api_router.get("/crypto/jobs/{job_id}")
+async def get_analysis_job(
+    job_id: str,
+    wait: float = Query(0, ge=0, le=60, description="Seconds to wait for the job to finish")
+):
+    """Status of an analysis job, with its result once done; ?wait long-polls"""
+    job = await analysis_jobs.get(job_id, wait)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job_response(job)
+
+@api_router.post("/crypto/analyze/batch", response_model=CryptoBatchAnalysisResponse)
+async def analyze_crypto_batch(request: CryptoBatchAnalysisRequest):
+    """Analyze several symbols at once; one failing symbol does not fail the batch"""
+    
+    async def analyze_item(item: CryptoAnalysisRequest) -> CryptoBatchAnalysisResult:
+        try:
+            result = await run_analysis(item, in_process_pool=True)
+            return CryptoBatchAnalysisResult(symbol=item.symbol, days=item.days, result=result.to_response())
+        except HTTPException as e:
+            return CryptoBatchAnalysisResult(symbol=item.symbol, days=item.days, error=str(e.detail))
+        except Exception as e:
+            logger.error(f"Error analyzing {item.symbol} in batch: {str(e)}")
+            return CryptoBatchAnalysisResult(symbol=item.symbol, days=item.days, error=f"Analysis failed: {str(e)}")
+    
+    results = await asyncio.gather(*(analyze_item(item) for item in request.requests))
+    return CryptoBatchAnalysisResponse(
+        results=results,
+        failed=sum(1 for result in results if result.error is not None)
+    )
+
+async def fetch_usable_history(symbols: List[str], days: int):
+    """Cached history per symbol, split into usable series and skipped symbols"""
+    check_history_window(days)
+    symbols = list(dict.fromkeys(symbol.upper() for symbol in symbols))
+    with stage('fetch'):
+        series_list = await asyncio.gather(
+            *(market_data.get_historical_data(symbol, days) for symbol in symbols)
+        )
+    
+    # Generated fallback candles say nothing about real signal quality
+    usable = [series for series in series_list if len(series) and not series.is_fallback]
+    skipped = [series.symbol for series in series_list if not len(series) or series.is_fallback]
+    if not usable:
+        raise HTTPException(status_code=404, detail="No historical data found for the requested symbols")
+    return usable, skipped
+
+@api_router.post("/crypto/backtest", response_model=BacktestResponse)
+async def backtest_patterns(request: BacktestRequest):
+    """
+    Replay head-and-shoulders detection over history without lookahead and
+    report forward returns by confidence bucket, strength and signal.
+    Each symbol is split into time chunks that run in the detection pool.
+    """
+    usable, skipped = await fetch_usable_history(request.symbols, request.days)
+    
+    loop = asyncio.get_running_loop()
+    tasks = [
+        loop.run_in_executor(
+            detection_pool, backtest_chunk, series[slice_start:slice_stop], start, stop, request.horizons
+        )
+        for series in usable
+        for slice_start, slice_stop, start, stop in plan_chunks(len(series), request.chunk_size, max(request.horizons))
+    ]
+    with stage('detect'):
+        signals = [signal for chunk in await asyncio.gather(*tasks) for signal in chunk]
+    
+    logger.info(f"Backtest of {len(usable)} symbols found {len(signals)} signals")
+    return BacktestResponse(
+        symbols=[series.symbol for series in usable],
+        skipped=skipped,
+        candles=sum(len(series) for series in usable),
+        signals=len(signals),
+        horizons=request.horizons,
+        **summarize(signals, request.horizons)
+    )
+
+@api_router.post("/crypto/sweep", response_model=SweepResponse)
+async def sweep_detection_parameters(request: SweepRequest):
+    """
+    Backtest every DetectionConfig in a parameter grid over cached history
+    and rank the sets by signed forward return at rank_horizon. Parameter
+    sets sharing window shapes are evaluated together in one detection
+    pool task per symbol.
+    """
+    try:
+        configs = parameter_grid(**request.grid)
+    except (ValueError, TypeError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not configs:
+        raise HTTPException(status_code=400, detail="The grid contains no valid parameter set")
+    rank_horizon = request.horizons[0] if request.rank_horizon is None else request.rank_horizon
+    if rank_horizon not in request.horizons:
+        raise HTTPException(status_code=400, detail="rank_horizon must be one of the horizons")
+    
+    usable, skipped = await fetch_usable_history(request.symbols, request.days)
+    # A center needs `margin` candles on either side; wider windows could not
+    # be evaluated at all (and their peak tables cannot even be built)
+    shortest = min(usable, key=len)
+    margin = max(config.margin for config in configs)
+    if len(shortest) <= 2 * margin:
+        raise HTTPException(
+            status_code=400,
+            detail=f"The grid's windows need more than {2 * margin} candles, "
+                   f"{shortest.symbol} has {len(shortest)} over {request.days} days"
+        )
+    
+    loop = asyncio.get_running_loop()
+    tasks = plan_sweep(usable, configs)
+    futures = [
+        loop.run_in_executor(
+            detection_pool, sweep_group, series, [configs[position] for position in group], request.horizons
+        )
+        for series, group in tasks
+    ]
+    with stage('detect'):
+        outputs = await asyncio.gather(*futures)
+    
+    results = rank_configs(configs, merge_outputs(configs, tasks, outputs), request.horizons, rank_horizon)
+    logger.info(f"Swept {len(configs)} parameter sets over {len(usable)} symbols")
+    return SweepResponse(
+        symbols=[series.symbol for series in usable],
+        skipped=skipped,
+        candles=sum(len(series) for series in usable),
+        evaluated=len(configs),
+        horizons=request.horizons,
+        rank_horizon=rank_horizon,
+        results=results[:request.top]
+    )
+
+@api_router.get("/crypto/stream")
+async def stream_crypto(symbols: str = Query(..., description="Comma-separated symbols, e.g. BTC,ETH")):
+    """
+    Server-Sent Events feed of price ticks and pattern deltas.
+    Events: snapshot (current state on subscribe), price, and patterns
+    with added/removed lists. Comment lines keep idle connections open.
+    """
+    try:
+        symbol_list = parse_symbols(symbols, LIVE_MAX_SYMBOLS)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    async def events():
+        subscription = live_feed.subscribe(symbol_list)
+        try:
+            while True:
+                try:
+                    event = await asyncio.wait_for(subscription.get(), LIVE_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield b": keep-alive\n\n"
+                    continue
+                yield format_sse(event)
+        finally:
+            live_feed.unsubscribe(subscription)
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@api_router.get("/persistence/metrics")
+async def get_persistence_metrics():
+    """Queue depth and flush latency of the background writer"""
+    return persistence_writer.metrics()
+
+@api_router.get("/ready")
+async def readiness():
+    """503 until this worker's startup warm-up has finished"""
+    status = warm_up.status()
+    return Response(
+        content=orjson.dumps(status),
+        status_code=200 if status["ready"] else 503,
+        media_type="application/json"
+    )
+
+@api_router.get("/metrics")
+async def get_metrics():
+    """Prometheus text exposition of request, upstream, cache and Mongo metrics"""
+    return Response(content=REGISTRY.render(), media_type=PROMETHEUS_CONTENT_TYPE)
+
 @api_router.get("/crypto/{symbol}/patterns", response_model=List[PatternDetection])
-async def get_crypto_patterns(symbol: str):
-    """Get historical patterns for a specific cryptocurrency"""
+async def get_crypto_patterns(
+    request: Request,
+    symbol: str,
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = None
+):
+    """
+    Get historical patterns for a specific cryptocurrency, newest first.
+    Pages are served from the response cache with ETag/Last-Modified.
+    """
+    symbol = symbol.upper()
+    key = ("patterns", symbol, limit, cursor)
     try:
-        patterns = await db.pattern_detections.find(
-            {"symbol": symbol.upper()}
-        ).sort("detected_at", -1).limit(50).to_list(50)
+        entry = response_cache.get(key)
+        if entry is None:
+            with mongo_operation('pattern_detections', 'find'):
+                patterns, next_cursor = await paginate(
+                    db.pattern_detections, {"symbol": symbol},
+                    [("detected_at", DESCENDING), ("id", DESCENDING)],
+                    limit, cursor,
+                    {"_id": 0, **{field: 1 for field in PatternDetection.model_fields}}
+                )
+            page = page_response(patterns, next_cursor)
+            entry = response_cache.put(
+                key, page.body, tags=[f"patterns:{symbol}"],
+                headers={"X-Next-Cursor": next_cursor} if next_cursor else None
+            )
         
-        return [PatternDetection(**pattern) for pattern in patterns]
+        return cached_response(entry, request)
         
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error fetching patterns for {symbol}: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to fetch patterns")
@@ -149,13 +653,47 @@ async def get_crypto_patterns(symbol: str):
 async def clear_crypto_patterns(symbol: str):
     """Clear all patterns for a specific cryptocurrency"""
     try:
-        result = await db.pattern_detections.delete_many({"symbol": symbol.upper()})
+        with mongo_operation('pattern_detections', 'delete_many'):
+            result = await db.pattern_detections.delete_many({"symbol": symbol.upper()})
+        invalidate_patterns([symbol])
         return {"deleted_count": result.deleted_count}
         
     except Exception as e:
         logger.error(f"Error clearing patterns for {symbol}: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to clear patterns")
 
+async def job_analysis(params: dict) -> dict:
+    try:
+        result = await run_analysis(CryptoAnalysisRequest(**params), in_process_pool=True)
+    except HTTPException as e:
+        raise JobFailed(e.status_code, str(e.detail))
+    return result.to_response().model_dump(mode="json")
+
+# Queued analyses (?mode=job); state is mirrored to analysis_jobs
+analysis_jobs = AnalysisJobQueue(
+    job_analysis,
+    db.analysis_jobs,
+    workers=int(os.environ.get('ANALYSIS_JOB_WORKERS', '4')),
+    max_pending=int(os.environ.get('ANALYSIS_JOB_MAX_PENDING', '1000'))
+)
+JOB_RETENTION_SECONDS = float(os.environ.get('ANALYSIS_JOB_RETENTION_HOURS', '24')) * 3600
+
+async def scheduled_analysis(symbol: str, days: int) -> dict:
+    result = await run_analysis(CryptoAnalysisRequest(symbol=symbol, days=days))
+    return result.to_response().model_dump(mode="json")
+
+analysis_scheduler = AnalysisScheduler(
+    scheduled_analysis,
+    latest_analysis,
+    symbols=[
+        symbol for symbol in os.environ.get('SCAN_SYMBOLS', '').split(',') if symbol
+    ] or list(crypto_service.get_supported_coins()),
+    days_windows=[int(days) for days in os.environ.get('SCAN_DAYS', '30,90').split(',')],
+    interval=float(os.environ.get('SCAN_INTERVAL_SECONDS', '300')),
+    calls_per_minute=float(os.environ.get('COINGECKO_CALLS_PER_MINUTE', '30')),
+    budget_fraction=float(os.environ.get('SCAN_BUDGET_FRACTION', '0.5'))
+)
+
 # Include the router in the main app
 app.include_router(api_router)
 
@@ -167,6 +705,187 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+HTTP_REQUEST_SECONDS = REGISTRY.histogram(
+    'http_request_duration_seconds', 'HTTP request latency by route', ('method', 'route', 'status')
+)
+
+def _lru_stats(cache) -> dict:
+    return {('hit',): cache.hits, ('miss',): cache.misses}
+
+# Values owned by other services are read when /metrics is scraped;
+# the lambdas resolve the module globals at that time
+REGISTRY.callback(
+    'ohlcv_series_cache_requests_total', 'In-process OHLCV series cache lookups',
+    lambda: _lru_stats(market_data.series_cache), ('result',), 'counter'
+)
+REGISTRY.callback(
+    'price_cache_requests_total', 'In-process current price cache lookups',
+    lambda: _lru_stats(market_data.price_cache), ('result',), 'counter'
+)
+REGISTRY.callback(
+    'ohlcv_series_cache_bytes', 'Bytes held by the in-process OHLCV series cache',
+    lambda: {(): market_data.series_cache.size}
+)
+REGISTRY.callback(
+    'persistence_queue_depth', 'Batches waiting for the background writer',
+    lambda: {(): persistence_writer.metrics()['queue_depth']}
+)
+REGISTRY.callback(
+    'persistence_documents_written_total', 'Documents written by the background writer',
+    lambda: {(): persistence_writer.documents_written}, type_name='counter'
+)
+REGISTRY.callback(
+    'persistence_flush_errors_total', 'Failed background writer flushes',
+    lambda: {(): persistence_writer.errors}, type_name='counter'
+)
+REGISTRY.callback(
+    'live_subscribers', 'Connected live feed clients',
+    lambda: {(): live_feed.subscriber_count}
+)
+REGISTRY.callback(
+    'live_dropped_events_total', 'Live feed events dropped for slow clients',
+    lambda: {(): live_feed.dropped_events}, type_name='counter'
+)
+REGISTRY.callback(
+    'storage_compacted_documents_total', 'Documents removed by the retention compactor',
+    lambda: {(collection,): count for collection, count in storage_compactor.deleted.items()},
+    labelnames=('collection',), type_name='counter'
+)
+REGISTRY.callback(
+    'analysis_jobs_pending', 'Queued or running analysis jobs in this worker',
+    lambda: {(): analysis_jobs.pending_count}
+)
+REGISTRY.callback(
+    'analysis_jobs_total', 'Analysis job submissions and outcomes',
+    lambda: {
+        ('submitted',): analysis_jobs.submitted,
+        ('deduplicated',): analysis_jobs.deduplicated,
+        ('completed',): analysis_jobs.completed,
+        ('failed',): analysis_jobs.failed
+    },
+    labelnames=('outcome',), type_name='counter'
+)
+REGISTRY.callback(
+    'response_cache_requests_total', 'Response cache lookups and conditional hits',
+    lambda: {
+        ('hit',): response_cache.hits,
+        ('miss',): response_cache.misses,
+        ('not_modified',): response_cache.not_modified
+    },
+    labelnames=('result',), type_name='counter'
+)
+REGISTRY.callback(
+    'shared_cache_requests_total', 'Host-wide shared cache reads and writes',
+    lambda: {
+        ('hit',): shared_cache.hits,
+        ('miss',): shared_cache.misses,
+        ('write',): shared_cache.writes
+    } if shared_cache is not None else {},
+    labelnames=('result',), type_name='counter'
+)
+REGISTRY.callback(
+    'scheduler_failures_total', 'Failed scheduled analyses',
+    lambda: {(): analysis_scheduler.failures}, type_name='counter'
+)
+
+@app.middleware("http")
+async def record_request_timing(request: Request, call_next):
+    timings = start_request_timings()
+    start = time.perf_counter()
+    response = await call_next(request)
+    elapsed = time.perf_counter() - start
+    
+    # Label by route template, not raw path, to keep cardinality bounded
+    route = request.scope.get("route")
+    HTTP_REQUEST_SECONDS.observe(
+        elapsed,
+        method=request.method,
+        route=getattr(route, "path", "unmatched"),
+        status=str(response.status_code)
+    )
+    if SERVER_TIMING_HEADERS:
+        response.headers["Server-Timing"] = server_timing_header(timings, elapsed)
+    return response
+
+@app.on_event("startup")
+async def create_indexes():
+    await ensure_indexes(db, {
+        'pattern_detections': int(PATTERN_RETENTION_SECONDS),
+        'crypto_data': int(CANDLE_RETENTION_SECONDS),
+        'analysis_jobs': int(JOB_RETENTION_SECONDS)
+    })
+
+@app.on_event("startup")
+async def start_storage_compactor():
+    if storage_compactor.interval > 0:
+        await storage_compactor.start()
+
+@app.on_event("startup")
+async def start_detection_pool():
+    global detection_pool
+    # By default the host's cores are split between the uvicorn workers
+    # (WEB_CONCURRENCY, as uvicorn reads it) rather than each taking all of them
+    uvicorn_workers = max(int(os.environ.get('WEB_CONCURRENCY', '1')), 1)
+    workers = int(os.environ.get('DETECTION_WORKERS', '0')) or max((os.cpu_count() or 1) // uvicorn_workers, 1)
+    # Forking this process would copy the state of motor's and asyncio's
+    # threads (held locks included) into the children
+    detection_pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+
+@app.on_event("shutdown")
+async def shutdown_detection_pool():
+    global detection_pool
+    if detection_pool is not None:
+        detection_pool.shutdown(cancel_futures=True)
+        detection_pool = None
+
+@app.on_event("startup")
+async def start_persistence_writer():
+    await persistence_writer.start()
+
+@app.on_event("startup")
+async def start_warm_up():
+    global warm_up_task
+    if not WARMUP_DAYS:
+        warm_up.ready = True
+        return
+    warm_up_task = asyncio.create_task(warm_up.run(list(market_data.get_supported_coins()), WARMUP_DAYS))
+
+@app.on_event("startup")
+async def start_analysis_jobs():
+    await analysis_jobs.start()
+
+@app.on_event("startup")
+async def start_analysis_scheduler():
+    if os.environ.get('SCAN_ENABLED', 'false').lower() == 'true':
+        await analysis_scheduler.start()
+
+@app.on_event("shutdown")
+async def stop_warm_up():
+    if warm_up_task is not None and not warm_up_task.done():
+        warm_up_task.cancel()
+        await asyncio.gather(warm_up_task, return_exceptions=True)
+
+@app.on_event("shutdown")
+async def stop_analysis_jobs():
+    await analysis_jobs.stop()
+
+@app.on_event("shutdown")
+async def stop_storage_compactor():
+    await storage_compactor.stop()
+
+@app.on_event("shutdown")
+async def stop_live_feed():
+    await live_feed.stop()
+
+@app.on_event("shutdown")
+async def stop_analysis_scheduler():
+    await analysis_scheduler.stop()
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
-    client.close()
\ No newline at end of file
+    await persistence_writer.stop()
+    client.close()
+
+@app.on_event("shutdown")
+async def shutdown_crypto_client():
+    await crypto_service.aclose()
\ No newline at end of file
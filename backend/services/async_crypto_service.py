@@ -0,0 +1,137 @@
+import asyncio
+import httpx
+import logging
+import time
+from typing import Dict, Any, Optional, Tuple
+
+from services.crypto_service import BaseCoinGeckoService, RETRY_STATUSES
+from services.metrics import (
+    UPSTREAM_RATE_LIMITED, UPSTREAM_REQUESTS, UPSTREAM_SECONDS, UPSTREAM_WAIT_SECONDS,
+    stage, upstream_endpoint
+)
+from services.ohlcv import OHLCVSeries
+from services.rate_limit import TokenBucket, SingleFlight, backoff_delay
+
+logger = logging.getLogger(__name__)
+
+class AsyncCoinGeckoService(BaseCoinGeckoService):
+    """
+    Non-blocking CoinGecko client backed by a pooled keep-alive httpx connection pool.
+    Safe to call from the event loop: nothing here sleeps or blocks the thread.
+    Every request goes through the shared rate limiter, and concurrent identical
+    requests are coalesced into one upstream call.
+    """
+    
+    def __init__(
+        self,
+        base_url: Optional[str] = None,
+        timeout: float = 10.0,
+        max_connections: int = 20,
+        max_keepalive_connections: int = 10,
+        rate_limiter: Optional[TokenBucket] = None,
+        max_retries: int = 3,
+        backoff_base: float = 1.0,
+        max_backoff: float = 60.0
+    ):
+        super().__init__(base_url)
+        self.timeout = timeout
+        self.rate_limiter = rate_limiter
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.max_backoff = max_backoff
+        self._single_flight = SingleFlight()
+        self.client = httpx.AsyncClient(
+            headers=self.HEADERS,
+            timeout=httpx.Timeout(timeout),
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive_connections
+            )
+        )
+    
+    async def aclose(self):
+        await self.client.aclose()
+    
+    async def _get_json(self, url: str, params: Dict[str, Any]) -> Any:
+        """GET a JSON document; identical concurrent requests share one upstream call"""
+        key = (url, tuple(sorted(params.items())))
+        return await self._single_flight.do(key, lambda: self._fetch_json(url, params))
+    
+    async def _fetch_json(self, url: str, params: Dict[str, Any]) -> Any:
+        """Rate-limited GET with jittered, Retry-After aware backoff on 429/503"""
+        endpoint = upstream_endpoint(url)
+        for attempt in range(self.max_retries + 1):
+            if self.rate_limiter:
+                with UPSTREAM_WAIT_SECONDS.time(reason='rate_limiter'):
+                    await self.rate_limiter.acquire()
+            
+            start = time.perf_counter()
+            try:
+                response = await self.client.get(url, params=params)
+            except httpx.HTTPError:
+                UPSTREAM_REQUESTS.inc(endpoint=endpoint, status='error')
+                raise
+            finally:
+                UPSTREAM_SECONDS.observe(time.perf_counter() - start, endpoint=endpoint)
+            UPSTREAM_REQUESTS.inc(endpoint=endpoint, status=str(response.status_code))
+            if response.status_code == 429:
+                UPSTREAM_RATE_LIMITED.inc(endpoint=endpoint)
+            if response.status_code not in RETRY_STATUSES or attempt == self.max_retries:
+                break
+            
+            delay = backoff_delay(
+                attempt, response.headers.get('Retry-After'),
+                base=self.backoff_base, cap=self.max_backoff
+            )
+            logger.warning(f"Upstream returned {response.status_code}, retrying in {delay:.1f}s")
+            with UPSTREAM_WAIT_SECONDS.time(reason='backoff'):
+                await asyncio.sleep(delay)
+        
+        response.raise_for_status()
+        return response.json()
+    
+    async def get_historical_data(self, symbol: str, days: int = 30) -> OHLCVSeries:
+        """Fetch historical OHLCV data, requesting /ohlc and /market_chart concurrently"""
+        try:
+            coin_id = self.get_coin_id(symbol)
+            
+            logger.info(f"Fetching OHLC data for {coin_id} with {days} days")
+            ohlc_data, volume_data = await asyncio.gather(
+                self._get_json(*self._ohlc_request(coin_id, days)),
+                self._get_json(*self._market_chart_request(coin_id, days))
+            )
+            
+            with stage('upstream_format'):
+                series = self._build_series(symbol, ohlc_data, volume_data.get('total_volumes', []), days)
+            
+            logger.info(f"Successfully fetched {len(series)} data points for {symbol}")
+            return series
+            
+        except httpx.HTTPError as e:
+            logger.error(f"API request failed for {symbol}: {str(e)}")
+            # Return fallback data if API fails
+            return self._get_fallback_data(symbol, days)
+        except Exception as e:
+            logger.error(f"Unexpected error fetching data for {symbol}: {str(e)}")
+            return self._get_fallback_data(symbol, days)
+    
+    async def get_current_price(self, symbol: str) -> Dict[str, float]:
+        """Get current price and 24h change"""
+        try:
+            coin_id = self.get_coin_id(symbol)
+            data = await self._get_json(*self._price_request(coin_id))
+            return self._parse_price(coin_id, data)
+            
+        except Exception as e:
+            logger.error(f"Error fetching current price for {symbol}: {str(e)}")
+            return {
+                'current_price': 0,
+                'price_change_24h': 0
+            }
+    
+    async def get_market_snapshot(self, symbol: str, days: int = 30) -> Tuple[OHLCVSeries, Dict[str, float]]:
+        """Historical series and current price, with all three upstream calls in flight at once"""
+        return await asyncio.gather(
+            self.get_historical_data(symbol, days),
+            self.get_current_price(symbol)
+        )
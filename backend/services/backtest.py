@@ -0,0 +1,189 @@
+"""
+Historical backtest of head-and-shoulders signals.
+
+Detection is replayed as a live IncrementalPatternDetector would have seen
+it, so no signal uses candles from after the moment it was raised; forward
+returns are then measured from that moment. Work is split into time chunks
+that can run in a process pool.
+"""
+import math
+import statistics
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from services.ohlcv import OHLCVSeries
+from services.pattern_service import PatternDetectionService
+
+DEFAULT_HORIZONS = (6, 30, 90)
+# Candles replayed before each chunk so overlap selection at the chunk start
+# matches a run over the whole series; only a run of overlapping candidates
+# longer than this could differ
+WARMUP_CANDLES = 300
+CONFIDENCE_BUCKETS = ((60, 70), (70, 80), (80, 90), (90, 101))
+
+# Per-process service used by backtest_chunk
+_worker_service = None
+
+
+def rolling_signals(
+    series: OHLCVSeries,
+    service: PatternDetectionService,
+    start: int = 0,
+    stop: Optional[int] = None,
+    window_peaks: Optional[Dict[int, Tuple[Any, Any]]] = None
+) -> List[Dict[str, Any]]:
+    """
+    Patterns in the order a candle-by-candle detector would have raised them,
+    for signals raised at candle indices in [start, stop).
+
+    A center's candidate only reads candles up to margin - 1 after it, so it
+    becomes known at index center + margin and one vectorized pass yields
+    every candidate. Overlap selection only links candidates less than
+    overlap_radius apart, so it is replayed per chain of such candidates:
+    each arrival re-runs selection on its chain, and patterns that become
+    selected are raised at the arrival's known index. A pattern deselected
+    later still counts; it was already acted on. window_peaks is passed on
+    to _detect_candidates_vectorized.
+    """
+    stop = len(series) if stop is None else min(stop, len(series))
+    margin = service.config.margin
+    radius = service.config.overlap_radius
+    # Candidates known before `stop`; earlier ones only matter as chain context
+    candidates = service._detect_candidates_vectorized(
+        series, stop_center=stop - margin, window_peaks=window_peaks
+    )
+
+    signals = []
+    chain: List[Dict[str, Any]] = []
+    selected: set = set()
+    for candidate in candidates:
+        center = candidate['center_index']
+        if chain and center - chain[-1]['center_index'] >= radius:
+            chain, selected = [], set()
+        chain.append(candidate)
+
+        now_selected = {p['center_index'] for p in service._remove_overlapping_patterns(list(chain))}
+        known_at = center + margin
+        if known_at >= start:
+            for pattern in chain:
+                if pattern['center_index'] in now_selected and pattern['center_index'] not in selected:
+                    signals.append({**pattern, 'signal_index': known_at})
+        selected = now_selected
+
+    return signals
+
+
+def forward_returns(series: OHLCVSeries, index: int, horizons: Sequence[int]) -> List[Optional[float]]:
+    """close[index + h] / close[index] - 1 per horizon, None past the end of the data"""
+    entry = float(series.close[index])
+    return [
+        float(series.close[index + horizon]) / entry - 1 if index + horizon < len(series) and entry else None
+        for horizon in horizons
+    ]
+
+
+def backtest_chunk(
+    series: OHLCVSeries, start: int, stop: int, horizons: Sequence[int] = DEFAULT_HORIZONS
+) -> List[Dict[str, Any]]:
+    """
+    Process-pool entry point: signals raised in [start, stop) of `series`
+    with their forward returns. Candles after `stop` are only read to
+    measure returns, never for detection.
+    """
+    global _worker_service
+    if _worker_service is None:
+        _worker_service = PatternDetectionService()
+
+    return signal_outcomes(series, rolling_signals(series, _worker_service, start, stop), horizons)
+
+
+def signal_outcomes(
+    series: OHLCVSeries, signals: List[Dict[str, Any]], horizons: Sequence[int]
+) -> List[Dict[str, Any]]:
+    """Flatten rolling_signals() output into records with forward returns"""
+    results = []
+    for signal in signals:
+        index = signal['signal_index']
+        results.append({
+            'symbol': series.symbol,
+            'pattern_type': signal['pattern_type'],
+            'signal': signal['signal'],
+            'strength': signal['strength'],
+            'confidence': signal['confidence'],
+            'center_timestamp': int(series.timestamp[signal['center_index']]),
+            'signal_timestamp': int(series.timestamp[index]),
+            'entry_price': float(series.close[index]),
+            'returns': forward_returns(series, index, horizons)
+        })
+    return results
+
+
+def plan_chunks(
+    length: int, chunk_size: int, max_horizon: int, warmup: int = WARMUP_CANDLES
+) -> List[Tuple[int, int, int, int]]:
+    """
+    (slice_start, slice_stop, start, stop) per chunk: signals raised in
+    [slice_start + start, slice_start + stop) are computed from
+    series[slice_start:slice_stop], which adds warmup before and the
+    longest horizon after the chunk.
+    """
+    chunks = []
+    for chunk_start in range(0, length, chunk_size):
+        chunk_stop = min(length, chunk_start + chunk_size)
+        slice_start = max(0, chunk_start - warmup)
+        slice_stop = min(length, chunk_stop + max_horizon)
+        chunks.append((slice_start, slice_stop, chunk_start - slice_start, chunk_stop - slice_start))
+    return chunks
+
+
+def _direction(signal: str) -> int:
+    return -1 if 'Bearish' in signal else 1
+
+
+def confidence_bucket(confidence: int) -> str:
+    for low, high in CONFIDENCE_BUCKETS:
+        if low <= confidence < high:
+            return f"{low}+" if high > 100 else f"{low}-{high - 1}"
+    return "below 60"
+
+
+def _bucket_stats(key: str, signals: List[Dict[str, Any]], horizons: Sequence[int]) -> Dict[str, Any]:
+    """Returns are signed by the signal's direction: a bearish call that fell scores positive"""
+    stats = []
+    for position, horizon in enumerate(horizons):
+        outcomes = [
+            _direction(signal['signal']) * signal['returns'][position]
+            for signal in signals if signal['returns'][position] is not None
+        ]
+        stats.append({
+            'horizon': horizon,
+            'samples': len(outcomes),
+            'mean_return': statistics.fmean(outcomes) if outcomes else None,
+            'median_return': statistics.median(outcomes) if outcomes else None,
+            'hit_rate': sum(1 for outcome in outcomes if outcome > 0) / len(outcomes) if outcomes else None
+        })
+    return {'key': key, 'count': len(signals), 'horizons': stats}
+
+
+def _grouped(signals: List[Dict[str, Any]], key_of, horizons: Sequence[int], order=None) -> List[Dict[str, Any]]:
+    groups: Dict[str, List[Dict[str, Any]]] = {}
+    for signal in signals:
+        groups.setdefault(key_of(signal), []).append(signal)
+    keys = sorted(groups, key=order or (lambda key: key))
+    return [_bucket_stats(key, groups[key], horizons) for key in keys]
+
+
+def summarize(signals: List[Dict[str, Any]], horizons: Sequence[int]) -> Dict[str, Any]:
+    """Forward-return statistics overall and by confidence bucket, strength and signal"""
+    strength_order = {'Weak': 0, 'Moderate': 1, 'Strong': 2}
+    return {
+        'overall': _bucket_stats('all', signals, horizons),
+        'by_confidence': _grouped(
+            signals, lambda s: confidence_bucket(s['confidence']), horizons,
+            order=lambda key: -1 if key == 'below 60' else int(key.rstrip('+').split('-')[0])
+        ),
+        'by_strength': _grouped(
+            signals, lambda s: s['strength'], horizons,
+            order=lambda key: strength_order.get(key, math.inf)
+        ),
+        'by_signal': _grouped(signals, lambda s: s['signal'], horizons)
+    }
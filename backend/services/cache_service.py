@@ -0,0 +1,321 @@
+import asyncio
+import logging
+import math
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+
+from services.async_crypto_service import AsyncCoinGeckoService
+from services.candle_store import CandleStore
+from services.crypto_service import DAY_MS, granularity_ms
+from services.metrics import CACHE_LOOKUPS, mongo_operation
+from services.ohlcv import OHLCVSeries
+from services.resample import resample
+from services.shared_cache import SharedCache
+
+logger = logging.getLogger(__name__)
+
+# `days` values the /ohlc endpoint accepts, grouped by the granularity they return
+OHLC_DAYS = (1, 7, 14, 30, 90, 180, 365)
+
+
+def widest_days(days: int) -> int:
+    """
+    Largest /ohlc window with the same granularity as `days`. Fetching that
+    once lets every shorter horizon (and every coarser timeframe resampled
+    from it) be served from the same cached candles. Longer windows than
+    upstream keeps are capped at its longest; the rest of their history
+    can only come from the candle store.
+    """
+    widest = max(candidate for candidate in OHLC_DAYS + (days,) if granularity_ms(candidate) == granularity_ms(days))
+    return min(widest, OHLC_DAYS[-1])
+
+
+class LRUCache:
+    """
+    In-process LRU cache with a TTL and a size bound.
+    Entry size comes from `sizeof` (1 per entry by default); least recently
+    used entries are evicted until the total fits in `max_size`. Expired
+    entries are still returned by get_entry() so callers can refresh them
+    incrementally.
+    """
+    
+    def __init__(
+        self,
+        max_size: int = 256,
+        ttl: float = 60.0,
+        sizeof: Callable[[Any], int] = lambda value: 1,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._sizeof = sizeof
+        self._clock = clock
+        self._entries: "OrderedDict[Hashable, Tuple[Any, float, int]]" = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    def get_entry(self, key: Hashable) -> Optional[Tuple[Any, float]]:
+        """(value, age in seconds) whether or not the entry has expired"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        self._entries.move_to_end(key)
+        value, stored_at, _ = entry
+        return value, self._clock() - stored_at
+    
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Value if present and fresh"""
+        entry = self.get_entry(key)
+        if entry is None or entry[1] > self.ttl:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry[0]
+    
+    def set(self, key: Hashable, value: Any, age: float = 0.0):
+        """Store a value; `age` backdates it when it was computed elsewhere"""
+        self.invalidate(key)
+        size = self._sizeof(value)
+        if size > self.max_size:
+            return
+        self._entries[key] = (value, self._clock() - age, size)
+        self.size += size
+        while self.size > self.max_size:
+            _, (_, _, evicted_size) = self._entries.popitem(last=False)
+            self.size -= evicted_size
+            self.evictions += 1
+    
+    def invalidate(self, key: Optional[Hashable] = None):
+        """Drop one key, or everything when key is None"""
+        if key is None:
+            self._entries.clear()
+            self.size = 0
+            return
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.size -= entry[2]
+
+
+def tail_days(gap_ms: int, days: int) -> Optional[int]:
+    """
+    Smallest /ohlc `days` value that covers `gap_ms` of missing candles at the
+    same granularity as `days`, or None when only a full refetch will do.
+    """
+    gap_days = math.ceil(gap_ms / DAY_MS)
+    for candidate in OHLC_DAYS:
+        if candidate >= gap_days and candidate < days and granularity_ms(candidate) == granularity_ms(days):
+            return candidate
+    return None
+
+
+class CachedMarketDataService:
+    """
+    Read-through cache in front of AsyncCoinGeckoService.get_historical_data.
+    
+    Tiers: an in-process LRU keyed by (symbol, granularity), then the
+    host-wide shared cache of all workers (when configured), then the
+    memory-mapped candle store (when configured), then the crypto_data
+    collection, then upstream. With a shared cache, refreshes of one key
+    are single-flighted across the host's workers. When a cached series is stale or only
+    partially covers the window, just the missing recent candles are
+    fetched and merged in. Every refreshed series is written through to the
+    candle store, which keeps history beyond upstream's longest window.
+    """
+    
+    def __init__(
+        self,
+        upstream: AsyncCoinGeckoService,
+        collection=None,
+        ttl: float = 60.0,
+        max_bytes: int = 64 * 1024 * 1024,
+        price_ttl: float = 30.0,
+        clock: Callable[[], float] = time.time,
+        candle_store: Optional[CandleStore] = None,
+        shared_cache: Optional[SharedCache] = None,
+        on_fetched: Optional[Callable[[OHLCVSeries], Awaitable[None]]] = None
+    ):
+        self.upstream = upstream
+        # Called with the candles each upstream fetch returned, e.g. to persist them
+        self.on_fetched = on_fetched
+        self.collection = collection
+        self.candle_store = candle_store
+        self.shared_cache = shared_cache
+        self.series_cache = LRUCache(max_size=max_bytes, ttl=ttl, sizeof=lambda series: series.nbytes, clock=clock)
+        self.price_cache = LRUCache(max_size=1024, ttl=price_ttl, clock=clock)
+        self._clock = clock
+        # Refresh lock and holder/waiter count per key; dropped once idle
+        self._locks: Dict[Hashable, List] = {}
+    
+    def get_supported_coins(self) -> Dict[str, str]:
+        return self.upstream.get_supported_coins()
+    
+    async def get_market_snapshot(
+        self, symbol: str, days: int = 30, timeframe: Optional[str] = None
+    ) -> Tuple[OHLCVSeries, Dict[str, float]]:
+        """Series (optionally resampled to `timeframe`) and current price"""
+        series, price = await asyncio.gather(
+            self.get_historical_data(symbol, days),
+            self.get_current_price(symbol)
+        )
+        if timeframe is not None:
+            series = resample(series, timeframe)
+        return series, price
+    
+    async def get_current_price(self, symbol: str) -> Dict[str, float]:
+        key = symbol.upper()
+        price = self.price_cache.get(key)
+        if price is None:
+            price = await self.upstream.get_current_price(symbol)
+            if price.get('current_price'):
+                self.price_cache.set(key, price)
+        return price
+    
+    async def get_historical_data(self, symbol: str, days: int = 30) -> OHLCVSeries:
+        symbol = symbol.upper()
+        key = (symbol, granularity_ms(days))
+        
+        # Only one refresh per (symbol, granularity) at a time; the others
+        # then find the refreshed entry in the LRU
+        entry = self._locks.setdefault(key, [asyncio.Lock(), 0])
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                return await self._get_locked(key, symbol, days)
+        finally:
+            # Client-supplied symbols must not grow the lock table
+            entry[1] -= 1
+            if not entry[1]:
+                del self._locks[key]
+    
+    async def _get_locked(self, key: Tuple[str, int], symbol: str, days: int) -> OHLCVSeries:
+        interval = key[1]
+        now_ms = int(self._clock() * 1000)
+        start_ts = now_ms - days * DAY_MS
+        # Upstream keeps no more than its longest window, so a series reaching
+        # back that far covers longer windows as well as it ever will
+        cover_ts = max(start_ts, now_ms - OHLC_DAYS[-1] * DAY_MS)
+        
+        cached = self.series_cache.get_entry(key)
+        base = cached[0] if cached else None
+        if base is not None and cached[1] <= self.series_cache.ttl and self._covers(base, cover_ts, interval):
+            self.series_cache.hits += 1
+            CACHE_LOOKUPS.inc(tier='memory')
+            return base.since(start_ts)
+        self.series_cache.misses += 1
+        
+        if self.shared_cache is None:
+            return await self._refresh(key, symbol, days, base, start_ts, cover_ts, now_ms)
+        
+        shared = self._read_shared(key, start_ts, cover_ts, interval)
+        if shared is not None:
+            return shared
+        async with self.shared_cache.single_flight(key):
+            # Another worker may have refreshed the entry while this one waited
+            shared = self._read_shared(key, start_ts, cover_ts, interval)
+            if shared is not None:
+                return shared
+            return await self._refresh(key, symbol, days, base, start_ts, cover_ts, now_ms)
+    
+    def _read_shared(
+        self, key: Tuple[str, int], start_ts: int, cover_ts: int, interval: int
+    ) -> Optional[OHLCVSeries]:
+        entry = self.shared_cache.get_series(key)
+        if entry is None:
+            return None
+        series, age = entry
+        if age > self.series_cache.ttl or not self._covers(series, cover_ts, interval):
+            return None
+        CACHE_LOOKUPS.inc(tier='shared')
+        self.series_cache.set(key, series, age=age)
+        return series.since(start_ts)
+    
+    async def _refresh(
+        self,
+        key: Tuple[str, int],
+        symbol: str,
+        days: int,
+        base: Optional[OHLCVSeries],
+        start_ts: int,
+        cover_ts: int,
+        now_ms: int
+    ) -> OHLCVSeries:
+        """Rebuild the entry from the stored tiers and upstream"""
+        interval = key[1]
+        # Symbols the store cannot file (e.g. with spaces) skip it
+        use_store = self.candle_store is not None and self.candle_store.accepts(symbol)
+        if (base is None or not self._covers(base, cover_ts, interval)) and use_store:
+            stored = self.candle_store.read(symbol, interval, start_ts - interval)
+            if len(stored):
+                base = stored
+        
+        if base is None or not self._covers(base, cover_ts, interval):
+            base = await self._load_from_collection(symbol, interval, start_ts)
+        
+        series = None
+        if base is not None and self._covers(base, cover_ts, interval):
+            gap_ms = now_ms - int(base.timestamp[-1])
+            if gap_ms < interval:
+                CACHE_LOOKUPS.inc(tier='stored')
+                series = base
+            else:
+                fetch_days = tail_days(gap_ms, days)
+                if fetch_days is not None:
+                    tail = await self.upstream.get_historical_data(symbol, fetch_days)
+                    if not tail.is_fallback:
+                        logger.info(f"Merged {len(tail)} tail candles for {symbol} ({fetch_days} days)")
+                        CACHE_LOOKUPS.inc(tier='tail')
+                        series = base.merge(tail)
+                        await self._fetched(tail)
+        
+        if series is None:
+            CACHE_LOOKUPS.inc(tier='upstream')
+            series = await self.upstream.get_historical_data(symbol, widest_days(days))
+            if series.is_fallback:
+                return series
+            await self._fetched(series)
+        
+        if use_store:
+            self._write_through(series)
+        if self.shared_cache is not None:
+            self.shared_cache.put_series(key, series)
+        
+        self.series_cache.set(key, series)
+        return series.since(start_ts)
+    
+    async def _fetched(self, series: OHLCVSeries):
+        if self.on_fetched is not None:
+            await self.on_fetched(series)
+    
+    def _write_through(self, series: OHLCVSeries):
+        try:
+            self.candle_store.append(series)
+        except OSError as e:
+            logger.error(f"Error writing candles for {series.symbol} to the candle store: {str(e)}")
+    
+    @staticmethod
+    def _covers(series: OHLCVSeries, start_ts: int, interval: int) -> bool:
+        return len(series) > 0 and int(series.timestamp[0]) <= start_ts + interval
+    
+    async def _load_from_collection(self, symbol: str, interval: int, start_ts: int) -> Optional[OHLCVSeries]:
+        if self.collection is None:
+            return None
+        try:
+            with mongo_operation('crypto_data', 'find'):
+                documents = await self.collection.find(
+                    {"symbol": symbol, "interval_ms": interval, "timestamp": {"$gte": start_ts - interval}},
+                    {"_id": 0, "timestamp": 1, "open_price": 1, "high_price": 1,
+                     "low_price": 1, "close_price": 1, "volume": 1}
+                ).sort("timestamp", 1).to_list(None)
+        except Exception as e:
+            logger.error(f"Error reading cached candles for {symbol}: {str(e)}")
+            return None
+        
+        if not documents:
+            return None
+        return OHLCVSeries.from_documents(symbol, documents, interval)
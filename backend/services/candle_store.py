@@ -0,0 +1,171 @@
+import fcntl
+import logging
+import os
+import re
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from services.ohlcv import OHLCVSeries
+
+logger = logging.getLogger(__name__)
+
+COLUMN_DTYPES = {
+    'timestamp': np.int64,
+    'open': np.float64,
+    'high': np.float64,
+    'low': np.float64,
+    'close': np.float64,
+    'volume': np.float64,
+}
+
+_SAFE_SYMBOL = re.compile(r'^[A-Z0-9][A-Z0-9._-]*$')
+
+
+class CandleStore:
+    """
+    Append-only columnar candle files, read back through np.memmap.
+
+    Layout: <root>/<SYMBOL>/<interval_ms>/<column>.bin, one raw native-endian
+    array per OHLCV column. The timestamp file is written last and defines
+    how many rows are committed, so a reader never sees a half-appended
+    candle. Reads are zero-copy slices of the mapped files located with
+    searchsorted on the timestamp column; writers in different processes
+    serialize on an flock per series directory.
+    """
+
+    def __init__(self, root):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        # (symbol, interval) -> (committed rows, mapped columns)
+        self._maps: Dict[Tuple[str, int], Tuple[int, Dict[str, np.ndarray]]] = {}
+
+    @staticmethod
+    def accepts(symbol: str) -> bool:
+        """Whether `symbol` can name a series directory"""
+        return bool(_SAFE_SYMBOL.match(symbol.upper()))
+
+    def _directory(self, symbol: str, interval_ms: int) -> Path:
+        symbol = symbol.upper()
+        if not self.accepts(symbol):
+            raise ValueError(f"Invalid symbol for candle store: {symbol!r}")
+        return self.root / symbol / str(int(interval_ms))
+
+    @contextmanager
+    def _locked(self, directory: Path) -> Iterator[None]:
+        directory.mkdir(parents=True, exist_ok=True)
+        with open(directory / '.lock', 'w') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    @staticmethod
+    def _committed_rows(directory: Path) -> int:
+        try:
+            return os.path.getsize(directory / 'timestamp.bin') // np.dtype(np.int64).itemsize
+        except FileNotFoundError:
+            return 0
+
+    def series_keys(self) -> List[Tuple[str, int]]:
+        """(symbol, interval_ms) of every stored series"""
+        return sorted(
+            (path.parent.parent.name, int(path.parent.name))
+            for path in self.root.glob('*/*/timestamp.bin')
+        )
+
+    def count(self, symbol: str, interval_ms: int) -> int:
+        return self._committed_rows(self._directory(symbol, interval_ms))
+
+    def last_timestamp(self, symbol: str, interval_ms: int) -> Optional[int]:
+        columns = self._columns(symbol, interval_ms)
+        if columns is None:
+            return None
+        return int(columns['timestamp'][-1])
+
+    def append(self, series: OHLCVSeries) -> int:
+        """
+        Store candles newer than the last stored one and return how many
+        rows were added. A candle with the last stored timestamp replaces it
+        in place (it may have still been forming); older candles are kept
+        as they are. Fallback data and series without a known interval are
+        never stored.
+        """
+        if series.is_fallback or not series.interval_ms or not len(series):
+            return 0
+
+        directory = self._directory(series.symbol, series.interval_ms)
+        with self._locked(directory):
+            rows = self._committed_rows(directory)
+            if rows:
+                last = int(np.fromfile(directory / 'timestamp.bin', dtype=np.int64, offset=(rows - 1) * 8)[0])
+                # Drop price rows left behind by an append that died before
+                # committing its timestamps
+                for name in COLUMN_DTYPES:
+                    path = directory / f'{name}.bin'
+                    if os.path.getsize(path) > rows * 8:
+                        os.truncate(path, rows * 8)
+
+                position = int(np.searchsorted(series.timestamp, last, side='left'))
+                if position < len(series) and int(series.timestamp[position]) == last:
+                    self._overwrite_last(directory, rows, series, position)
+                series = series[int(np.searchsorted(series.timestamp, last, side='right')):]
+
+            if not len(series):
+                return 0
+
+            # Price columns first, timestamps last: the timestamp file length
+            # is the commit point readers rely on
+            for name in OHLCVSeries.PRICE_COLUMNS + ('timestamp',):
+                with open(directory / f'{name}.bin', 'ab') as handle:
+                    handle.write(np.ascontiguousarray(getattr(series, name), dtype=COLUMN_DTYPES[name]).tobytes())
+
+            logger.debug(f"Stored {len(series)} candles for {series.symbol} ({series.interval_ms} ms)")
+            return len(series)
+
+    @staticmethod
+    def _overwrite_last(directory: Path, rows: int, series: OHLCVSeries, position: int):
+        for name in OHLCVSeries.PRICE_COLUMNS:
+            with open(directory / f'{name}.bin', 'r+b') as handle:
+                handle.seek((rows - 1) * 8)
+                handle.write(np.float64(getattr(series, name)[position]).tobytes())
+
+    def _columns(self, symbol: str, interval_ms: int) -> Optional[Dict[str, np.ndarray]]:
+        """Mapped columns trimmed to the committed row count, remapped when the files grew"""
+        key = (symbol.upper(), int(interval_ms))
+        directory = self._directory(*key)
+        rows = self._committed_rows(directory)
+        if not rows:
+            self._maps.pop(key, None)
+            return None
+
+        cached = self._maps.get(key)
+        if cached is not None and cached[0] == rows:
+            return cached[1]
+
+        columns = {
+            name: np.memmap(directory / f'{name}.bin', dtype=dtype, mode='r', shape=(rows,))
+            for name, dtype in COLUMN_DTYPES.items()
+        }
+        self._maps[key] = (rows, columns)
+        return columns
+
+    def read(
+        self, symbol: str, interval_ms: int, start_ts: Optional[int] = None, end_ts: Optional[int] = None
+    ) -> OHLCVSeries:
+        """Candles with start_ts <= timestamp < end_ts as views of the mapped files"""
+        columns = self._columns(symbol, interval_ms)
+        if columns is None:
+            return OHLCVSeries.empty(symbol, interval_ms)
+
+        timestamps = columns['timestamp']
+        start = 0 if start_ts is None else int(np.searchsorted(timestamps, start_ts, side='left'))
+        stop = len(timestamps) if end_ts is None else int(np.searchsorted(timestamps, end_ts, side='left'))
+        return OHLCVSeries(
+            symbol,
+            *(columns[name][start:stop] for name in COLUMN_DTYPES),
+            interval_ms=int(interval_ms)
+        )
@@ -0,0 +1,76 @@
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import orjson
+
+try:
+    import msgpack
+except ImportError:  # optional: only needed for the MessagePack response format
+    msgpack = None
+
+from services.ohlcv import OHLCVSeries
+
+COLUMNAR_MEDIA_TYPE = 'application/vnd.cryptopatterns.columnar+json'
+MSGPACK_MEDIA_TYPES = ('application/msgpack', 'application/x-msgpack')
+RESPONSE_FORMATS = ('rows', 'columnar', 'msgpack')
+
+
+class UnsupportedFormat(ValueError):
+    pass
+
+
+def negotiate_format(requested: Optional[str], accept: Optional[str]) -> str:
+    """
+    Response format for an analyze call: an explicit ?format= wins, then the
+    Accept header; anything else gets the classic row-per-candle JSON.
+    """
+    if requested:
+        fmt = requested
+    elif accept and COLUMNAR_MEDIA_TYPE in accept:
+        fmt = 'columnar'
+    elif accept and any(media_type in accept for media_type in MSGPACK_MEDIA_TYPES):
+        fmt = 'msgpack'
+    else:
+        fmt = 'rows'
+    
+    if fmt not in RESPONSE_FORMATS:
+        raise UnsupportedFormat(f"Unknown response format: {fmt}")
+    if fmt == 'msgpack' and msgpack is None:
+        raise UnsupportedFormat("MessagePack responses need the msgpack package")
+    return fmt
+
+
+def columnar_payload(series: OHLCVSeries, summary: Dict[str, Any], patterns: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Analyze result with the candles as parallel arrays instead of row objects"""
+    return {
+        **summary,
+        'interval_ms': series.interval_ms,
+        'candles': {
+            'timestamp': series.timestamp,
+            'date': series.dates(),
+            'open': series.open,
+            'high': series.high,
+            'low': series.low,
+            'close': series.close,
+            'volume': series.volume,
+        },
+        'patterns': patterns,
+    }
+
+
+def encode_columnar(payload: Dict[str, Any]) -> bytes:
+    # orjson writes the NumPy columns directly, without a tolist() round-trip
+    return orjson.dumps(payload, option=orjson.OPT_SERIALIZE_NUMPY)
+
+
+def _msgpack_default(value):
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not MessagePack serializable")
+
+
+def encode_msgpack(payload: Dict[str, Any]) -> bytes:
+    return msgpack.packb(payload, default=_msgpack_default)
@@ -1,20 +1,38 @@
-import requests
 import logging
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple
 from datetime import datetime, timedelta
-import time
+import numpy as np
+
+from services.metrics import FALLBACK_DATA
+from services.ohlcv import OHLCVSeries
 
 logger = logging.getLogger(__name__)
 
-class CoinGeckoService:
+# Upstream statuses that are worth retrying after a backoff
+RETRY_STATUSES = {429, 503}
+
+MINUTE_MS = 60 * 1000
+DAY_MS = 24 * 60 * MINUTE_MS
+
+
+def granularity_ms(days: int) -> int:
+    """Candle size CoinGecko's /ohlc endpoint returns for a given `days` window"""
+    if days <= 2:
+        return 30 * MINUTE_MS
+    if days <= 30:
+        return 4 * 60 * MINUTE_MS
+    return 4 * DAY_MS
+
+class BaseCoinGeckoService:
+    """Transport-independent parts of the CoinGecko client"""
     BASE_URL = "https://api.coingecko.com/api/v3"
+    HEADERS = {
+        'accept': 'application/json',
+        'User-Agent': 'CryptoPatternDetector/1.0'
+    }
     
-    def __init__(self):
-        self.session = requests.Session()
-        self.session.headers.update({
-            'accept': 'application/json',
-            'User-Agent': 'CryptoPatternDetector/1.0'
-        })
+    def __init__(self, base_url: Optional[str] = None):
+        self.base_url = (base_url or self.BASE_URL).rstrip('/')
     
     def get_supported_coins(self) -> Dict[str, str]:
         """Get mapping of common symbols to CoinGecko IDs"""
@@ -34,111 +52,62 @@ class CoinGeckoService:
         coins_map = self.get_supported_coins()
         return coins_map.get(symbol.upper(), symbol.lower())
     
-    def get_historical_data(self, symbol: str, days: int = 30) -> List[Dict[str, Any]]:
-        """
-        Fetch historical OHLCV data from CoinGecko
-        """
-        try:
-            coin_id = self.get_coin_id(symbol)
-            
-            # Get OHLC data
-            ohlc_url = f"{self.BASE_URL}/coins/{coin_id}/ohlc"
-            ohlc_params = {
-                'vs_currency': 'usd',
-                'days': days
-            }
-            
-            logger.info(f"Fetching OHLC data for {coin_id} with {days} days")
-            ohlc_response = self.session.get(ohlc_url, params=ohlc_params, timeout=10)
-            
-            if ohlc_response.status_code == 429:
-                logger.warning("Rate limit hit, waiting...")
-                time.sleep(61)  # Wait 61 seconds for rate limit reset
-                ohlc_response = self.session.get(ohlc_url, params=ohlc_params, timeout=10)
-            
-            ohlc_response.raise_for_status()
-            ohlc_data = ohlc_response.json()
-            
-            # Get volume data
-            volume_url = f"{self.BASE_URL}/coins/{coin_id}/market_chart"
-            volume_params = {
-                'vs_currency': 'usd',
-                'days': days
-            }
-            
-            volume_response = self.session.get(volume_url, params=volume_params, timeout=10)
-            volume_response.raise_for_status()
-            volume_data = volume_response.json()
-            
-            # Combine OHLC with volume data
-            volumes = volume_data.get('total_volumes', [])
-            volume_dict = {int(v[0]): v[1] for v in volumes}
-            
-            formatted_data = []
-            for item in ohlc_data:
-                timestamp = item[0]
-                date_obj = datetime.fromtimestamp(timestamp / 1000)
-                
-                formatted_data.append({
-                    'symbol': symbol.upper(),
-                    'date': date_obj.strftime('%Y-%m-%d'),
-                    'timestamp': timestamp,
-                    'open': float(item[1]),
-                    'high': float(item[2]),
-                    'low': float(item[3]),
-                    'close': float(item[4]),
-                    'volume': volume_dict.get(timestamp, 0)
-                })
-            
-            logger.info(f"Successfully fetched {len(formatted_data)} data points for {symbol}")
-            return formatted_data
-            
-        except requests.exceptions.RequestException as e:
-            logger.error(f"API request failed for {symbol}: {str(e)}")
-            # Return fallback data if API fails
-            return self._get_fallback_data(symbol, days)
-        except Exception as e:
-            logger.error(f"Unexpected error fetching data for {symbol}: {str(e)}")
-            return self._get_fallback_data(symbol, days)
+    def _ohlc_request(self, coin_id: str, days: int) -> Tuple[str, Dict[str, Any]]:
+        return f"{self.base_url}/coins/{coin_id}/ohlc", {'vs_currency': 'usd', 'days': days}
     
-    def get_current_price(self, symbol: str) -> Dict[str, float]:
-        """Get current price and 24h change"""
-        try:
-            coin_id = self.get_coin_id(symbol)
-            
-            url = f"{self.BASE_URL}/simple/price"
-            params = {
-                'ids': coin_id,
-                'vs_currencies': 'usd',
-                'include_24hr_change': 'true'
-            }
-            
-            response = self.session.get(url, params=params, timeout=10)
-            
-            if response.status_code == 429:
-                time.sleep(61)
-                response = self.session.get(url, params=params, timeout=10)
-            
-            response.raise_for_status()
-            data = response.json()
-            
-            coin_data = data.get(coin_id, {})
-            
-            return {
-                'current_price': coin_data.get('usd', 0),
-                'price_change_24h': coin_data.get('usd_24h_change', 0)
-            }
-            
-        except Exception as e:
-            logger.error(f"Error fetching current price for {symbol}: {str(e)}")
-            return {
-                'current_price': 0,
-                'price_change_24h': 0
-            }
+    def _market_chart_request(self, coin_id: str, days: int) -> Tuple[str, Dict[str, Any]]:
+        return f"{self.base_url}/coins/{coin_id}/market_chart", {'vs_currency': 'usd', 'days': days}
+    
+    def _price_request(self, coin_id: str) -> Tuple[str, Dict[str, Any]]:
+        return f"{self.base_url}/simple/price", {
+            'ids': coin_id,
+            'vs_currencies': 'usd',
+            'include_24hr_change': 'true'
+        }
+    
+    def _parse_price(self, coin_id: str, data: Dict[str, Any]) -> Dict[str, float]:
+        coin_data = data.get(coin_id, {})
+        
+        return {
+            'current_price': coin_data.get('usd', 0),
+            'price_change_24h': coin_data.get('usd_24h_change', 0)
+        }
+    
+    def _build_series(self, symbol: str, ohlc_data: List[List[float]], volumes: List[List[float]], days: int) -> OHLCVSeries:
+        """Combine /ohlc rows with /market_chart volumes into a columnar series"""
+        if not ohlc_data:
+            return OHLCVSeries.empty(symbol, granularity_ms(days))
+        
+        ohlc = np.asarray(ohlc_data, dtype=np.float64)
+        timestamps = ohlc[:, 0].astype(np.int64)
+        
+        # Volumes only count for candles whose timestamp matches exactly;
+        # on duplicate timestamps the last volume wins
+        candle_volumes = np.zeros(len(timestamps))
+        if volumes:
+            volume_array = np.asarray(volumes, dtype=np.float64)
+            volume_ts = volume_array[:, 0].astype(np.int64)
+            order = np.argsort(volume_ts, kind='stable')
+            volume_ts = volume_ts[order]
+            volume_values = volume_array[order, 1]
+            
+            pos = np.searchsorted(volume_ts, timestamps, side='right') - 1
+            pos_clipped = np.clip(pos, 0, None)
+            matched = (pos >= 0) & (volume_ts[pos_clipped] == timestamps)
+            candle_volumes = np.where(matched, volume_values[pos_clipped], 0.0)
+        
+        return OHLCVSeries(
+            symbol, timestamps, ohlc[:, 1], ohlc[:, 2], ohlc[:, 3], ohlc[:, 4], candle_volumes,
+            interval_ms=granularity_ms(days)
+        )
     
-    def _get_fallback_data(self, symbol: str, days: int) -> List[Dict[str, Any]]:
+    def _get_fallback_data(self, symbol: str, days: int) -> OHLCVSeries:
         """Generate fallback mock data when API fails"""
         logger.warning(f"Using fallback data for {symbol}")
+        # Symbols come from clients; unknown ones share a label so they cannot
+        # grow the metric's series without bound
+        label = symbol.upper() if symbol.upper() in self.get_supported_coins() else 'other'
+        FALLBACK_DATA.inc(symbol=label)
         
         # Base prices for different cryptos
         base_prices = {
@@ -149,7 +118,7 @@ class CoinGeckoService:
         }
         
         base_price = base_prices.get(symbol.upper(), 1000)
-        data = []
+        columns = {name: [] for name in ('timestamp', 'open', 'high', 'low', 'close', 'volume')}
         
         for i in range(days):
             date_obj = datetime.now() - timedelta(days=days-i-1)
@@ -163,15 +132,11 @@ class CoinGeckoService:
             low = current_price * (1 - abs(hash(f"low{symbol}{i}") % 100) / 5000)
             open_price = current_price * (1 + (hash(f"open{symbol}{i}") % 100 - 50) / 5000)
             
-            data.append({
-                'symbol': symbol.upper(),
-                'date': date_obj.strftime('%Y-%m-%d'),
-                'timestamp': int(date_obj.timestamp() * 1000),
-                'open': round(open_price, 2),
-                'high': round(high, 2),
-                'low': round(low, 2),
-                'close': round(current_price, 2),
-                'volume': abs(hash(f"vol{symbol}{i}") % 10000000)
-            })
+            columns['timestamp'].append(int(date_obj.timestamp() * 1000))
+            columns['open'].append(round(open_price, 2))
+            columns['high'].append(round(high, 2))
+            columns['low'].append(round(low, 2))
+            columns['close'].append(round(current_price, 2))
+            columns['volume'].append(abs(hash(f"vol{symbol}{i}") % 10000000))
         
-        return data
\ No newline at end of file
+        return OHLCVSeries(symbol, **columns, interval_ms=DAY_MS, is_fallback=True)
@@ -0,0 +1,126 @@
+import bisect
+import logging
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from services.ohlcv import OHLCVBuffer, OHLCVSeries
+from services.pattern_service import PatternDetectionService
+
+logger = logging.getLogger(__name__)
+
+
+class IncrementalPatternDetector:
+    """
+    Stateful head-and-shoulders detector for one symbol.
+    
+    A center's evaluation only reads candles within config.margin of it, so
+    appending candles only opens new centers at the tail; earlier centers
+    keep their result. Overlap suppression only links candidates less than
+    config.overlap_radius apart, so just the chain of candidates reaching into the
+    new tail is re-ranked. Per-update cost is O(window), not O(series), and
+    patterns() always equals a full detect_head_and_shoulders() over view().
+    """
+    
+    def __init__(self, symbol: str, service: Optional[PatternDetectionService] = None):
+        self.symbol = symbol.upper()
+        self.service = service or PatternDetectionService()
+        self.buffer = OHLCVBuffer(self.symbol)
+        self._candidates: Dict[int, Dict[str, Any]] = {}
+        self._candidate_centers: List[int] = []
+        self._selected: Dict[int, Dict[str, Any]] = {}
+    
+    def __len__(self) -> int:
+        return len(self.buffer)
+    
+    def view(self) -> OHLCVSeries:
+        return self.buffer.view()
+    
+    def patterns(self) -> List[Dict[str, Any]]:
+        """Current overlap-suppressed patterns, in detect_head_and_shoulders order"""
+        return sorted(
+            self._selected.values(),
+            key=lambda p: (-p['confidence'], p['center_index'])
+        )
+    
+    def append(self, candles: OHLCVSeries) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Add candles and return the pattern delta as {'added': [...], 'removed': [...]}.
+        Candles at or before the last known timestamp replace the stored ones
+        from that point on (e.g. an updated still-forming candle).
+        """
+        if not len(candles):
+            return {'added': [], 'removed': []}
+        
+        margin = self.service.config.margin
+        old_size = len(self.buffer)
+        timestamps = self.buffer.view().timestamp
+        first_changed = int(np.searchsorted(timestamps, candles.timestamp[0], side='left'))
+        
+        self.buffer.truncate(first_changed)
+        self.buffer.extend(candles)
+        series = self.buffer.view()
+        
+        # Centers whose evaluation can see a changed candle, plus centers
+        # that only now have enough candles after them
+        dirty_from = max(margin, min(first_changed - margin + 1, old_size - margin))
+        self._drop_candidates_from(dirty_from)
+        for pattern in self.service._detect_candidates_vectorized(series, first_center=dirty_from):
+            self._candidates[pattern['center_index']] = pattern
+            self._candidate_centers.append(pattern['center_index'])
+        
+        return self._reselect_from(dirty_from)
+    
+    def _drop_candidates_from(self, center: int):
+        cut = bisect.bisect_left(self._candidate_centers, center)
+        for dropped in self._candidate_centers[cut:]:
+            del self._candidates[dropped]
+        del self._candidate_centers[cut:]
+    
+    def _reselect_from(self, dirty_from: int) -> Dict[str, List[Dict[str, Any]]]:
+        """Re-run overlap suppression over the candidate chain reaching dirty_from"""
+        centers = self._candidate_centers
+        radius = self.service.config.overlap_radius
+        position = bisect.bisect_left(centers, dirty_from)
+        region_start = dirty_from
+        if position > 0 and dirty_from - centers[position - 1] < radius:
+            position -= 1
+            while position > 0 and centers[position] - centers[position - 1] < radius:
+                position -= 1
+            region_start = centers[position]
+        
+        region = [self._candidates[center] for center in centers[bisect.bisect_left(centers, region_start):]]
+        reselected = {
+            pattern['center_index']: pattern
+            for pattern in self.service._remove_overlapping_patterns(region)
+        }
+        
+        previous = {center: p for center, p in self._selected.items() if center >= region_start}
+        removed = [p for center, p in previous.items() if reselected.get(center) != p]
+        added = [p for center, p in reselected.items() if previous.get(center) != p]
+        
+        for pattern in removed:
+            del self._selected[pattern['center_index']]
+        self._selected.update(reselected)
+        
+        return {
+            'added': sorted(added, key=lambda p: p['center_index']),
+            'removed': sorted(removed, key=lambda p: p['center_index'])
+        }
+
+
+class IncrementalDetectorRegistry:
+    """One IncrementalPatternDetector per symbol, created on first use"""
+    
+    def __init__(self, service: Optional[PatternDetectionService] = None):
+        self.service = service or PatternDetectionService()
+        self._detectors: Dict[str, IncrementalPatternDetector] = {}
+    
+    def get(self, symbol: str) -> IncrementalPatternDetector:
+        symbol = symbol.upper()
+        if symbol not in self._detectors:
+            self._detectors[symbol] = IncrementalPatternDetector(symbol, self.service)
+        return self._detectors[symbol]
+    
+    def discard(self, symbol: str):
+        self._detectors.pop(symbol.upper(), None)
@@ -0,0 +1,81 @@
+import logging
+from typing import Dict, Optional
+
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import OperationFailure, PyMongoError
+
+logger = logging.getLogger(__name__)
+
+# Compound indexes backing the list endpoints' keyset pagination, the
+# crypto_data upserts and the fingerprint-keyed pattern upserts
+INDEXES = {
+    'pattern_detections': [
+        IndexModel([('symbol', ASCENDING), ('detected_at', DESCENDING), ('id', DESCENDING)],
+                   name='symbol_detected_at_id'),
+        IndexModel([('id', ASCENDING)], name='id', unique=True),
+    ],
+    'crypto_data': [
+        IndexModel([('symbol', ASCENDING), ('interval_ms', ASCENDING), ('timestamp', ASCENDING)],
+                   name='symbol_interval_timestamp', unique=True),
+    ],
+    'analysis_jobs': [
+        IndexModel([('id', ASCENDING)], name='id', unique=True),
+        IndexModel([('key', ASCENDING), ('status', ASCENDING)], name='key_status'),
+    ],
+    'status_checks': [
+        IndexModel([('timestamp', ASCENDING), ('id', ASCENDING)], name='timestamp_id'),
+    ],
+}
+
+# Date field each collection's TTL index expires documents by: patterns
+# not re-detected, candles not re-fetched and jobs submitted longer ago
+# than the retention period
+TTL_FIELDS = {
+    'pattern_detections': 'last_seen_at',
+    'crypto_data': 'created_at',
+    'analysis_jobs': 'submitted_at',
+}
+
+# Raised when an index of the same name exists with other options
+INDEX_OPTIONS_CONFLICT = 85
+
+
+async def ensure_indexes(db, retention_seconds: Optional[Dict[str, int]] = None):
+    """
+    Create the indexes at startup; a failure is logged rather than fatal.
+    retention_seconds maps a TTL_FIELDS collection to its retention; a
+    missing or zero retention drops that collection's TTL index.
+    """
+    retention_seconds = retention_seconds or {}
+    for collection_name, indexes in INDEXES.items():
+        try:
+            await db[collection_name].create_indexes(indexes)
+        except PyMongoError as e:
+            logger.error(f"Error creating indexes on {collection_name}: {str(e)}")
+    
+    for collection_name, field in TTL_FIELDS.items():
+        try:
+            await ensure_ttl_index(db, collection_name, field, retention_seconds.get(collection_name, 0))
+        except PyMongoError as e:
+            logger.error(f"Error updating the TTL index on {collection_name}: {str(e)}")
+
+
+async def ensure_ttl_index(db, collection_name: str, field: str, seconds: int):
+    name = f'{field}_ttl'
+    collection = db[collection_name]
+    if not seconds:
+        try:
+            await collection.drop_index(name)
+        except OperationFailure:
+            # Index not found: nothing to disable
+            pass
+        return
+    
+    try:
+        await collection.create_indexes([IndexModel([(field, ASCENDING)], name=name, expireAfterSeconds=int(seconds))])
+    except OperationFailure as e:
+        if e.code != INDEX_OPTIONS_CONFLICT:
+            raise
+        # The retention changed since the index was built; update it in place
+        await db.command('collMod', collection_name, index={'name': name, 'expireAfterSeconds': int(seconds)})
+        logger.info(f"Changed {collection_name} retention to {int(seconds)}s")
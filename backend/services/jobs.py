@@ -0,0 +1,242 @@
+import asyncio
+import itertools
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from services.metrics import mongo_operation
+
+logger = logging.getLogger(__name__)
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+PENDING_STATES = (QUEUED, RUNNING)
+
+
+class JobQueueFull(Exception):
+    pass
+
+
+class JobFailed(Exception):
+    """Raised by a job's run function to fail it with an HTTP status"""
+
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+def job_key(params: Dict[str, Any]) -> str:
+    """Identity of an analysis request; identical pending jobs share one run"""
+    pattern_types = ','.join(sorted(params.get('pattern_types') or []))
+    return f"{params['symbol'].upper()}|{params['days']}|{params.get('timeframe') or ''}|{pattern_types}"
+
+
+@dataclass
+class AnalysisJob:
+    id: str
+    key: str
+    params: Dict[str, Any]
+    priority: int
+    status: str = QUEUED
+    submitted_at: datetime = field(default_factory=datetime.utcnow)
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    status_code: Optional[int] = None
+    done: asyncio.Event = field(default_factory=asyncio.Event, repr=False)
+
+    def to_document(self) -> Dict[str, Any]:
+        return {
+            'id': self.id,
+            'key': self.key,
+            'params': self.params,
+            'priority': self.priority,
+            'status': self.status,
+            'submitted_at': self.submitted_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+            'result': self.result,
+            'error': self.error,
+            'status_code': self.status_code
+        }
+
+
+class AnalysisJobQueue:
+    """
+    Background analysis jobs.
+
+    Submitted jobs wait in a priority queue (lower priority values first,
+    FIFO within a priority) served by a fixed number of worker tasks, so a
+    burst of long-range requests cannot hold more than `workers` analyses
+    at once. Submitting a request identical to one still queued or running
+    returns the existing job. Job state is mirrored to the analysis_jobs
+    collection, so any worker can answer a status request; the finished
+    jobs of this worker are also kept in memory for long-polling.
+    """
+
+    def __init__(
+        self,
+        run: Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]],
+        collection=None,
+        workers: int = 4,
+        max_pending: int = 1000,
+        max_finished: int = 1000,
+        stale_after: float = 900.0,
+        poll_interval: float = 0.5
+    ):
+        self.run = run
+        self.collection = collection
+        self.workers = workers
+        self.max_pending = max_pending
+        self.max_finished = max_finished
+        # A pending job in Mongo older than this is presumed lost with its worker
+        self.stale_after = stale_after
+        self.poll_interval = poll_interval
+        # Created in start() so the queue belongs to the serving event loop
+        self.queue: Optional[asyncio.PriorityQueue] = None
+        self._tasks = []
+        self._sequence = itertools.count()
+        self._pending: Dict[str, AnalysisJob] = {}
+        self._finished: 'OrderedDict[str, AnalysisJob]' = OrderedDict()
+        self.submitted = 0
+        self.deduplicated = 0
+        self.completed = 0
+        self.failed = 0
+
+    @property
+    def pending_count(self) -> int:
+        return len(self._pending)
+
+    async def start(self):
+        if not self._tasks:
+            self.queue = asyncio.PriorityQueue()
+            self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def submit(self, params: Dict[str, Any], priority: int = 5) -> Tuple[Dict[str, Any], bool]:
+        """
+        Queue an analysis and return (job document, created). An identical
+        pending job, here or in another worker, is returned instead.
+        """
+        key = job_key(params)
+        for job in self._pending.values():
+            if job.key == key:
+                self.deduplicated += 1
+                return job.to_document(), False
+
+        existing = await self._find_pending(key)
+        if existing is not None:
+            self.deduplicated += 1
+            return existing, False
+
+        if len(self._pending) >= self.max_pending:
+            raise JobQueueFull(f"{len(self._pending)} analysis jobs are already pending")
+
+        job = AnalysisJob(id=str(uuid.uuid4()), key=key, params=params, priority=priority)
+        self._pending[job.id] = job
+        self.submitted += 1
+        await self._store(job, insert=True)
+        await self.queue.put((priority, next(self._sequence), job.id))
+        return job.to_document(), True
+
+    async def get(self, job_id: str, wait: float = 0.0) -> Optional[Dict[str, Any]]:
+        """Job document; with wait > 0, block up to `wait` seconds for it to finish"""
+        deadline = time.monotonic() + wait
+        job = self._pending.get(job_id) or self._finished.get(job_id)
+        if job is not None:
+            if job.status in PENDING_STATES and wait > 0:
+                try:
+                    await asyncio.wait_for(job.done.wait(), wait)
+                except asyncio.TimeoutError:
+                    pass
+            return job.to_document()
+
+        # Another worker owns the job: poll its mirrored state
+        while True:
+            document = await self._load(job_id)
+            remaining = deadline - time.monotonic()
+            if document is None or document['status'] not in PENDING_STATES or remaining <= 0:
+                return document
+            await asyncio.sleep(min(self.poll_interval, remaining))
+
+    async def _worker(self):
+        while True:
+            _, _, job_id = await self.queue.get()
+            try:
+                await self._execute(self._pending[job_id])
+            finally:
+                self.queue.task_done()
+
+    async def _execute(self, job: AnalysisJob):
+        job.status = RUNNING
+        job.started_at = datetime.utcnow()
+        await self._store(job)
+        try:
+            job.result = await self.run(job.params)
+            job.status = DONE
+            self.completed += 1
+        except JobFailed as e:
+            job.status, job.error, job.status_code = FAILED, e.detail, e.status_code
+            self.failed += 1
+        except Exception as e:
+            logger.error(f"Analysis job {job.id} ({job.key}) failed: {str(e)}")
+            job.status, job.error, job.status_code = FAILED, f"Analysis failed: {str(e)}", 500
+            self.failed += 1
+        job.finished_at = datetime.utcnow()
+
+        del self._pending[job.id]
+        self._finished[job.id] = job
+        while len(self._finished) > self.max_finished:
+            self._finished.popitem(last=False)
+        job.done.set()
+        await self._store(job)
+
+    async def _store(self, job: AnalysisJob, insert: bool = False):
+        if self.collection is None:
+            return
+        try:
+            if insert:
+                with mongo_operation('analysis_jobs', 'insert_one'):
+                    await self.collection.insert_one(job.to_document())
+            else:
+                with mongo_operation('analysis_jobs', 'update_one'):
+                    await self.collection.update_one({"id": job.id}, {"$set": job.to_document()})
+        except Exception as e:
+            logger.error(f"Error storing analysis job {job.id}: {str(e)}")
+
+    async def _load(self, job_id: str) -> Optional[Dict[str, Any]]:
+        if self.collection is None:
+            return None
+        try:
+            with mongo_operation('analysis_jobs', 'find_one'):
+                return await self.collection.find_one({"id": job_id}, {"_id": 0})
+        except Exception as e:
+            logger.error(f"Error reading analysis job {job_id}: {str(e)}")
+            return None
+
+    async def _find_pending(self, key: str) -> Optional[Dict[str, Any]]:
+        if self.collection is None:
+            return None
+        cutoff = datetime.utcfromtimestamp(time.time() - self.stale_after)
+        try:
+            with mongo_operation('analysis_jobs', 'find_one'):
+                return await self.collection.find_one(
+                    {"key": key, "status": {"$in": list(PENDING_STATES)}, "submitted_at": {"$gte": cutoff}},
+                    {"_id": 0, "result": 0}
+                )
+        except Exception as e:
+            logger.error(f"Error looking up pending analysis jobs: {str(e)}")
+            return None
@@ -0,0 +1,194 @@
+import asyncio
+import logging
+import time
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+import orjson
+
+from services.incremental_detector import IncrementalDetectorRegistry, IncrementalPatternDetector
+
+logger = logging.getLogger(__name__)
+
+
+class Subscription:
+    """
+    One client's view of the feed. Events wait in a bounded queue; when the
+    client falls behind, the oldest events are dropped so publishing never
+    blocks on it.
+    """
+
+    def __init__(self, symbols: Iterable[str], max_queue: int = 100):
+        self.symbols = [symbol.upper() for symbol in symbols]
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self.dropped = 0
+
+    def offer(self, event: Dict[str, Any]):
+        while self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(event)
+
+    async def get(self) -> Dict[str, Any]:
+        return await self.queue.get()
+
+
+class LiveFeed:
+    """
+    Push feed of price ticks and pattern deltas.
+
+    Each subscribed symbol has exactly one poller, however many clients
+    follow it: the poller reads the (cached) market snapshot, feeds new
+    candles to the symbol's IncrementalPatternDetector and publishes the
+    resulting delta to every subscriber. A poller stops when its last
+    subscriber leaves.
+    """
+
+    def __init__(
+        self,
+        market_data,
+        registry: Optional[IncrementalDetectorRegistry] = None,
+        days: int = 30,
+        interval: float = 30.0,
+        max_queue: int = 100
+    ):
+        self.market_data = market_data
+        self.registry = registry or IncrementalDetectorRegistry()
+        self.days = days
+        self.interval = interval
+        self.max_queue = max_queue
+        self._subscribers: Dict[str, Set[Subscription]] = {}
+        self._pollers: Dict[str, asyncio.Task] = {}
+        self._prices: Dict[str, Dict[str, Any]] = {}
+        self.polls = 0
+        self.poll_errors = 0
+        self.dropped_from_closed = 0
+
+    @property
+    def subscriber_count(self) -> int:
+        return len({subscription for subscribers in self._subscribers.values() for subscription in subscribers})
+
+    @property
+    def dropped_events(self) -> int:
+        live = {subscription for subscribers in self._subscribers.values() for subscription in subscribers}
+        return self.dropped_from_closed + sum(subscription.dropped for subscription in live)
+
+    def subscribe(self, symbols: Iterable[str]) -> Subscription:
+        """Register a client; symbols that already have state are replayed as a snapshot"""
+        subscription = Subscription(symbols, self.max_queue)
+        for symbol in subscription.symbols:
+            self._subscribers.setdefault(symbol, set()).add(subscription)
+            if symbol in self._prices:
+                subscription.offer(self._snapshot(symbol))
+            if symbol not in self._pollers:
+                self._pollers[symbol] = asyncio.create_task(self._poll_loop(symbol))
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        self.dropped_from_closed += subscription.dropped
+        for symbol in subscription.symbols:
+            subscribers = self._subscribers.get(symbol)
+            if subscribers is None:
+                continue
+            subscribers.discard(subscription)
+            if not subscribers:
+                self._stop_symbol(symbol)
+
+    async def stop(self):
+        tasks = list(self._pollers.values())
+        for symbol in list(self._pollers):
+            self._stop_symbol(symbol)
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def _stop_symbol(self, symbol: str):
+        task = self._pollers.pop(symbol, None)
+        if task is not None:
+            task.cancel()
+        self._subscribers.pop(symbol, None)
+        self._prices.pop(symbol, None)
+        self.registry.discard(symbol)
+
+    def _publish(self, symbol: str, event: Dict[str, Any]):
+        for subscription in list(self._subscribers.get(symbol, ())):
+            subscription.offer(event)
+
+    def _snapshot(self, symbol: str) -> Dict[str, Any]:
+        detector = self.registry.get(symbol)
+        return {
+            'type': 'snapshot',
+            'symbol': symbol,
+            **self._prices.get(symbol, {}),
+            'patterns': with_timestamps(detector, detector.patterns())
+        }
+
+    async def _poll_loop(self, symbol: str):
+        while True:
+            try:
+                await self.poll(symbol)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.poll_errors += 1
+                logger.error(f"Live feed poll failed for {symbol}: {str(e)}")
+            await asyncio.sleep(self.interval)
+
+    async def poll(self, symbol: str):
+        """Fetch once, update the detector and publish a tick plus any pattern delta"""
+        series, price = await self.market_data.get_market_snapshot(symbol, self.days)
+        self.polls += 1
+
+        self._prices[symbol] = {
+            'current_price': price.get('current_price', 0),
+            'price_change_24h': price.get('price_change_24h', 0),
+            'timestamp': int(time.time() * 1000)
+        }
+        self._publish(symbol, {'type': 'price', 'symbol': symbol, **self._prices[symbol]})
+
+        # Generated fallback candles would only produce phantom patterns
+        if series.is_fallback or not len(series):
+            return
+
+        detector = self.registry.get(symbol)
+        if len(detector):
+            # Re-send the last known candle too: it may still have been forming
+            series = series.since(int(detector.view().timestamp[-1]))
+        delta = detector.append(series)
+        if delta['added'] or delta['removed']:
+            self._publish(symbol, {
+                'type': 'patterns',
+                'symbol': symbol,
+                'added': with_timestamps(detector, delta['added']),
+                'removed': with_timestamps(detector, delta['removed'])
+            })
+
+
+def with_timestamps(detector: IncrementalPatternDetector, patterns: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Add candle timestamps to patterns; indices are positions in the
+    detector's buffer, which means nothing to a client on its own
+    """
+    timestamps = detector.view().timestamp
+    return [
+        {
+            **pattern,
+            'start_timestamp': int(timestamps[pattern['start_index']]),
+            'center_timestamp': int(timestamps[pattern['center_index']]),
+            'end_timestamp': int(timestamps[pattern['end_index']])
+        }
+        for pattern in patterns
+    ]
+
+
+def parse_symbols(raw: str, limit: int) -> List[str]:
+    """Comma-separated symbols, upper-cased and de-duplicated in order"""
+    symbols = list(dict.fromkeys(symbol.strip().upper() for symbol in raw.split(',') if symbol.strip()))
+    if not symbols:
+        raise ValueError("At least one symbol is required")
+    if len(symbols) > limit:
+        raise ValueError(f"At most {limit} symbols can be streamed at once")
+    return symbols
+
+
+def format_sse(event: Dict[str, Any]) -> bytes:
+    """Server-Sent Events frame; the event type becomes the SSE event name"""
+    data = orjson.dumps(event, option=orjson.OPT_SERIALIZE_NUMPY)
+    return b"event: " + event['type'].encode() + b"\ndata: " + data + b"\n\n"
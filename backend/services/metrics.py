@@ -0,0 +1,264 @@
+"""
+In-process metrics rendered in the Prometheus text exposition format.
+
+Counters and histograms live in a registry for the lifetime of the worker;
+values owned by other services (LRU counters, writer queue depth) are read
+through callbacks at scrape time. `stage()` times a named step of the
+current request, feeding a histogram and, when a request has opted in, the
+Server-Timing header.
+"""
+import bisect
+import contextvars
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Seconds; spans a cached lookup up to a rate-limit backoff
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names: Tuple[str, ...], values: LabelValues, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(str(value))}"' for name, value in pairs) + '}'
+
+
+class Metric:
+    type_name = 'untyped'
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(Metric):
+    type_name = 'counter'
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in values]
+
+
+class Histogram(Metric):
+    type_name = 'histogram'
+
+    def __init__(
+        self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+        buckets: Tuple[float, ...] = DEFAULT_BUCKETS
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: per-bucket (non-cumulative) counts, sum, count
+        self._values: Dict[LabelValues, Tuple[List[int], float, int]] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts, total, count = self._values.get(key) or ([0] * (len(self.buckets) + 1), 0.0, 0)
+            counts[bisect.bisect_left(self.buckets, value)] += 1
+            self._values[key] = (counts, total + value, count + 1)
+
+    @contextmanager
+    def time(self, **labels) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels) -> int:
+        entry = self._values.get(self._key(labels))
+        return entry[2] if entry else 0
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = sorted((key, (list(counts), total, count)) for key, (counts, total, count) in self._values.items())
+        lines = []
+        for key, (counts, total, count) in values:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (math.inf,), counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.labelnames, key, ('le', _format_value(bound)))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class CallbackMetric(Metric):
+    """Counter or gauge whose values are read from another object at scrape time"""
+
+    def __init__(
+        self, name: str, documentation: str, callback: Callable[[], Dict[LabelValues, float]],
+        labelnames: Tuple[str, ...] = (), type_name: str = 'gauge'
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.callback = callback
+        self.type_name = type_name
+
+    def samples(self) -> List[str]:
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in sorted(self.callback().items())
+        ]
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        # Re-registering (e.g. a module reloaded in tests) replaces the old metric
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def histogram(
+        self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+        buckets: Tuple[float, ...] = DEFAULT_BUCKETS
+    ) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def callback(
+        self, name: str, documentation: str, callback: Callable[[], Dict[LabelValues, float]],
+        labelnames: Tuple[str, ...] = (), type_name: str = 'gauge'
+    ) -> CallbackMetric:
+        return self.register(CallbackMetric(name, documentation, callback, labelnames, type_name))
+
+    def get(self, name: str) -> Optional[Metric]:
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.header())
+            lines.extend(metric.samples())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = MetricsRegistry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    'stage_duration_seconds', 'Time spent in each processing stage', ('stage',)
+)
+UPSTREAM_REQUESTS = REGISTRY.counter(
+    'coingecko_requests_total', 'Upstream CoinGecko responses by endpoint and status', ('endpoint', 'status')
+)
+UPSTREAM_SECONDS = REGISTRY.histogram(
+    'coingecko_request_duration_seconds', 'Upstream CoinGecko request latency', ('endpoint',)
+)
+UPSTREAM_RATE_LIMITED = REGISTRY.counter(
+    'coingecko_rate_limited_total', 'Upstream 429 responses', ('endpoint',)
+)
+UPSTREAM_WAIT_SECONDS = REGISTRY.histogram(
+    'coingecko_wait_seconds', 'Time spent waiting before upstream requests', ('reason',)
+)
+FALLBACK_DATA = REGISTRY.counter(
+    'coingecko_fallback_total', 'Series answered with generated fallback data', ('symbol',)
+)
+CACHE_LOOKUPS = REGISTRY.counter(
+    'ohlcv_cache_lookups_total', 'OHLCV series lookups by the tier that answered', ('tier',)
+)
+MONGO_OPERATIONS = REGISTRY.counter(
+    'mongo_operations_total', 'MongoDB operations by collection and operation', ('collection', 'operation')
+)
+MONGO_SECONDS = REGISTRY.histogram(
+    'mongo_operation_duration_seconds', 'MongoDB operation latency', ('collection', 'operation')
+)
+
+# Stage timings of the request being served, when Server-Timing is enabled
+_request_timings: contextvars.ContextVar[Optional[List[Tuple[str, float]]]] = contextvars.ContextVar(
+    'request_timings', default=None
+)
+
+
+def upstream_endpoint(url: str) -> str:
+    """Low-cardinality endpoint label: the last path segment (ohlc, market_chart, price)"""
+    return url.rstrip('/').rsplit('/', 1)[-1]
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_SECONDS.observe(elapsed, stage=name)
+        timings = _request_timings.get()
+        if timings is not None:
+            timings.append((name, elapsed))
+
+
+@contextmanager
+def mongo_operation(collection: str, operation: str) -> Iterator[None]:
+    MONGO_OPERATIONS.inc(collection=collection, operation=operation)
+    with MONGO_SECONDS.time(collection=collection, operation=operation):
+        yield
+
+
+def start_request_timings() -> List[Tuple[str, float]]:
+    """Collect stage() timings for the current request (and tasks it spawns)"""
+    timings: List[Tuple[str, float]] = []
+    _request_timings.set(timings)
+    return timings
+
+
+def server_timing_header(timings: List[Tuple[str, float]], total: float) -> str:
+    """Server-Timing value; repeated stages (e.g. per batch item) are summed"""
+    merged: Dict[str, float] = {}
+    for name, elapsed in timings:
+        merged[name] = merged.get(name, 0.0) + elapsed
+    entries = [f"{name};dur={elapsed * 1000:.2f}" for name, elapsed in merged.items()]
+    entries.append(f"total;dur={total * 1000:.2f}")
+    return ', '.join(entries)
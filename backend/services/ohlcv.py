@@ -0,0 +1,184 @@
+import uuid
+import numpy as np
+from dataclasses import dataclass
+from datetime import datetime
+from typing import List, Dict, Any
+
+
+@dataclass
+class OHLCVSeries:
+    """
+    Array-backed OHLCV candles for a single symbol.
+    Timestamps are epoch milliseconds (int64), prices and volume are float64.
+    interval_ms is the candle granularity (0 when unknown); is_fallback marks
+    generated stand-in data that must never be cached or persisted.
+    """
+    symbol: str
+    timestamp: np.ndarray
+    open: np.ndarray
+    high: np.ndarray
+    low: np.ndarray
+    close: np.ndarray
+    volume: np.ndarray
+    interval_ms: int = 0
+    is_fallback: bool = False
+
+    PRICE_COLUMNS = ('open', 'high', 'low', 'close', 'volume')
+
+    def __post_init__(self):
+        self.symbol = self.symbol.upper()
+        self.timestamp = np.ascontiguousarray(self.timestamp, dtype=np.int64)
+        for name in self.PRICE_COLUMNS:
+            setattr(self, name, np.ascontiguousarray(getattr(self, name), dtype=np.float64))
+
+    def __len__(self) -> int:
+        return len(self.timestamp)
+
+    def __getitem__(self, index: slice) -> 'OHLCVSeries':
+        """Slice the series; the result shares memory with this one"""
+        if not isinstance(index, slice):
+            raise TypeError("OHLCVSeries only supports slicing")
+        return OHLCVSeries(
+            self.symbol,
+            self.timestamp[index],
+            *(getattr(self, name)[index] for name in self.PRICE_COLUMNS),
+            interval_ms=self.interval_ms,
+            is_fallback=self.is_fallback
+        )
+
+    @property
+    def nbytes(self) -> int:
+        return self.timestamp.nbytes + sum(getattr(self, name).nbytes for name in self.PRICE_COLUMNS)
+
+    def since(self, start_ts: int) -> 'OHLCVSeries':
+        """Candles with timestamp >= start_ts (a view, no copy)"""
+        return self[int(np.searchsorted(self.timestamp, start_ts, side='left')):]
+
+    def merge(self, newer: 'OHLCVSeries') -> 'OHLCVSeries':
+        """Append newer candles; where the two overlap, newer wins"""
+        if not len(newer):
+            return self
+        head = self[:int(np.searchsorted(self.timestamp, newer.timestamp[0], side='left'))]
+        return OHLCVSeries(
+            self.symbol,
+            np.concatenate([head.timestamp, newer.timestamp]),
+            *(np.concatenate([getattr(head, name), getattr(newer, name)]) for name in self.PRICE_COLUMNS),
+            interval_ms=self.interval_ms or newer.interval_ms
+        )
+
+    @classmethod
+    def empty(cls, symbol: str, interval_ms: int = 0) -> 'OHLCVSeries':
+        return cls(symbol, *([] for _ in range(6)), interval_ms=interval_ms)
+
+    @classmethod
+    def from_documents(cls, symbol: str, documents: List[Dict[str, Any]], interval_ms: int = 0) -> 'OHLCVSeries':
+        """Build a series from crypto_data documents (CryptoData field names)"""
+        return cls(
+            symbol,
+            [doc['timestamp'] for doc in documents],
+            [doc['open_price'] for doc in documents],
+            [doc['high_price'] for doc in documents],
+            [doc['low_price'] for doc in documents],
+            [doc['close_price'] for doc in documents],
+            [doc.get('volume', 0) for doc in documents],
+            interval_ms=interval_ms
+        )
+
+    def dates(self) -> List[str]:
+        """Calendar date (local time) of each candle, as YYYY-MM-DD"""
+        return [
+            datetime.fromtimestamp(ts / 1000).strftime('%Y-%m-%d')
+            for ts in self.timestamp.tolist()
+        ]
+
+    def to_rows(self) -> List[Dict[str, Any]]:
+        """Per-candle dicts in the shape the API exposes; only build these at the edge"""
+        columns = zip(
+            self.dates(),
+            self.timestamp.tolist(),
+            *(getattr(self, name).tolist() for name in self.PRICE_COLUMNS)
+        )
+        return [
+            {
+                'symbol': self.symbol,
+                'date': date,
+                'timestamp': timestamp,
+                'open': open_price,
+                'high': high,
+                'low': low,
+                'close': close,
+                'volume': volume
+            }
+            for date, timestamp, open_price, high, low, close, volume in columns
+        ]
+
+    def to_documents(self) -> List[Dict[str, Any]]:
+        """crypto_data documents (CryptoData field names) built straight from the columns"""
+        created_at = datetime.utcnow()
+        columns = zip(
+            self.dates(),
+            self.timestamp.tolist(),
+            *(getattr(self, name).tolist() for name in self.PRICE_COLUMNS)
+        )
+        return [
+            {
+                'id': str(uuid.uuid4()),
+                'symbol': self.symbol,
+                'date': date,
+                'timestamp': timestamp,
+                'open_price': open_price,
+                'high_price': high,
+                'low_price': low,
+                'close_price': close,
+                'volume': volume,
+                'interval_ms': self.interval_ms,
+                'created_at': created_at
+            }
+            for date, timestamp, open_price, high, low, close, volume in columns
+        ]
+
+
+class OHLCVBuffer:
+    """
+    Growable columnar candle buffer for one symbol.
+    Capacity doubles as candles are appended, so appends are amortized O(k);
+    view() exposes the filled part as an OHLCVSeries without copying.
+    """
+
+    COLUMNS = ('timestamp',) + OHLCVSeries.PRICE_COLUMNS
+
+    def __init__(self, symbol: str, capacity: int = 1024, interval_ms: int = 0):
+        self.symbol = symbol.upper()
+        self.interval_ms = interval_ms
+        self._size = 0
+        self._columns = {
+            name: np.empty(capacity, dtype=np.int64 if name == 'timestamp' else np.float64)
+            for name in self.COLUMNS
+        }
+
+    def __len__(self) -> int:
+        return self._size
+
+    def view(self) -> OHLCVSeries:
+        return OHLCVSeries(
+            self.symbol,
+            *(self._columns[name][:self._size] for name in self.COLUMNS),
+            interval_ms=self.interval_ms
+        )
+
+    def truncate(self, size: int):
+        self._size = min(self._size, max(0, size))
+
+    def extend(self, candles: OHLCVSeries):
+        needed = self._size + len(candles)
+        capacity = len(self._columns['timestamp'])
+        if needed > capacity:
+            capacity = max(needed, capacity * 2)
+            for name in self.COLUMNS:
+                grown = np.empty(capacity, dtype=self._columns[name].dtype)
+                grown[:self._size] = self._columns[name][:self._size]
+                self._columns[name] = grown
+        for name in self.COLUMNS:
+            self._columns[name][self._size:needed] = getattr(candles, name)
+        self._size = needed
+        self.interval_ms = self.interval_ms or candles.interval_ms
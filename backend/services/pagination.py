@@ -0,0 +1,74 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from pymongo import DESCENDING
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(values: List[Any]) -> str:
+    """Opaque cursor holding the sort-key values of the last returned document"""
+    payload = [
+        {'$dt': value.isoformat()} if isinstance(value, datetime) else value
+        for value in values
+    ]
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str, size: int) -> List[Any]:
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        values = [
+            datetime.fromisoformat(value['$dt']) if isinstance(value, dict) else value
+            for value in payload
+        ]
+    except (ValueError, TypeError, KeyError) as e:
+        raise InvalidCursor(f"Invalid cursor: {cursor}") from e
+    if len(values) != size:
+        raise InvalidCursor(f"Invalid cursor: {cursor}")
+    return values
+
+
+def keyset_filter(sort: List[Tuple[str, int]], values: List[Any]) -> Dict[str, Any]:
+    """
+    Filter for documents strictly after `values` in `sort` order, e.g. for
+    [(a, -1), (b, -1)]: a < va OR (a == va AND b < vb).
+    """
+    clauses = []
+    for position, (field, direction) in enumerate(sort):
+        clause = {prev_field: values[i] for i, (prev_field, _) in enumerate(sort[:position])}
+        clause[field] = {'$lt' if direction == DESCENDING else '$gt': values[position]}
+        clauses.append(clause)
+    return {'$or': clauses}
+
+
+async def paginate(
+    collection,
+    query: Dict[str, Any],
+    sort: List[Tuple[str, int]],
+    limit: int,
+    cursor: Optional[str] = None,
+    projection: Optional[Dict[str, int]] = None
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    One keyset page: the documents and the cursor for the next page (None on
+    the last page). The last sort field must be unique to break ties.
+    """
+    if cursor:
+        query = {'$and': [query, keyset_filter(sort, decode_cursor(cursor, len(sort)))]}
+    
+    documents = []
+    async for document in collection.find(query, projection or {'_id': 0}).sort(sort).limit(limit + 1):
+        documents.append(document)
+    
+    next_cursor = None
+    if len(documents) > limit:
+        documents = documents[:limit]
+        next_cursor = encode_cursor([documents[-1].get(field) for field, _ in sort])
+    return documents, next_cursor
+
@@ -0,0 +1,256 @@
+import logging
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from services.ohlcv import OHLCVSeries
+
+logger = logging.getLogger(__name__)
+
+HIGH = 1
+LOW = -1
+
+
+@dataclass
+class ExtremaIndex:
+    """
+    Swing highs and lows of a price series, computed in one pass.
+    
+    A swing high is a bar whose price is the maximum of the `order` bars on
+    either side (first bar of a plateau only); swing lows mirror that.
+    `pivots` merges both into one alternating high/low sequence, keeping the
+    more extreme bar when two of the same kind follow each other, which is
+    what the chart-pattern detectors match against.
+    """
+    prices: np.ndarray
+    highs: np.ndarray
+    lows: np.ndarray
+    pivots: np.ndarray
+    pivot_kinds: np.ndarray
+    order: int
+    
+    @property
+    def pivot_prices(self) -> np.ndarray:
+        return self.prices[self.pivots]
+    
+    @classmethod
+    def build(cls, prices: np.ndarray, order: int = 3) -> 'ExtremaIndex':
+        n = len(prices)
+        width = 2 * order + 1
+        if n < width:
+            empty = np.array([], dtype=np.int64)
+            return cls(prices, empty, empty, empty, empty, order)
+        
+        windows = sliding_window_view(prices, width)
+        centers = np.arange(order, n - order)
+        center_prices = prices[centers]
+        previous = prices[centers - 1]
+        highs = centers[(center_prices == windows.max(axis=1)) & (center_prices > previous)]
+        lows = centers[(center_prices == windows.min(axis=1)) & (center_prices < previous)]
+        
+        indices = np.concatenate([highs, lows])
+        kinds = np.concatenate([np.full(len(highs), HIGH), np.full(len(lows), LOW)])
+        order_by_index = np.argsort(indices, kind='stable')
+        pivots, pivot_kinds = cls._alternate(prices, indices[order_by_index], kinds[order_by_index])
+        
+        return cls(prices, highs, lows, pivots, pivot_kinds, order)
+    
+    @staticmethod
+    def _alternate(prices: np.ndarray, indices: np.ndarray, kinds: np.ndarray):
+        """Collapse runs of same-kind extrema to their most extreme bar"""
+        if len(indices) == 0:
+            return indices, kinds
+        run_starts = np.flatnonzero(np.r_[True, kinds[1:] != kinds[:-1]])
+        run_ids = np.repeat(np.arange(len(run_starts)), np.diff(np.r_[run_starts, len(kinds)]))
+        signed = prices[indices] * kinds
+        
+        # Per run, the bar with the largest signed price (highest high or
+        # lowest low); ties go to the earliest bar
+        order = np.lexsort((np.arange(len(indices)), -signed, run_ids))
+        best = order[np.r_[True, run_ids[order][1:] != run_ids[order][:-1]]]
+        return indices[best], kinds[best]
+
+
+class PatternDetector:
+    """
+    Base class for detectors that match on an ExtremaIndex.
+    Subclasses describe the pivot `shape` they look for (e.g. HIGH, LOW, HIGH)
+    and implement _match() over every run of pivots with that shape.
+    """
+    name = ''
+    pattern_type = ''
+    signal = ''
+    shape: tuple = ()
+    
+    def __init__(self, tolerance: float = 0.03, min_prominence: float = 0.03):
+        self.tolerance = tolerance
+        self.min_prominence = min_prominence
+    
+    def detect(self, series: OHLCVSeries, extrema: ExtremaIndex) -> List[Dict[str, Any]]:
+        size = len(self.shape)
+        if len(extrema.pivots) < size:
+            return []
+        
+        kinds = sliding_window_view(extrema.pivot_kinds, size)
+        starts = np.flatnonzero((kinds == np.array(self.shape)).all(axis=1))
+        if starts.size == 0:
+            return []
+        
+        indices = sliding_window_view(extrema.pivots, size)[starts]
+        prices = extrema.prices[indices]
+        mask, confidence, prominence = self._match(prices)
+        
+        strength = np.where(prominence > 0.08, "Strong", np.where(prominence > 0.05, "Moderate", "Weak"))
+        points = self._points(prices)
+        center = indices[:, size // 2]
+        
+        return [
+            {
+                'symbol': series.symbol,
+                'pattern_type': self.pattern_type,
+                'left_shoulder': float(points[k, 0]),
+                'head': float(points[k, 1]),
+                'right_shoulder': float(points[k, 2]),
+                'confidence': int(confidence[k]),
+                'signal': self.signal,
+                'strength': str(strength[k]),
+                'start_index': int(indices[k, 0]),
+                'center_index': int(center[k]),
+                'end_index': int(indices[k, -1])
+            }
+            for k in np.flatnonzero(mask).tolist()
+        ]
+    
+    def _points(self, prices: np.ndarray) -> np.ndarray:
+        """The three prices reported as left_shoulder/head/right_shoulder"""
+        return prices[:, [0, len(self.shape) // 2, -1]]
+    
+    def _match(self, prices: np.ndarray):
+        """Return (mask, confidence, prominence) arrays for each pivot run"""
+        raise NotImplementedError
+    
+    def _score(self, similarity: np.ndarray, prominence: np.ndarray) -> np.ndarray:
+        """Same scoring scale as the head-and-shoulders detector"""
+        confidence = np.full(len(similarity), 60)
+        confidence += np.where(similarity < self.tolerance, 20, np.where(similarity < 5 / 3 * self.tolerance, 10, 0))
+        confidence += np.where(prominence > 0.05, 15, np.where(prominence > self.min_prominence, 10, 0))
+        return np.minimum(confidence, 95)
+
+
+class HeadAndShouldersTopDetector(PatternDetector):
+    name = 'head_and_shoulders_top'
+    pattern_type = 'Head & Shoulders Top'
+    signal = 'Bearish Reversal'
+    shape = (HIGH, LOW, HIGH, LOW, HIGH)
+    
+    def _points(self, prices):
+        return prices[:, [0, 2, 4]]
+    
+    def _match(self, prices):
+        left, head, right = prices[:, 0], prices[:, 2], prices[:, 4]
+        shoulders = np.maximum(left, right)
+        similarity = np.abs(left - right) / shoulders
+        prominence = (head - shoulders) / head
+        mask = (head > shoulders) & (similarity < 5 / 3 * self.tolerance)
+        return mask, self._score(similarity, prominence), prominence
+
+
+class InverseHeadAndShouldersDetector(PatternDetector):
+    """Matched on swing lows: the head is the lowest trough"""
+    name = 'inverse_head_and_shoulders'
+    pattern_type = 'Inverse Head & Shoulders'
+    signal = 'Bullish Reversal'
+    shape = (LOW, HIGH, LOW, HIGH, LOW)
+    
+    def _points(self, prices):
+        return prices[:, [0, 2, 4]]
+    
+    def _match(self, prices):
+        left, head, right = prices[:, 0], prices[:, 2], prices[:, 4]
+        shoulders = np.minimum(left, right)
+        similarity = np.abs(left - right) / np.maximum(left, right)
+        prominence = (shoulders - head) / shoulders
+        mask = (head < shoulders) & (similarity < 5 / 3 * self.tolerance)
+        return mask, self._score(similarity, prominence), prominence
+
+
+class DoubleTopDetector(PatternDetector):
+    """left_shoulder/right_shoulder are the two tops, head is the valley between"""
+    name = 'double_top'
+    pattern_type = 'Double Top'
+    signal = 'Bearish Reversal'
+    shape = (HIGH, LOW, HIGH)
+    
+    def _match(self, prices):
+        first, valley, second = prices[:, 0], prices[:, 1], prices[:, 2]
+        tops = np.maximum(first, second)
+        similarity = np.abs(first - second) / tops
+        prominence = (tops - valley) / tops
+        mask = (similarity < self.tolerance) & (prominence > self.min_prominence)
+        return mask, self._score(similarity, prominence), prominence
+
+
+class DoubleBottomDetector(PatternDetector):
+    """left_shoulder/right_shoulder are the two bottoms, head is the peak between"""
+    name = 'double_bottom'
+    pattern_type = 'Double Bottom'
+    signal = 'Bullish Reversal'
+    shape = (LOW, HIGH, LOW)
+    
+    def _match(self, prices):
+        first, peak, second = prices[:, 0], prices[:, 1], prices[:, 2]
+        bottoms = np.minimum(first, second)
+        similarity = np.abs(first - second) / np.maximum(first, second)
+        prominence = (peak - bottoms) / peak
+        mask = (similarity < self.tolerance) & (prominence > self.min_prominence)
+        return mask, self._score(similarity, prominence), prominence
+
+
+class TripleTopDetector(PatternDetector):
+    """left_shoulder/head/right_shoulder are the first, second and third tops"""
+    name = 'triple_top'
+    pattern_type = 'Triple Top'
+    signal = 'Bearish Reversal'
+    shape = (HIGH, LOW, HIGH, LOW, HIGH)
+    
+    def _points(self, prices):
+        return prices[:, [0, 2, 4]]
+    
+    def _match(self, prices):
+        tops = prices[:, [0, 2, 4]]
+        highest = tops.max(axis=1)
+        similarity = (highest - tops.min(axis=1)) / highest
+        prominence = (tops.min(axis=1) - prices[:, [1, 3]].max(axis=1)) / highest
+        mask = (similarity < self.tolerance) & (prominence > self.min_prominence)
+        return mask, self._score(similarity, prominence), prominence
+
+
+PATTERN_DETECTORS: Dict[str, PatternDetector] = {}
+
+
+def register_detector(detector: PatternDetector) -> PatternDetector:
+    """Make a detector available to PatternDetectionService.detect_patterns by name"""
+    PATTERN_DETECTORS[detector.name] = detector
+    return detector
+
+
+for _detector_class in (
+    HeadAndShouldersTopDetector,
+    InverseHeadAndShouldersDetector,
+    DoubleTopDetector,
+    DoubleBottomDetector,
+    TripleTopDetector,
+):
+    register_detector(_detector_class())
+
+
+def get_detectors(names: Optional[List[str]] = None) -> List[PatternDetector]:
+    """Registered detectors by name (all when names is None); unknown names raise KeyError"""
+    if names is None:
+        return list(PATTERN_DETECTORS.values())
+    unknown = [name for name in names if name not in PATTERN_DETECTORS]
+    if unknown:
+        raise KeyError(f"Unknown pattern types: {', '.join(unknown)}")
+    return [PATTERN_DETECTORS[name] for name in names]
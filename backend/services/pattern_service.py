@@ -1,42 +1,309 @@
+import bisect
 import logging
-from typing import List, Dict, Any
+import numbers
+from dataclasses import dataclass
+from typing import List, Dict, Any, Optional, Tuple
 import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from services.metrics import stage
+from services.ohlcv import OHLCVSeries
+from services.pattern_detectors import ExtremaIndex, get_detectors
 
 logger = logging.getLogger(__name__)
 
+@dataclass(frozen=True)
+class DetectionConfig:
+    """
+    Tunable head-and-shoulders thresholds; the defaults are the detector's
+    original constants. Windows are (start, end) offsets from the center,
+    end exclusive.
+    """
+    left_window: Tuple[int, int] = (-12, -6)
+    head_window: Tuple[int, int] = (-3, 3)
+    right_window: Tuple[int, int] = (6, 12)
+    # Candidates scoring below this are discarded
+    min_confidence: int = 60
+    # Shoulder height difference earning +20 / +10 confidence
+    shoulder_tight: float = 0.03
+    shoulder_loose: float = 0.05
+    # Head prominence over the higher shoulder earning +15 / +10 confidence
+    prominence_high: float = 0.05
+    prominence_low: float = 0.03
+    volume_threshold: float = 1000000
+    # Patterns whose centers are closer than this overlap
+    overlap_radius: int = 10
+    
+    def __post_init__(self):
+        # TypeError for values of the wrong type, ValueError for bad ranges
+        for window in (self.left_window, self.head_window, self.right_window):
+            if not isinstance(window, (tuple, list)) or len(window) != 2 or not all(map(_is_int, window)):
+                raise TypeError(f"Search windows must be two integers, got {window!r}")
+            if window[0] >= window[1]:
+                raise ValueError(f"Invalid search window {window}")
+        for name in ('min_confidence', 'overlap_radius'):
+            if not _is_int(getattr(self, name)):
+                raise TypeError(f"{name} must be an integer, got {getattr(self, name)!r}")
+        for name in ('shoulder_tight', 'shoulder_loose', 'prominence_high', 'prominence_low', 'volume_threshold'):
+            value = getattr(self, name)
+            if not _is_number(value):
+                raise TypeError(f"{name} must be a number, got {value!r}")
+            if not 0 <= value < float('inf'):
+                raise ValueError(f"{name} must be a non-negative finite number")
+        if not 0 <= self.min_confidence <= 100:
+            raise ValueError("min_confidence must be between 0 and 100")
+        if self.shoulder_tight > self.shoulder_loose or self.prominence_low > self.prominence_high:
+            raise ValueError("Tight/low cutoffs must not exceed loose/high cutoffs")
+        if self.overlap_radius < 1:
+            raise ValueError("overlap_radius must be at least 1")
+    
+    @property
+    def windows(self) -> Tuple[Tuple[int, int], ...]:
+        return self.left_window, self.head_window, self.right_window
+    
+    @property
+    def margin(self) -> int:
+        """
+        Candles a center needs on either side. Nothing its evaluation reads
+        lies further away: the widest window reach (or the trend lookback),
+        plus 2 for the peak adjustment and 1 for the local peak check.
+        """
+        reach = max(max(-start, end) for start, end in self.windows)
+        return max(reach, TREND_LOOKBACK) + 3
+
+
+# Candles looked back to decide between a top and an inverse pattern
+TREND_LOOKBACK = 5
+
+
+def _is_int(value) -> bool:
+    return isinstance(value, numbers.Integral) and not isinstance(value, bool)
+
+
+def _is_number(value) -> bool:
+    return isinstance(value, numbers.Real) and not isinstance(value, bool)
+
+
 class PatternDetectionService:
     
-    def __init__(self):
-        pass
+    def __init__(self, config: Optional[DetectionConfig] = None):
+        self.config = config or DetectionConfig()
     
-    def detect_head_and_shoulders(self, data: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    def detect_head_and_shoulders(self, data: OHLCVSeries, vectorized: bool = True) -> List[Dict[str, Any]]:
         """
-        Detect Head and Shoulders patterns in crypto data
+        Detect Head and Shoulders patterns in crypto data.
+        The vectorized engine is the default; vectorized=False runs the
+        per-index scalar reference implementation.
         """
-        if not data or len(data) < 20:
+        if data is None or len(data) < 20:
             return []
         
+        with stage('detect_candidates'):
+            if vectorized:
+                patterns = self._detect_candidates_vectorized(data)
+            else:
+                patterns = self._detect_candidates_scalar(data)
+        
+        # Remove overlapping patterns (keep the one with highest confidence)
+        with stage('detect_prune'):
+            patterns = self._remove_overlapping_patterns(patterns)
+        
+        return patterns
+    
+    def scan(self, data: OHLCVSeries, chunk_size: int = 100000) -> List[Dict[str, Any]]:
+        """
+        detect_head_and_shoulders for long series, e.g. memory-mapped slices
+        from the candle store. Candidates are generated chunk by chunk so the
+        temporary arrays stay bounded however many years are scanned.
+        """
+        if data is None or len(data) < 20:
+            return []
+        
+        patterns = []
+        with stage('detect_candidates'):
+            for first_center in range(0, len(data), chunk_size):
+                patterns.extend(self._detect_candidates_vectorized(data, first_center, first_center + chunk_size))
+        
+        with stage('detect_prune'):
+            return self._remove_overlapping_patterns(patterns)
+    
+    def detect_patterns(
+        self, data: OHLCVSeries, pattern_types: Optional[List[str]] = None, order: int = 3
+    ) -> List[Dict[str, Any]]:
+        """
+        Run registered chart-pattern detectors (all when pattern_types is None).
+        The swing-high/low extrema index is built once and shared by every
+        detector, so extra pattern types only add cheap pivot matching.
+        """
+        detectors = get_detectors(pattern_types)
+        if data is None or len(data) < 20:
+            return []
+        
+        with stage('detect_extrema'):
+            extrema = ExtremaIndex.build(data.close, order)
         patterns = []
-        prices = [float(item['close']) for item in data]
+        for detector in detectors:
+            with stage(f'detect_{detector.name}'):
+                patterns.extend(self._remove_overlapping_patterns(detector.detect(data, extrema)))
+        
+        return patterns
+    
+    def _detect_candidates_scalar(self, data: OHLCVSeries) -> List[Dict[str, Any]]:
+        """Reference implementation: evaluate every center index one at a time"""
+        patterns = []
+        prices = data.close.tolist()
         
         # Look for head and shoulders patterns
-        for i in range(15, len(data) - 15):
+        margin = self.config.margin
+        for i in range(margin, len(data) - margin):
             pattern = self._analyze_head_and_shoulders_at_index(data, prices, i)
             if pattern:
                 patterns.append(pattern)
         
-        # Remove overlapping patterns (keep the one with highest confidence)
-        patterns = self._remove_overlapping_patterns(patterns)
+        return patterns
+    
+    def _detect_candidates_vectorized(
+        self,
+        data: OHLCVSeries,
+        first_center: int = 0,
+        stop_center: Optional[int] = None,
+        window_peaks: Optional[Dict[int, Tuple[np.ndarray, np.ndarray]]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Evaluate center indices in [first_center, stop_center) at once with NumPy.
+        Mirrors _detect_candidates_scalar exactly, including the peak
+        adjustment done by _find_peak_in_window. window_peaks optionally
+        holds precomputed window_peak_tables() of `data`, keyed by width.
+        """
+        config = self.config
+        margin = config.margin
+        n = len(data)
+        first_center = max(margin, first_center)
+        stop_center = n - margin if stop_center is None else min(stop_center, n - margin)
+        if first_center >= stop_center:
+            return []
+        
+        # Work on the slice the requested centers can see; the margin on
+        # either side keeps the local peak checks identical to a full scan
+        offset = first_center - margin
+        end = min(n, stop_center + margin)
+        prices = data.close[offset:end]
+        volumes = data.volume[offset:end]
+        centers = np.arange(first_center, stop_center) - offset
+        
+        # One table of window peaks (indexed by window start) per distinct
+        # window width serves every window of that width
+        tables = {}
+        for start, stop in config.windows:
+            width = stop - start
+            if width in tables:
+                continue
+            if window_peaks is not None and width in window_peaks:
+                table_prices, table_indices = window_peaks[width]
+                tables[width] = (table_prices[offset:], table_indices[offset:] - offset)
+            else:
+                tables[width] = self._window_peaks(prices, width)
+        
+        def window_peak(window):
+            table_prices, table_indices = tables[window[1] - window[0]]
+            return table_prices[centers + window[0]], table_indices[centers + window[0]]
+        
+        left_price, left_idx = window_peak(config.left_window)
+        head_price, head_idx = window_peak(config.head_window)
+        right_price, right_idx = window_peak(config.right_window)
+        
+        mask = (head_price > left_price) & (head_price > right_price)
+        
+        shoulder_max = np.maximum(left_price, right_price)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            shoulder_diff = np.abs(left_price - right_price) / shoulder_max
+            head_prominence = (head_price - shoulder_max) / head_price
+        
+        confidence = np.full(centers.size, 60)
+        confidence += np.where(
+            shoulder_diff < config.shoulder_tight, 20, np.where(shoulder_diff < config.shoulder_loose, 10, 0)
+        )
+        confidence += np.where(
+            head_prominence > config.prominence_high, 15, np.where(head_prominence > config.prominence_low, 10, 0)
+        )
+        confidence += np.where(volumes[centers] > config.volume_threshold, 5, 0)
+        confidence = np.minimum(confidence, 95)
+        mask &= confidence >= config.min_confidence
+        
+        recent_trend = prices[centers] - prices[centers - TREND_LOOKBACK]
+        strength = np.where(
+            head_prominence > 0.08, "Strong",
+            np.where(head_prominence > 0.05, "Moderate", "Weak")
+        )
+        
+        symbol = data.symbol
+        patterns = []
+        for k in np.flatnonzero(mask).tolist():
+            if recent_trend[k] > 0:
+                pattern_type, signal = "Head & Shoulders Top", "Bearish Reversal"
+            else:
+                pattern_type, signal = "Inverse Head & Shoulders", "Bullish Reversal"
+            
+            patterns.append({
+                'symbol': symbol,
+                'pattern_type': pattern_type,
+                'left_shoulder': float(left_price[k]),
+                'head': float(head_price[k]),
+                'right_shoulder': float(right_price[k]),
+                'confidence': int(confidence[k]),
+                'signal': signal,
+                'strength': str(strength[k]),
+                'start_index': int(left_idx[k]) + offset,
+                'center_index': int(centers[k]) + offset,
+                'end_index': int(right_idx[k]) + offset
+            })
         
         return patterns
     
-    def _analyze_head_and_shoulders_at_index(self, data: List[Dict], prices: List[float], center_idx: int) -> Dict[str, Any]:
+    def window_peak_tables(self, data: OHLCVSeries, widths=None) -> Dict[int, Tuple[np.ndarray, np.ndarray]]:
+        """
+        _window_peaks over the whole series for each window width (those of
+        this service's config by default). Configs with the same window
+        widths can share one set of tables.
+        """
+        if widths is None:
+            widths = {stop - start for start, stop in self.config.windows}
+        return {width: self._window_peaks(data.close, width) for width in sorted(set(widths))}
+    
+    @staticmethod
+    def _window_peaks(prices: np.ndarray, width: int):
+        """
+        Vectorized _find_peak_in_window for every window prices[s:s + width].
+        Returns (peak_prices, peak_indices) indexed by window start s.
+        """
+        n = len(prices)
+        windows = sliding_window_view(prices, width)
+        starts = np.arange(len(windows))
+        max_idx = starts + windows.argmax(axis=1)
+        
+        is_peak = np.zeros(n, dtype=bool)
+        is_peak[1:-1] = (prices[1:-1] > prices[:-2]) & (prices[1:-1] > prices[2:])
+        
+        # When the window maximum is not a strict local peak, take the first
+        # strict peak within +/-2 of it, falling back to the maximum itself
+        nearby = np.clip(max_idx[:, None] + np.arange(-2, 3), 0, n - 1)
+        nearby_peak = is_peak[nearby]
+        first_nearby = nearby[starts, nearby_peak.argmax(axis=1)]
+        adjusted = np.where(nearby_peak.any(axis=1), first_nearby, max_idx)
+        
+        interior = (max_idx > 0) & (max_idx < n - 1)
+        peak_indices = np.where(interior & ~is_peak[max_idx], adjusted, max_idx)
+        
+        return prices[peak_indices], peak_indices
+    
+    def _analyze_head_and_shoulders_at_index(self, data: OHLCVSeries, prices: List[float], center_idx: int) -> Dict[str, Any]:
         """Analyze potential head and shoulders pattern at given index"""
         
         # Define search windows
-        left_shoulder_window = (center_idx - 12, center_idx - 6)
-        head_window = (center_idx - 3, center_idx + 3)
-        right_shoulder_window = (center_idx + 6, center_idx + 12)
+        config = self.config
+        left_shoulder_window = (center_idx + config.left_window[0], center_idx + config.left_window[1])
+        head_window = (center_idx + config.head_window[0], center_idx + config.head_window[1])
+        right_shoulder_window = (center_idx + config.right_window[0], center_idx + config.right_window[1])
         
         # Find peaks in each window
         left_shoulder = self._find_peak_in_window(prices, *left_shoulder_window)
@@ -55,16 +322,16 @@ class PatternDetectionService:
             return None
         
         # Calculate pattern characteristics
-        confidence = self._calculate_confidence(left_price, head_price, right_price, data[center_idx])
+        confidence = self._calculate_confidence(left_price, head_price, right_price, float(data.volume[center_idx]))
         
-        if confidence < 60:  # Minimum confidence threshold
+        if confidence < config.min_confidence:  # Minimum confidence threshold
             return None
         
         # Determine signal and strength
-        signal_info = self._determine_signal(data, center_idx, head_price, left_price, right_price)
+        signal_info = self._determine_signal(prices, center_idx, head_price, left_price, right_price)
         
         return {
-            'symbol': data[0]['symbol'],
+            'symbol': data.symbol,
             'pattern_type': signal_info['type'],
             'left_shoulder': left_price,
             'head': head_price,
@@ -100,38 +367,38 @@ class PatternDetectionService:
         
         return {'price': max_price, 'index': max_index}
     
-    def _calculate_confidence(self, left_price: float, head_price: float, right_price: float, center_data: Dict) -> int:
+    def _calculate_confidence(self, left_price: float, head_price: float, right_price: float, volume: float) -> int:
         """Calculate confidence score for the pattern"""
+        config = self.config
         confidence = 60  # Base confidence
         
         # Shoulder similarity increases confidence
         shoulder_diff = abs(left_price - right_price) / max(left_price, right_price)
-        if shoulder_diff < 0.03:  # Within 3%
+        if shoulder_diff < config.shoulder_tight:  # Within 3% by default
             confidence += 20
-        elif shoulder_diff < 0.05:  # Within 5%
+        elif shoulder_diff < config.shoulder_loose:  # Within 5% by default
             confidence += 10
         
         # Head prominence increases confidence
         head_prominence = (head_price - max(left_price, right_price)) / head_price
-        if head_prominence > 0.05:  # Head is 5%+ higher
+        if head_prominence > config.prominence_high:  # Head is 5%+ higher by default
             confidence += 15
-        elif head_prominence > 0.03:  # Head is 3%+ higher
+        elif head_prominence > config.prominence_low:  # Head is 3%+ higher by default
             confidence += 10
         
         # Volume confirmation (mock implementation)
-        volume = center_data.get('volume', 0)
-        if volume > 1000000:  # High volume
+        if volume > config.volume_threshold:  # High volume
             confidence += 5
         
         return min(confidence, 95)
     
-    def _determine_signal(self, data: List[Dict], center_idx: int, head_price: float, left_price: float, right_price: float) -> Dict[str, str]:
+    def _determine_signal(self, prices: List[float], center_idx: int, head_price: float, left_price: float, right_price: float) -> Dict[str, str]:
         """Determine the trading signal and pattern type"""
         
         # Look at recent trend
-        recent_data = data[max(0, center_idx - 5):center_idx + 1]
+        recent_data = prices[max(0, center_idx - TREND_LOOKBACK):center_idx + 1]
         if len(recent_data) > 1:
-            recent_trend = recent_data[-1]['close'] - recent_data[0]['close']
+            recent_trend = recent_data[-1] - recent_data[0]
         else:
             recent_trend = 0
         
@@ -167,17 +434,40 @@ class PatternDetectionService:
         # Sort by confidence (descending)
         patterns.sort(key=lambda p: p['confidence'], reverse=True)
         
+        radius = self.config.overlap_radius
         filtered_patterns = []
+        # Centers kept so far, sorted, so the overlap check only looks at
+        # the nearest kept center on either side
+        kept_centers = []
         
         for pattern in patterns:
-            overlap = False
-            for existing in filtered_patterns:
-                # Check if patterns overlap significantly
-                if abs(pattern['center_index'] - existing['center_index']) < 10:
-                    overlap = True
-                    break
+            center = pattern['center_index']
+            position = bisect.bisect_left(kept_centers, center)
+            # Check if patterns overlap significantly
+            overlap = (
+                (position < len(kept_centers) and kept_centers[position] - center < radius)
+                or (position > 0 and center - kept_centers[position - 1] < radius)
+            )
             
             if not overlap:
                 filtered_patterns.append(pattern)
+                bisect.insort(kept_centers, center)
         
-        return filtered_patterns
\ No newline at end of file
+        return filtered_patterns
+
+
+# Per-process service used by detect_patterns_in_worker
+_worker_service = None
+
+
+def detect_patterns_in_worker(data: OHLCVSeries, pattern_types: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    """
+    Process-pool entry point; must stay a picklable module-level function.
+    Without pattern_types this runs the classic head-and-shoulders scan.
+    """
+    global _worker_service
+    if _worker_service is None:
+        _worker_service = PatternDetectionService()
+    if pattern_types is None:
+        return _worker_service.detect_head_and_shoulders(data)
+    return _worker_service.detect_patterns(data, pattern_types)
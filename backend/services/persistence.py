@@ -0,0 +1,181 @@
+import asyncio
+import hashlib
+import logging
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Set
+
+from pymongo import UpdateOne
+
+from services.metrics import mongo_operation
+from services.ohlcv import OHLCVSeries
+
+logger = logging.getLogger(__name__)
+
+
+def pattern_fingerprint(
+    symbol: str, interval_ms: int, start_timestamp: int, center_timestamp: int, end_timestamp: int, pattern_type: str
+) -> str:
+    """
+    Content address of a detected pattern. Re-analyzing overlapping windows
+    finds the same pattern at different indices but at the same candle
+    timestamps, so it always maps to the same id.
+    """
+    key = f"{symbol.upper()}|{int(interval_ms)}|{int(start_timestamp)}|{int(center_timestamp)}|{int(end_timestamp)}|{pattern_type}"
+    return hashlib.sha256(key.encode()).hexdigest()[:32]
+
+
+def pattern_identity(series: OHLCVSeries, pattern: Dict[str, Any]) -> Dict[str, Any]:
+    """Fingerprint id and candle timestamps of a pattern detected in `series`"""
+    timestamps = {
+        f'{edge}_timestamp': int(series.timestamp[pattern[f'{edge}_index']])
+        for edge in ('start', 'center', 'end')
+    }
+    return {
+        'id': pattern_fingerprint(series.symbol, series.interval_ms, **timestamps, pattern_type=pattern['pattern_type']),
+        'interval_ms': int(series.interval_ms),
+        **timestamps
+    }
+
+
+class PersistenceWriter:
+    """
+    Background writer that takes Mongo writes off the request path.
+    
+    Requests enqueue whole batches (all candles or all patterns of one
+    analysis). The worker drains whatever is queued, then writes candles and
+    patterns as one unordered bulk_write of upserts per collection; patterns
+    are keyed by their fingerprint id, so re-detections refresh
+    last_seen_at instead of adding documents. The queue is bounded, so when Mongo falls
+    behind, enqueue() waits instead of letting memory grow.
+    """
+    
+    def __init__(
+        self,
+        db,
+        max_queue: int = 1000,
+        max_batch_documents: int = 5000,
+        on_patterns_written: Optional[Callable[[Set[str]], None]] = None
+    ):
+        self.db = db
+        self.max_queue = max_queue
+        self.max_batch_documents = max_batch_documents
+        # Called with the symbols whose patterns a flush wrote
+        self.on_patterns_written = on_patterns_written
+        # Created in start() so the queue belongs to the serving event loop
+        self.queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self.flushes = 0
+        self.documents_written = 0
+        self.errors = 0
+        self.last_flush_seconds = 0.0
+        self.max_flush_seconds = 0.0
+        self.total_flush_seconds = 0.0
+    
+    async def start(self):
+        if self._task is None:
+            self.queue = asyncio.Queue(maxsize=self.max_queue)
+            self._task = asyncio.create_task(self._run())
+    
+    async def stop(self):
+        """Flush everything still queued, then stop the worker"""
+        if self._task is None:
+            return
+        await self.queue.join()
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+    
+    async def enqueue(self, kind: str, documents: List[Dict[str, Any]]):
+        if documents:
+            await self.queue.put((kind, documents))
+    
+    async def enqueue_candles(self, series: OHLCVSeries):
+        """Queue crypto_data upserts; generated fallback data is never persisted"""
+        if not series.is_fallback:
+            await self.enqueue('candles', series.to_documents())
+    
+    async def enqueue_patterns(self, documents: List[Dict[str, Any]]):
+        await self.enqueue('patterns', documents)
+    
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            'queue_depth': self.queue.qsize() if self.queue else 0,
+            'queue_capacity': self.max_queue,
+            'flushes': self.flushes,
+            'documents_written': self.documents_written,
+            'errors': self.errors,
+            'last_flush_ms': round(self.last_flush_seconds * 1000, 3),
+            'max_flush_ms': round(self.max_flush_seconds * 1000, 3),
+            'avg_flush_ms': round(self.total_flush_seconds * 1000 / self.flushes, 3) if self.flushes else 0.0
+        }
+    
+    async def _run(self):
+        while True:
+            batch = [await self.queue.get()]
+            documents = len(batch[0][1])
+            while documents < self.max_batch_documents and not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+                documents += len(batch[-1][1])
+            try:
+                await self._flush(batch)
+            except Exception as e:
+                self.errors += 1
+                logger.error(f"Error flushing {documents} documents: {str(e)}")
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+    
+    async def _flush(self, batch):
+        candles = [doc for kind, docs in batch if kind == 'candles' for doc in docs]
+        patterns = [doc for kind, docs in batch if kind == 'patterns' for doc in docs]
+        
+        started = time.perf_counter()
+        if candles:
+            with mongo_operation('crypto_data', 'bulk_write'):
+                await self.db.crypto_data.bulk_write(
+                    [
+                        UpdateOne(
+                            {"symbol": doc["symbol"], "interval_ms": doc["interval_ms"], "timestamp": doc["timestamp"]},
+                            {"$set": doc},
+                            upsert=True
+                        )
+                        for doc in candles
+                    ],
+                    ordered=False
+                )
+        if patterns:
+            # Later copies of a pattern in the batch win; detected_at keeps
+            # the first sighting
+            patterns = list({doc["id"]: doc for doc in patterns}.values())
+            seen_at = datetime.utcnow()
+            with mongo_operation('pattern_detections', 'bulk_write'):
+                await self.db.pattern_detections.bulk_write(
+                    [
+                        UpdateOne(
+                            {"id": doc["id"]},
+                            {
+                                "$set": {
+                                    **{key: value for key, value in doc.items() if key != "detected_at"},
+                                    "last_seen_at": seen_at
+                                },
+                                "$setOnInsert": {"detected_at": doc.get("detected_at", seen_at)}
+                            },
+                            upsert=True
+                        )
+                        for doc in patterns
+                    ],
+                    ordered=False
+                )
+            if self.on_patterns_written is not None:
+                self.on_patterns_written({doc["symbol"] for doc in patterns})
+        elapsed = time.perf_counter() - started
+        
+        self.flushes += 1
+        self.documents_written += len(candles) + len(patterns)
+        self.last_flush_seconds = elapsed
+        self.max_flush_seconds = max(self.max_flush_seconds, elapsed)
+        self.total_flush_seconds += elapsed
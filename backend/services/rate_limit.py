@@ -0,0 +1,101 @@
+import asyncio
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+
+class TokenBucket:
+    """
+    Client-side token bucket shared by every upstream call.
+    `rate` tokens are added per second up to `burst`. Callers reserve a
+    token up front and wait out any deficit, so waiters are served in order.
+    """
+    
+    def __init__(self, rate: float, burst: int, clock: Callable[[], float] = time.monotonic):
+        if rate <= 0 or burst < 1:
+            raise ValueError("rate must be positive and burst at least 1")
+        self.rate = rate
+        self.burst = burst
+        self._clock = clock
+        self._tokens = float(burst)
+        self._updated = clock()
+        self._lock = threading.Lock()
+    
+    @classmethod
+    def per_minute(cls, calls_per_minute: float, burst: int) -> 'TokenBucket':
+        return cls(calls_per_minute / 60.0, burst)
+    
+    def reserve(self) -> float:
+        """Take one token and return how many seconds to wait before using it"""
+        with self._lock:
+            now = self._clock()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            return max(0.0, -self._tokens / self.rate)
+    
+    async def acquire(self):
+        wait = self.reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+class SingleFlight:
+    """Coalesce concurrent identical calls so they share one in-flight coroutine"""
+    
+    def __init__(self):
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+    
+    def __len__(self) -> int:
+        return len(self._inflight)
+    
+    async def do(self, key: Hashable, factory: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(factory())
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+        # Shield so one caller giving up does not cancel the shared call
+        return await asyncio.shield(task)
+    
+    def _forget(self, key: Hashable, task: asyncio.Future):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Retry-After as seconds; accepts delta-seconds or an HTTP date"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+def backoff_delay(
+    attempt: int,
+    retry_after: Optional[str] = None,
+    base: float = 1.0,
+    cap: float = 60.0,
+    rng: random.Random = random
+) -> float:
+    """
+    Delay before retry number `attempt` (0-based).
+    Honors Retry-After when present (plus a little jitter so waiters do not
+    stampede together), otherwise uses capped exponential full jitter.
+    """
+    server_delay = parse_retry_after(retry_after)
+    if server_delay is not None:
+        return min(cap, server_delay + rng.uniform(0, base))
+    return rng.uniform(0, min(cap, base * 2 ** attempt))
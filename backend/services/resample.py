@@ -0,0 +1,64 @@
+from typing import Dict
+
+import numpy as np
+
+from services.crypto_service import DAY_MS, MINUTE_MS
+from services.ohlcv import OHLCVSeries
+
+TIMEFRAMES: Dict[str, int] = {
+    '4h': 4 * 60 * MINUTE_MS,
+    '1d': DAY_MS,
+    '1w': 7 * DAY_MS,
+}
+
+# The epoch fell on a Thursday; weekly bars start on Monday 00:00 UTC
+_WEEK_ALIGNMENT_MS = 4 * DAY_MS
+
+
+class TimeframeError(ValueError):
+    pass
+
+
+def bucket_starts(timestamps: np.ndarray, timeframe_ms: int) -> np.ndarray:
+    """Start timestamp of the UTC-aligned bar each candle falls into"""
+    alignment = _WEEK_ALIGNMENT_MS if timeframe_ms == TIMEFRAMES['1w'] else 0
+    return (timestamps - alignment) // timeframe_ms * timeframe_ms + alignment
+
+
+def resample(series: OHLCVSeries, timeframe: str) -> OHLCVSeries:
+    """
+    Aggregate candles into coarser bars: first open, max high, min low,
+    last close, summed volume. Candles must be sorted by timestamp, and the
+    target timeframe must be a whole multiple of the source candles, so
+    every bar aggregates the same number of them.
+    """
+    if timeframe not in TIMEFRAMES:
+        raise TimeframeError(f"Unknown timeframe: {timeframe}")
+    timeframe_ms = TIMEFRAMES[timeframe]
+    if series.interval_ms and timeframe_ms < series.interval_ms:
+        raise TimeframeError(
+            f"Timeframe {timeframe} is finer than the available {series.interval_ms // MINUTE_MS} minute candles"
+        )
+    if series.interval_ms and timeframe_ms % series.interval_ms:
+        raise TimeframeError(
+            f"Timeframe {timeframe} is not a whole multiple of the available "
+            f"{series.interval_ms // MINUTE_MS} minute candles"
+        )
+    if timeframe_ms == series.interval_ms or not len(series):
+        return series
+    
+    buckets = bucket_starts(series.timestamp, timeframe_ms)
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    ends = np.r_[starts[1:], len(buckets)] - 1
+    
+    return OHLCVSeries(
+        series.symbol,
+        buckets[starts],
+        series.open[starts],
+        np.maximum.reduceat(series.high, starts),
+        np.minimum.reduceat(series.low, starts),
+        series.close[ends],
+        np.add.reduceat(series.volume, starts),
+        interval_ms=timeframe_ms,
+        is_fallback=series.is_fallback
+    )
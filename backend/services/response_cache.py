@@ -0,0 +1,151 @@
+import hashlib
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Callable, Dict, Hashable, Iterable, Mapping, Optional, Set, Tuple
+
+
+@dataclass
+class CachedResponse:
+    body: bytes
+    etag: str
+    last_modified: float
+    media_type: str = "application/json"
+    headers: Dict[str, str] = field(default_factory=dict)
+    stored_at: float = 0.0
+
+    def validators(self) -> Dict[str, str]:
+        return {
+            "ETag": self.etag,
+            "Last-Modified": format_datetime(datetime.fromtimestamp(int(self.last_modified), timezone.utc), usegmt=True),
+            # Clients may keep the body but must revalidate before using it
+            "Cache-Control": "no-cache"
+        }
+
+
+def entity_tag(body: bytes) -> str:
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+def not_modified(entry: CachedResponse, request_headers: Mapping[str, str]) -> bool:
+    """
+    RFC 9110 conditional GET: If-None-Match wins over If-Modified-Since,
+    and entity tags compare weakly.
+    """
+    if_none_match = request_headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        return "*" in tags or entry.etag in tags
+
+    if_modified_since = request_headers.get("if-modified-since")
+    if if_modified_since is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        return int(entry.last_modified) <= since.timestamp()
+    return False
+
+
+class ResponseCache:
+    """
+    Serialized GET responses keyed by endpoint and parameters.
+
+    Each entry carries an ETag derived from its body and the time that body
+    first appeared, so repeated polls are answered from memory, or with a
+    bodiless 304 when the client already holds the current version. Entries
+    are tagged (e.g. "patterns:BTC") and dropped when a write invalidates
+    the tag; `ttl` bounds how long a write made by another worker can go
+    unnoticed. A recomputed body identical to the invalidated one keeps
+    its Last-Modified time.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 30.0, clock: Callable[[], float] = time.time):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._clock = clock
+        self._entries: 'OrderedDict[Hashable, CachedResponse]' = OrderedDict()
+        self._tags: Dict[str, Set[Hashable]] = {}
+        # Tags of each stored key, so dropping an entry only visits its own tags
+        self._key_tags: Dict[Hashable, Set[str]] = {}
+        # Survives invalidation so an unchanged body keeps its Last-Modified;
+        # recently stored keys only
+        self._versions: Dict[Hashable, Tuple[str, float]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self.invalidations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Optional[CachedResponse]:
+        entry = self._entries.get(key)
+        if entry is not None and self.ttl and self._clock() - entry.stored_at > self.ttl:
+            self._discard(key)
+            entry = None
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def put(
+        self,
+        key: Hashable,
+        body: bytes,
+        tags: Iterable[str] = (),
+        media_type: str = "application/json",
+        headers: Optional[Dict[str, str]] = None
+    ) -> CachedResponse:
+        now = self._clock()
+        etag = entity_tag(body)
+        previous = self._versions.get(key)
+        last_modified = previous[1] if previous is not None and previous[0] == etag else now
+        self._versions.pop(key, None)
+        self._versions[key] = (etag, last_modified)
+        while len(self._versions) > 2 * self.max_entries:
+            del self._versions[next(iter(self._versions))]
+
+        self._discard(key)
+        entry = CachedResponse(body, etag, last_modified, media_type, dict(headers or {}), now)
+        self._entries[key] = entry
+        tags = set(tags)
+        if tags:
+            self._key_tags[key] = tags
+        for tag in tags:
+            self._tags.setdefault(tag, set()).add(key)
+        while len(self._entries) > self.max_entries:
+            self._discard(next(iter(self._entries)))
+        return entry
+
+    def invalidate(self, tag: str) -> int:
+        """Drop every entry carrying `tag`; returns how many were dropped"""
+        keys = self._tags.pop(tag, set())
+        for key in keys:
+            self._discard(key)
+        self.invalidations += len(keys)
+        return len(keys)
+
+    def _discard(self, key: Hashable):
+        if self._entries.pop(key, None) is None:
+            return
+        for tag in self._key_tags.pop(key, ()):
+            keys = self._tags.get(tag)
+            if keys is None:
+                continue
+            keys.discard(key)
+            # Tags come from client-supplied symbols; empty ones must not pile up
+            if not keys:
+                del self._tags[tag]
+
+    def is_current(self, entry: CachedResponse, request_headers: Mapping[str, str]) -> bool:
+        """Whether the client's copy is current, i.e. the answer is 304 Not Modified"""
+        current = not_modified(entry, request_headers)
+        self.not_modified += current
+        return current
@@ -0,0 +1,94 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Optional
+
+from services.metrics import mongo_operation
+
+logger = logging.getLogger(__name__)
+
+DAY_SECONDS = 86400
+
+
+class StorageCompactor:
+    """
+    Periodic retention pass over pattern_detections and crypto_data.
+    
+    The TTL indexes expire patterns not re-detected and candles not
+    re-fetched within the retention period. This job removes what they
+    cannot see: patterns written before fingerprinted upserts (which have no
+    last_seen_at) and candles whose market time fell out of the retention
+    window even though they were re-written recently. A retention of 0
+    keeps a collection's documents forever.
+    """
+    
+    def __init__(
+        self,
+        db,
+        pattern_retention: float = 30 * DAY_SECONDS,
+        candle_retention: float = 400 * DAY_SECONDS,
+        interval: float = 3600.0,
+        clock: Callable[[], float] = time.time
+    ):
+        self.db = db
+        self.pattern_retention = pattern_retention
+        self.candle_retention = candle_retention
+        self.interval = interval
+        self._clock = clock
+        self._task: Optional[asyncio.Task] = None
+        self.runs = 0
+        self.failures = 0
+        self.deleted: Dict[str, int] = {'pattern_detections': 0, 'crypto_data': 0}
+    
+    async def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+    
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+    
+    async def run_once(self) -> Dict[str, int]:
+        """Delete expired documents and return how many went per collection"""
+        now = self._clock()
+        deleted = {'pattern_detections': 0, 'crypto_data': 0}
+        
+        if self.pattern_retention:
+            cutoff = datetime.utcfromtimestamp(now) - timedelta(seconds=self.pattern_retention)
+            with mongo_operation('pattern_detections', 'delete_many'):
+                result = await self.db.pattern_detections.delete_many({"$or": [
+                    {"last_seen_at": {"$lt": cutoff}},
+                    {"last_seen_at": {"$exists": False}, "detected_at": {"$lt": cutoff}}
+                ]})
+            deleted['pattern_detections'] = result.deleted_count
+        
+        if self.candle_retention:
+            cutoff_ms = int((now - self.candle_retention) * 1000)
+            with mongo_operation('crypto_data', 'delete_many'):
+                result = await self.db.crypto_data.delete_many({"timestamp": {"$lt": cutoff_ms}})
+            deleted['crypto_data'] = result.deleted_count
+        
+        for collection_name, count in deleted.items():
+            self.deleted[collection_name] += count
+        self.runs += 1
+        if any(deleted.values()):
+            logger.info(
+                f"Compaction removed {deleted['pattern_detections']} patterns and {deleted['crypto_data']} candles"
+            )
+        return deleted
+    
+    async def _run(self):
+        # Startup is busy enough; the first pass waits one interval
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.run_once()
+            except Exception as e:
+                self.failures += 1
+                logger.error(f"Storage compaction failed: {str(e)}")
@@ -0,0 +1,166 @@
+import asyncio
+import json
+import logging
+import time
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from services.crypto_service import granularity_ms
+from services.metrics import mongo_operation
+
+logger = logging.getLogger(__name__)
+
+
+class LatestAnalysisStore:
+    """
+    Materialized view of the latest analysis per (symbol, days).
+    Results are kept pre-serialized in memory and mirrored to the
+    latest_analysis collection, so a worker that did not compute a result
+    can still serve it.
+    """
+    
+    def __init__(self, collection=None, clock: Callable[[], float] = time.time):
+        self.collection = collection
+        self._clock = clock
+        self._entries: Dict[Tuple[str, int], Tuple[float, bytes]] = {}
+    
+    @staticmethod
+    def _key(symbol: str, days: int) -> Tuple[str, int]:
+        return symbol.upper(), days
+    
+    def put_body(self, symbol: str, days: int, body: bytes) -> float:
+        """Keep an already serialized result in this worker's memory only"""
+        computed_at = self._clock()
+        self._entries[self._key(symbol, days)] = (computed_at, body)
+        return computed_at
+    
+    async def put(self, symbol: str, days: int, result: Dict[str, Any], persist: bool = True):
+        """Store a result; persist=False keeps it in this worker's memory only"""
+        computed_at = self.put_body(symbol, days, json.dumps(result).encode())
+        
+        if persist and self.collection is not None:
+            try:
+                with mongo_operation('latest_analysis', 'replace_one'):
+                    await self.collection.replace_one(
+                        {"symbol": symbol.upper(), "days": days},
+                        {"symbol": symbol.upper(), "days": days, "computed_at": computed_at,
+                         "updated_at": datetime.utcnow(), "result": result},
+                        upsert=True
+                    )
+            except Exception as e:
+                logger.error(f"Error storing latest analysis for {symbol}: {str(e)}")
+    
+    async def get(self, symbol: str, days: int, max_age: float) -> Optional[bytes]:
+        """Serialized result if one newer than max_age seconds exists"""
+        now = self._clock()
+        entry = self._entries.get(self._key(symbol, days))
+        if entry is not None and now - entry[0] <= max_age:
+            return entry[1]
+        
+        if self.collection is None:
+            return None
+        try:
+            with mongo_operation('latest_analysis', 'find_one'):
+                document = await self.collection.find_one(
+                    {"symbol": symbol.upper(), "days": days, "computed_at": {"$gte": now - max_age}},
+                    {"_id": 0, "computed_at": 1, "result": 1}
+                )
+        except Exception as e:
+            logger.error(f"Error reading latest analysis for {symbol}: {str(e)}")
+            return None
+        if document is None:
+            return None
+        
+        body = json.dumps(document["result"]).encode()
+        self._entries[self._key(symbol, days)] = (document["computed_at"], body)
+        return body
+
+
+def estimated_upstream_calls(symbols: List[str], days_windows: List[int]) -> int:
+    """
+    Upstream calls one full scan costs at most: /ohlc and /market_chart once
+    per symbol and candle granularity (windows of one granularity share a
+    cached fetch) plus one /simple/price per symbol.
+    """
+    granularities = {granularity_ms(days) for days in days_windows}
+    return len(symbols) * (2 * len(granularities) + 1)
+
+
+class AnalysisScheduler:
+    """
+    Periodically re-analyzes every (symbol, days) pair into a LatestAnalysisStore.
+    
+    The cycle is stretched so a full scan uses at most `budget_fraction` of
+    the upstream rate limit, leaving the rest for on-demand requests, and the
+    jobs are spread evenly over the cycle rather than fired in a burst.
+    """
+    
+    def __init__(
+        self,
+        analyze: Callable[[str, int], Awaitable[Dict[str, Any]]],
+        store: LatestAnalysisStore,
+        symbols: List[str],
+        days_windows: List[int],
+        interval: float = 300.0,
+        calls_per_minute: float = 30.0,
+        budget_fraction: float = 0.5
+    ):
+        self.analyze = analyze
+        self.store = store
+        self.symbols = [symbol.upper() for symbol in symbols]
+        self.days_windows = days_windows
+        self.interval = interval
+        self.calls_per_minute = calls_per_minute
+        self.budget_fraction = budget_fraction
+        self._task: Optional[asyncio.Task] = None
+        self.cycles = 0
+        self.failures = 0
+    
+    @property
+    def jobs(self) -> List[Tuple[str, int]]:
+        return [(symbol, days) for symbol in self.symbols for days in self.days_windows]
+    
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+    
+    def effective_interval(self) -> float:
+        """Configured interval, stretched to stay within the upstream budget"""
+        calls = estimated_upstream_calls(self.symbols, self.days_windows)
+        minimum = calls / (self.calls_per_minute * self.budget_fraction) * 60
+        return max(self.interval, minimum)
+    
+    async def start(self):
+        if self._task is None:
+            interval = self.effective_interval()
+            if interval > self.interval:
+                logger.warning(f"Scan interval raised to {interval:.0f}s to fit the upstream rate budget")
+            self._task = asyncio.create_task(self._run())
+    
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+    
+    async def run_cycle(self, pace: bool = True):
+        """Analyze every job once; when pacing, the jobs fill one interval evenly"""
+        jobs = self.jobs
+        spacing = self.effective_interval() / max(len(jobs), 1)
+        for symbol, days in jobs:
+            started = time.monotonic()
+            try:
+                await self.store.put(symbol, days, await self.analyze(symbol, days))
+            except Exception as e:
+                self.failures += 1
+                logger.error(f"Scheduled analysis of {symbol}/{days}d failed: {str(e)}")
+            if pace:
+                await asyncio.sleep(max(0.0, spacing - (time.monotonic() - started)))
+        self.cycles += 1
+    
+    async def _run(self):
+        while True:
+            await self.run_cycle()
@@ -0,0 +1,227 @@
+import asyncio
+import fcntl
+import hashlib
+import logging
+import os
+import struct
+import tempfile
+import time
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import IO, Any, AsyncIterator, Callable, Hashable, Optional, Tuple
+
+import numpy as np
+import orjson
+
+from services.ohlcv import OHLCVSeries
+
+logger = logging.getLogger(__name__)
+
+# Entry header: magic, header length; then a JSON header and the payload
+_MAGIC = b'SHC1'
+_PREFIX = struct.Struct('<4sI')
+_COLUMNS = ('timestamp',) + OHLCVSeries.PRICE_COLUMNS
+
+
+class SharedCache:
+    """
+    Cache shared by the worker processes of one host.
+
+    Each entry is one file under `root` (ideally a tmpfs such as /dev/shm),
+    written to a temporary file and renamed into place, so readers never
+    see a partial entry and need no lock. single_flight() serializes
+    refreshes of one key across processes with an flock, so after a deploy
+    only one worker fetches a series from upstream while the others wait and
+    read its result. Entries are not evicted on read; prune() removes
+    files older than `max_age`, lock files only while nobody holds them.
+    """
+
+    def __init__(
+        self,
+        root,
+        max_age: float = 3600.0,
+        prune_interval: float = 300.0,
+        lock_timeout: float = 30.0,
+        clock: Callable[[], float] = time.time
+    ):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.max_age = max_age
+        self.prune_interval = prune_interval
+        self.lock_timeout = lock_timeout
+        self._clock = clock
+        self._last_prune = 0.0
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+
+    def _path(self, key: Hashable, suffix: str = '.bin') -> Path:
+        digest = hashlib.blake2b(repr(key).encode(), digest_size=16).hexdigest()
+        return self.root / f'{digest}{suffix}'
+
+    def _read(self, key: Hashable) -> Optional[Tuple[dict, memoryview, float]]:
+        try:
+            data = self._path(key).read_bytes()
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        try:
+            magic, header_length = _PREFIX.unpack_from(data)
+            if magic != _MAGIC:
+                raise ValueError("bad magic")
+            header = orjson.loads(data[_PREFIX.size:_PREFIX.size + header_length])
+            if header['key'] != repr(key):
+                # Digest collision; treat as a miss
+                raise ValueError("key mismatch")
+        except (struct.error, ValueError, KeyError) as e:
+            logger.warning(f"Ignoring unreadable shared cache entry for {key}: {str(e)}")
+            self.misses += 1
+            return None
+        self.hits += 1
+        payload = memoryview(data)[_PREFIX.size + header_length:]
+        return header, payload, self._clock() - header['stored_at']
+
+    def _write(self, key: Hashable, header: dict, payload: bytes):
+        header = {**header, 'key': repr(key), 'stored_at': self._clock()}
+        encoded = orjson.dumps(header)
+        path = self._path(key)
+        descriptor, temporary = tempfile.mkstemp(dir=self.root, prefix='.tmp-')
+        try:
+            with os.fdopen(descriptor, 'wb') as handle:
+                handle.write(_PREFIX.pack(_MAGIC, len(encoded)))
+                handle.write(encoded)
+                handle.write(payload)
+            os.replace(temporary, path)
+        except BaseException:
+            try:
+                os.unlink(temporary)
+            except FileNotFoundError:
+                pass
+            raise
+        self.writes += 1
+        if self._clock() - self._last_prune >= self.prune_interval:
+            self.prune()
+
+    def get_series(self, key: Hashable) -> Optional[Tuple[OHLCVSeries, float]]:
+        """(series, age in seconds) or None"""
+        entry = self._read(key)
+        if entry is None:
+            return None
+        header, payload, age = entry
+        rows = header['rows']
+        columns = [
+            np.frombuffer(payload, dtype=np.int64 if name == 'timestamp' else np.float64, count=rows, offset=position * rows * 8)
+            for position, name in enumerate(_COLUMNS)
+        ]
+        series = OHLCVSeries(header['symbol'], *columns, interval_ms=header['interval_ms'])
+        return series, age
+
+    def put_series(self, key: Hashable, series: OHLCVSeries):
+        if series.is_fallback:
+            return
+        payload = b''.join(np.ascontiguousarray(getattr(series, name)).tobytes() for name in _COLUMNS)
+        self._safe_write(key, {'symbol': series.symbol, 'interval_ms': series.interval_ms, 'rows': len(series)}, payload)
+
+    def get_json(self, key: Hashable) -> Optional[Tuple[Any, float]]:
+        """(value, age in seconds) or None"""
+        entry = self._read(key)
+        if entry is None:
+            return None
+        _, payload, age = entry
+        return orjson.loads(payload), age
+
+    def put_json(self, key: Hashable, value: Any):
+        self._safe_write(key, {}, orjson.dumps(value, option=orjson.OPT_SERIALIZE_NUMPY))
+
+    def _safe_write(self, key: Hashable, header: dict, payload: bytes):
+        # The shared tier is an optimization; a full tmpfs must not fail requests
+        try:
+            self._write(key, header, payload)
+        except OSError as e:
+            logger.error(f"Error writing shared cache entry for {key}: {str(e)}")
+
+    def prune(self) -> int:
+        """Remove entries, unheld lock files and abandoned temporary files older than max_age"""
+        self._last_prune = self._clock()
+        cutoff = self._last_prune - self.max_age
+        removed = 0
+        for path in self.root.iterdir():
+            try:
+                if path.stat().st_mtime >= cutoff:
+                    continue
+                if path.suffix == '.lock':
+                    if not self._remove_unheld_lock(path):
+                        continue
+                else:
+                    path.unlink()
+                removed += 1
+            except FileNotFoundError:
+                pass
+        return removed
+
+    @staticmethod
+    def _is_current(lock_file: IO, path: Path) -> bool:
+        """Whether `lock_file` is still the file at `path`, i.e. was not pruned"""
+        try:
+            current = os.stat(path)
+        except FileNotFoundError:
+            return False
+        opened = os.fstat(lock_file.fileno())
+        return (opened.st_dev, opened.st_ino) == (current.st_dev, current.st_ino)
+
+    def _remove_unheld_lock(self, path: Path) -> bool:
+        # Unlinked while holding it, so nobody can take it in between;
+        # waiters already blocked on the file notice and reopen the path
+        with open(path, 'a') as lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return False
+            if not self._is_current(lock_file, path):
+                return False
+            path.unlink()
+            return True
+
+    async def _lock(self, key: Hashable) -> Tuple[IO, bool]:
+        path = self._path(key, '.lock')
+        deadline = time.monotonic() + self.lock_timeout
+        while True:
+            lock_file = open(path, 'w')
+            try:
+                while True:
+                    try:
+                        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                        break
+                    except BlockingIOError:
+                        if time.monotonic() >= deadline:
+                            logger.warning(f"Timed out waiting for the shared cache lock of {key}")
+                            return lock_file, False
+                        await asyncio.sleep(0.05)
+            except BaseException:
+                lock_file.close()
+                raise
+            if self._is_current(lock_file, path):
+                return lock_file, True
+            lock_file.close()
+
+    @asynccontextmanager
+    async def single_flight(self, key: Hashable) -> AsyncIterator[bool]:
+        """
+        Hold the cross-process lock of `key`; yields False when it could not
+        be taken within lock_timeout (the caller then proceeds unlocked).
+        """
+        lock_file, locked = await self._lock(key)
+        try:
+            yield locked
+        finally:
+            if locked:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+            lock_file.close()
+
+
+def series_digest(series: OHLCVSeries) -> str:
+    """Content hash of a series; equal candles give equal digests in every worker"""
+    digest = hashlib.blake2b(f'{series.symbol}|{series.interval_ms}'.encode(), digest_size=16)
+    for name in _COLUMNS:
+        digest.update(np.ascontiguousarray(getattr(series, name)).tobytes())
+    return digest.hexdigest()
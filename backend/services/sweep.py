@@ -0,0 +1,165 @@
+"""
+Parameter sweeps over DetectionConfig.
+
+Every parameter set in a grid is replayed over the same series with the
+backtest's no-lookahead rolling detection and ranked by the forward returns
+of the signals it raised. Parameter sets are grouped by window shape: the
+window peak tables only depend on the window widths, so each (series, group)
+task computes them once and evaluates the whole group against them.
+"""
+import dataclasses
+import itertools
+import logging
+import math
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from services.backtest import DEFAULT_HORIZONS, rolling_signals, signal_outcomes, summarize
+from services.ohlcv import OHLCVSeries
+from services.pattern_service import DetectionConfig, PatternDetectionService
+
+logger = logging.getLogger(__name__)
+
+# Parameter sets evaluated per sweep at most
+MAX_GRID_SIZE = 500
+
+_WINDOW_FIELDS = ('left_window', 'head_window', 'right_window')
+
+
+def parameter_grid(base: Optional[DetectionConfig] = None, **axes: Sequence[Any]) -> List[DetectionConfig]:
+    """
+    Cartesian product of the given DetectionConfig fields over `base`.
+    Combinations DetectionConfig rejects (e.g. a tight shoulder cutoff above
+    the loose one) are left out; a value of the wrong type rejects the grid,
+    as does one with more than MAX_GRID_SIZE combinations.
+    """
+    base = base or DetectionConfig()
+    known = {field.name for field in dataclasses.fields(DetectionConfig)}
+    unknown = sorted(set(axes) - known)
+    if unknown:
+        raise ValueError(f"Unknown detection parameters: {', '.join(unknown)}")
+    for name, values in axes.items():
+        if not values:
+            raise ValueError(f"No values given for {name}")
+    # Checked before enumerating, which would itself be the cost to avoid
+    size = math.prod(len(values) for values in axes.values())
+    if size > MAX_GRID_SIZE:
+        raise ValueError(f"At most {MAX_GRID_SIZE} parameter sets can be swept at once, the grid has {size}")
+
+    names = list(axes)
+    configs = []
+    for values in itertools.product(*(axes[name] for name in names)):
+        changes = {
+            name: tuple(value) if name in _WINDOW_FIELDS and isinstance(value, list) else value
+            for name, value in zip(names, values)
+        }
+        try:
+            configs.append(dataclasses.replace(base, **changes))
+        except TypeError as e:
+            raise ValueError(f"Invalid parameter value: {str(e)}")
+        except ValueError as e:
+            logger.debug(f"Skipping parameter set {changes}: {str(e)}")
+    # Duplicate axis values would only repeat work
+    return list(dict.fromkeys(configs))
+
+
+def group_by_windows(configs: Sequence[DetectionConfig]) -> List[List[int]]:
+    """Positions of configs in `configs`, grouped by window shape"""
+    groups: Dict[Tuple[Tuple[int, int], ...], List[int]] = {}
+    for position, config in enumerate(configs):
+        groups.setdefault(config.windows, []).append(position)
+    return list(groups.values())
+
+
+def sweep_group(
+    series: OHLCVSeries, configs: Sequence[DetectionConfig], horizons: Sequence[int] = DEFAULT_HORIZONS
+) -> List[List[Dict[str, Any]]]:
+    """
+    Process-pool entry point: backtest signals of each config over the whole
+    series, sharing one set of window peak tables across the configs.
+    """
+    widths = {stop - start for config in configs for start, stop in config.windows}
+    tables = PatternDetectionService().window_peak_tables(series, widths)
+    return [
+        signal_outcomes(
+            series,
+            rolling_signals(series, PatternDetectionService(config), window_peaks=tables),
+            horizons
+        )
+        for config in configs
+    ]
+
+
+def rank_configs(
+    configs: Sequence[DetectionConfig],
+    signals: Sequence[List[Dict[str, Any]]],
+    horizons: Sequence[int],
+    rank_horizon: Optional[int] = None
+) -> List[Dict[str, Any]]:
+    """
+    Detection statistics per config, best first: by mean signed return at
+    rank_horizon (the first horizon by default), then hit rate, then signal
+    count. Configs without a measurable signal rank last.
+    """
+    rank_horizon = horizons[0] if rank_horizon is None else rank_horizon
+    if rank_horizon not in horizons:
+        raise ValueError(f"rank_horizon {rank_horizon} is not one of the horizons")
+    position = list(horizons).index(rank_horizon)
+
+    results = []
+    for config, config_signals in zip(configs, signals):
+        stats = summarize(config_signals, horizons)['overall']
+        results.append({
+            'config': dataclasses.asdict(config),
+            'signals': stats['count'],
+            'horizons': stats['horizons']
+        })
+
+    def key(result):
+        stats = result['horizons'][position]
+        if stats['mean_return'] is None:
+            return (1, 0.0, 0.0, -result['signals'])
+        return (0, -stats['mean_return'], -stats['hit_rate'], -result['signals'])
+
+    results.sort(key=key)
+    for rank, result in enumerate(results, start=1):
+        result['rank'] = rank
+    return results
+
+
+def plan_sweep(
+    series_list: Sequence[OHLCVSeries], configs: Sequence[DetectionConfig]
+) -> List[Tuple[OHLCVSeries, List[int]]]:
+    """One (series, config positions) task per series and window group"""
+    groups = group_by_windows(configs)
+    return [(series, group) for series in series_list for group in groups]
+
+
+def merge_outputs(
+    configs: Sequence[DetectionConfig],
+    tasks: Sequence[Tuple[OHLCVSeries, List[int]]],
+    outputs: Sequence[List[List[Dict[str, Any]]]]
+) -> List[List[Dict[str, Any]]]:
+    """Signals per config from the sweep_group output of each task"""
+    signals: List[List[Dict[str, Any]]] = [[] for _ in configs]
+    for (_, group), group_signals in zip(tasks, outputs):
+        for position, config_signals in zip(group, group_signals):
+            signals[position].extend(config_signals)
+    return signals
+
+
+def run_sweep(
+    series_list: Sequence[OHLCVSeries],
+    configs: Sequence[DetectionConfig],
+    horizons: Sequence[int] = DEFAULT_HORIZONS,
+    rank_horizon: Optional[int] = None,
+    executor=None
+) -> List[Dict[str, Any]]:
+    """Evaluate and rank `configs` over `series_list`, in `executor` (e.g. a ProcessPoolExecutor) when given"""
+    tasks = plan_sweep(series_list, configs)
+    arguments = (
+        [series for series, _ in tasks],
+        [[configs[position] for position in group] for _, group in tasks],
+        [horizons] * len(tasks)
+    )
+    outputs = list(executor.map(sweep_group, *arguments) if executor is not None else map(sweep_group, *arguments))
+    return rank_configs(configs, merge_outputs(configs, tasks, outputs), horizons, rank_horizon)
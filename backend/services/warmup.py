@@ -0,0 +1,65 @@
+import asyncio
+import logging
+import time
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class WarmUp:
+    """
+    Preloads recent history for a set of symbols at startup, so the first
+    requests a fresh worker serves do not all go upstream. The worker
+    reports ready once every load has finished (or failed), or when
+    `timeout` runs out. With a shared cache, workers starting together load
+    each series from upstream only once.
+    """
+    
+    def __init__(self, market_data, concurrency: int = 4, timeout: float = 120.0):
+        self.market_data = market_data
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.ready = False
+        self.loaded = 0
+        self.failed = 0
+        self.total = 0
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+    
+    async def run(self, symbols: List[str], days_windows: List[int]):
+        jobs = [(symbol, days) for symbol in symbols for days in days_windows]
+        self.total = len(jobs)
+        self.started_at = time.monotonic()
+        semaphore = asyncio.Semaphore(self.concurrency)
+        
+        async def load(symbol: str, days: int):
+            async with semaphore:
+                try:
+                    series = await self.market_data.get_historical_data(symbol, days)
+                    if series.is_fallback:
+                        raise RuntimeError("upstream returned no data")
+                    self.loaded += 1
+                except Exception as e:
+                    self.failed += 1
+                    logger.warning(f"Warm-up of {symbol}/{days}d failed: {str(e)}")
+        
+        try:
+            await asyncio.wait_for(asyncio.gather(*(load(symbol, days) for symbol, days in jobs)), self.timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Warm-up timed out after {self.timeout:.0f}s with {self.loaded}/{self.total} series loaded")
+        finally:
+            self.finished_at = time.monotonic()
+            self.ready = True
+        logger.info(f"Warm-up loaded {self.loaded}/{self.total} series in {self.finished_at - self.started_at:.1f}s")
+    
+    def status(self) -> Dict[str, Any]:
+        elapsed = None
+        if self.started_at is not None:
+            elapsed = round((self.finished_at or time.monotonic()) - self.started_at, 3)
+        return {
+            'ready': self.ready,
+            'loaded': self.loaded,
+            'failed': self.failed,
+            'total': self.total,
+            'elapsed_seconds': elapsed
+        }
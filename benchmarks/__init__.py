@@ -0,0 +1,7 @@
+import sys
+from pathlib import Path
+
+# Benchmarks import backend modules the way the server does (`from services...`)
+_BACKEND_DIR = str(Path(__file__).resolve().parent.parent / 'backend')
+if _BACKEND_DIR not in sys.path:
+    sys.path.insert(0, _BACKEND_DIR)
@@ -0,0 +1,136 @@
+"""
+Local stand-in for the CoinGecko endpoints the backend calls.
+Serves deterministic candles from a background thread; latency, random
+429 responses and a fixed number of leading failures can be injected to
+exercise the client paths.
+"""
+import json
+import random
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+import numpy as np
+
+CANDLE_MS = 4 * 60 * 60 * 1000
+
+
+def candles_for(coin_id, days, now_ms=None):
+    """Deterministic 4-hourly [ts, open, high, low, close] rows ending at now"""
+    now_ms = now_ms or int(time.time() * 1000)
+    end = now_ms - now_ms % CANDLE_MS
+    count = int(days) * 6
+    rng = np.random.default_rng(zlib.crc32(coin_id.encode()))
+    closes = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, count)))
+    timestamps = end - CANDLE_MS * np.arange(count)[::-1]
+    return [
+        [int(ts), round(c * 0.995, 4), round(c * 1.01, 4), round(c * 0.99, 4), round(c, 4)]
+        for ts, c in zip(timestamps.tolist(), closes.tolist())
+    ]
+
+
+class FakeCoinGecko:
+    def __init__(self, latency=0.0, rate_limit_probability=0.0, retry_after=None, seed=0, fail_first=0, fail_status=429):
+        self.latency = latency
+        self.rate_limit_probability = rate_limit_probability
+        self.retry_after = retry_after
+        # The first `fail_first` requests are answered with fail_status
+        self.fail_first = fail_first
+        self.fail_status = fail_status
+        self.requests = []
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def count(self, path_fragment):
+        with self._lock:
+            return sum(1 for path in self.requests if path_fragment in path)
+
+    def _failure_status(self):
+        with self._lock:
+            if self.fail_first > 0:
+                self.fail_first -= 1
+                return self.fail_status
+            if self._random.random() < self.rate_limit_probability:
+                return 429
+        return None
+
+    def _payload(self, path, query):
+        parts = path.strip('/').split('/')
+        if parts[-1] == 'ohlc':
+            return candles_for(parts[-2], query.get('days', ['30'])[0])
+        if parts[-1] == 'market_chart':
+            rows = candles_for(parts[-2], query.get('days', ['30'])[0])
+            return {
+                'prices': [[row[0], row[4]] for row in rows],
+                'total_volumes': [[row[0], 1000000 + i * 1000] for i, row in enumerate(rows)]
+            }
+        if parts[-1] == 'price':
+            return {
+                coin_id: {'usd': candles_for(coin_id, 1)[-1][4], 'usd_24h_change': 1.5}
+                for coin_id in query.get('ids', [''])[0].split(',')
+            }
+        return None
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                parsed = urlparse(self.path)
+                with fake._lock:
+                    fake.requests.append(parsed.path)
+                if fake.latency:
+                    time.sleep(fake.latency)
+
+                status = fake._failure_status()
+                if status is not None:
+                    self._send(status, {'error': 'injected failure'}, retry_after=fake.retry_after)
+                    return
+
+                payload = fake._payload(parsed.path, parse_qs(parsed.query))
+                if payload is None:
+                    self._send(404, {'error': 'not found'})
+                else:
+                    self._send(200, payload)
+
+            def _send(self, status, payload, retry_after=None):
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                if retry_after is not None:
+                    self.send_header('Retry-After', str(retry_after))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
@@ -0,0 +1,231 @@
+"""
+In-memory stand-in for the subset of the motor API the backend uses.
+Supports equality and $gte/$gt/$lte/$lt/$in/$ne filters, projections,
+sort/limit and upserts, which is enough for the tests and benchmarks.
+"""
+import copy
+import itertools
+
+from pymongo.errors import OperationFailure
+
+_OPERATORS = {
+    '$gte': lambda value, arg: value is not None and value >= arg,
+    '$gt': lambda value, arg: value is not None and value > arg,
+    '$lte': lambda value, arg: value is not None and value <= arg,
+    '$lt': lambda value, arg: value is not None and value < arg,
+    '$in': lambda value, arg: value in arg,
+    '$nin': lambda value, arg: value not in arg,
+    '$ne': lambda value, arg: value != arg,
+    '$exists': lambda value, arg: (value is not None) == arg,
+}
+
+
+def matches(document, query):
+    for key, condition in query.items():
+        if key == '$or':
+            if not any(matches(document, sub) for sub in condition):
+                return False
+            continue
+        if key == '$and':
+            if not all(matches(document, sub) for sub in condition):
+                return False
+            continue
+        value = document.get(key)
+        if isinstance(condition, dict) and condition and all(op.startswith('$') for op in condition):
+            if not all(_OPERATORS[op](value, arg) for op, arg in condition.items()):
+                return False
+        elif value != condition:
+            return False
+    return True
+
+
+def project(document, projection):
+    if not projection:
+        return copy.deepcopy(document)
+    included = [key for key, flag in projection.items() if flag and key != '_id']
+    if included:
+        result = {key: copy.deepcopy(document[key]) for key in included if key in document}
+        if projection.get('_id', 1) and '_id' in document:
+            result['_id'] = document['_id']
+        return result
+    return {
+        key: copy.deepcopy(value) for key, value in document.items()
+        if projection.get(key, 1)
+    }
+
+
+def _sort_key(value):
+    # None sorts first, like in Mongo
+    return (value is not None, value)
+
+
+class Result:
+    def __init__(self, **fields):
+        self.__dict__.update(fields)
+
+
+class FakeCursor:
+    def __init__(self, documents, projection=None):
+        self._documents = documents
+        self._projection = projection
+        self._sort = []
+        self._limit = 0
+
+    def sort(self, key, direction=1):
+        self._sort = list(key) if isinstance(key, list) else [(key, direction)]
+        return self
+
+    def limit(self, count):
+        self._limit = count
+        return self
+
+    def _results(self):
+        documents = list(self._documents)
+        for key, direction in reversed(self._sort):
+            documents.sort(key=lambda doc: _sort_key(doc.get(key)), reverse=direction < 0)
+        if self._limit:
+            documents = documents[:self._limit]
+        return [project(doc, self._projection) for doc in documents]
+
+    async def to_list(self, length=None):
+        results = self._results()
+        return results if length is None else results[:length]
+
+    def __aiter__(self):
+        async def iterate():
+            for document in self._results():
+                yield document
+        return iterate()
+
+
+class FakeCollection:
+    def __init__(self, name):
+        self.name = name
+        self.documents = []
+        self.indexes = []
+        self._ids = itertools.count(1)
+        self.operations = 0
+
+    def _insert(self, document):
+        document = copy.deepcopy(document)
+        document.setdefault('_id', next(self._ids))
+        self.documents.append(document)
+        return document['_id']
+
+    def find(self, query=None, projection=None):
+        self.operations += 1
+        return FakeCursor([doc for doc in self.documents if matches(doc, query or {})], projection)
+
+    async def find_one(self, query=None, projection=None, sort=None):
+        cursor = self.find(query, projection)
+        if sort:
+            cursor.sort(sort)
+        results = await cursor.limit(1).to_list(1)
+        return results[0] if results else None
+
+    async def insert_one(self, document):
+        self.operations += 1
+        return Result(inserted_id=self._insert(document))
+
+    async def insert_many(self, documents, ordered=True):
+        self.operations += 1
+        return Result(inserted_ids=[self._insert(doc) for doc in documents])
+
+    def _apply_update(self, document, update, inserting):
+        for key, value in update.get('$set', {}).items():
+            document[key] = copy.deepcopy(value)
+        if inserting:
+            for key, value in update.get('$setOnInsert', {}).items():
+                document[key] = copy.deepcopy(value)
+        for key, value in update.get('$inc', {}).items():
+            document[key] = document.get(key, 0) + value
+
+    def _update(self, query, update, upsert):
+        for document in self.documents:
+            if matches(document, query):
+                self._apply_update(document, update, inserting=False)
+                return Result(matched_count=1, modified_count=1, upserted_id=None)
+        if not upsert:
+            return Result(matched_count=0, modified_count=0, upserted_id=None)
+        document = {key: value for key, value in query.items() if not isinstance(value, dict)}
+        self._apply_update(document, update, inserting=True)
+        return Result(matched_count=0, modified_count=0, upserted_id=self._insert(document))
+
+    async def update_one(self, query, update, upsert=False):
+        self.operations += 1
+        return self._update(query, update, upsert)
+
+    def _replace(self, query, replacement, upsert):
+        for index, document in enumerate(self.documents):
+            if matches(document, query):
+                replacement = copy.deepcopy(replacement)
+                replacement['_id'] = document['_id']
+                self.documents[index] = replacement
+                return Result(matched_count=1, modified_count=1, upserted_id=None)
+        if upsert:
+            return Result(matched_count=0, modified_count=0, upserted_id=self._insert(replacement))
+        return Result(matched_count=0, modified_count=0, upserted_id=None)
+
+    async def replace_one(self, query, replacement, upsert=False):
+        self.operations += 1
+        return self._replace(query, replacement, upsert)
+
+    async def bulk_write(self, requests, ordered=True):
+        self.operations += 1
+        upserted = modified = 0
+        for request in requests:
+            # pymongo UpdateOne/ReplaceOne keep their arguments in _filter/_doc/_upsert
+            if any(key.startswith('$') for key in request._doc):
+                result = self._update(request._filter, request._doc, request._upsert)
+            else:
+                result = self._replace(request._filter, request._doc, request._upsert)
+            upserted += result.upserted_id is not None
+            modified += result.modified_count
+        return Result(upserted_count=upserted, modified_count=modified)
+
+    async def delete_many(self, query):
+        self.operations += 1
+        kept = [doc for doc in self.documents if not matches(doc, query)]
+        deleted = len(self.documents) - len(kept)
+        self.documents = kept
+        return Result(deleted_count=deleted)
+
+    async def delete_one(self, query):
+        self.operations += 1
+        for index, document in enumerate(self.documents):
+            if matches(document, query):
+                del self.documents[index]
+                return Result(deleted_count=1)
+        return Result(deleted_count=0)
+
+    async def count_documents(self, query):
+        return sum(1 for doc in self.documents if matches(doc, query))
+
+    async def create_index(self, keys, **options):
+        self.indexes.append((keys, options))
+        return options.get('name', str(keys))
+
+    async def create_indexes(self, models):
+        self.indexes.extend((model.document['key'], model.document) for model in models)
+        return [model.document['name'] for model in models]
+
+    async def drop_index(self, name):
+        kept = [index for index in self.indexes if index[1].get('name') != name]
+        if len(kept) == len(self.indexes):
+            raise OperationFailure(f"index not found with name [{name}]", code=27)
+        self.indexes = kept
+
+
+class FakeDatabase:
+    def __init__(self):
+        self._collections = {}
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return self[name]
+
+    def __getitem__(self, name):
+        if name not in self._collections:
+            self._collections[name] = FakeCollection(name)
+        return self._collections[name]
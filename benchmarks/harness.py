@@ -0,0 +1,63 @@
+"""Run the FastAPI app in-process against local CoinGecko and Mongo stand-ins"""
+from contextlib import contextmanager
+
+from fastapi.testclient import TestClient
+
+import server
+from services.async_crypto_service import AsyncCoinGeckoService
+from services.cache_service import CachedMarketDataService
+from services.scheduler import LatestAnalysisStore
+from benchmarks.fake_coingecko import FakeCoinGecko
+from benchmarks.fake_mongo import FakeDatabase
+
+
+@contextmanager
+def patched_server(
+    latency: float = 0.0,
+    rate_limit_probability: float = 0.0,
+    cache_ttl: float = 60.0,
+    retry_after: float = 0,
+    latest_analysis: bool = False
+):
+    """
+    Wire the server module to the stand-ins and yield (FakeCoinGecko,
+    FakeDatabase, AsyncCoinGeckoService); the original wiring is restored
+    afterwards. Starting the app (and closing the service) is up to the caller.
+    Unless `latest_analysis` is set, analyze requests never answer from the
+    latest-analysis store, whatever ANALYSIS_MAX_AGE is set to.
+    """
+    fake_db = FakeDatabase()
+    patched = {
+        (server, 'db'): fake_db,
+        (server.persistence_writer, 'db'): fake_db,
+        (server.storage_compactor, 'db'): fake_db,
+        (server.analysis_jobs, 'collection'): fake_db.analysis_jobs,
+        (server, 'response_cache'): server.ResponseCache(),
+        (server, 'latest_analysis'): LatestAnalysisStore(fake_db.latest_analysis),
+    }
+    if not latest_analysis:
+        patched[(server, 'ANALYSIS_MAX_AGE')] = 0.0
+    with FakeCoinGecko(
+        latency=latency, rate_limit_probability=rate_limit_probability, retry_after=retry_after
+    ) as upstream:
+        upstream_service = AsyncCoinGeckoService(base_url=upstream.base_url, backoff_base=0.01)
+        patched[(server, 'market_data')] = CachedMarketDataService(
+            upstream_service, fake_db.crypto_data, ttl=cache_ttl, on_fetched=server.persist_fetched_candles
+        )
+        originals = {key: getattr(*key) for key in patched}
+        for (target, name), value in patched.items():
+            setattr(target, name, value)
+        try:
+            yield upstream, fake_db, upstream_service
+        finally:
+            for (target, name), value in originals.items():
+                setattr(target, name, value)
+
+
+@contextmanager
+def local_app(latency: float = 0.0, rate_limit_probability: float = 0.0, cache_ttl: float = 60.0):
+    """Yield (TestClient, FakeCoinGecko, FakeDatabase) for a started app wired to the stand-ins"""
+    with patched_server(latency, rate_limit_probability, cache_ttl) as (upstream, fake_db, upstream_service):
+        with TestClient(server.app) as client:
+            yield client, upstream, fake_db
+            client.portal.call(upstream_service.aclose)
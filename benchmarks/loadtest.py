@@ -0,0 +1,280 @@
+"""
+Concurrent load test of the API against local CoinGecko and Mongo stand-ins.
+
+    python -m benchmarks.loadtest --concurrency 32 --duration 30
+    python -m benchmarks.loadtest --mix analyze=1 --latency 0.2 --rate-limit-probability 0.05
+    python -m benchmarks.loadtest --url http://localhost:8001 --requests 2000
+
+Virtual users send requests back to back, each picking an endpoint from the
+weighted `--mix`. By default the app runs in-process behind httpx's ASGI
+transport, wired to the stand-ins; with `--url` an already running server
+is targeted instead (start it with COINGECKO_BASE_URL pointing at a stand-in
+to keep upstream out of the numbers). The report gives throughput, latency
+percentiles and error rates overall and per endpoint.
+
+Locally, analyze requests skip the latest-analysis store unless
+--latest-analysis is given, so they measure fetch and detection rather
+than a lookup of a precomputed result.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import sys
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+import httpx
+import numpy as np
+
+from benchmarks.run import environment
+
+DEFAULT_MIX = {'analyze': 5, 'patterns': 3, 'status': 2}
+SYMBOLS = ['BTC', 'ETH', 'ADA', 'SOL', 'DOT', 'LINK', 'MATIC', 'AVAX']
+DAYS = [7, 30, 90]
+
+
+def parse_mix(raw: str) -> Dict[str, float]:
+    """'analyze=5,patterns=3' -> {'analyze': 5.0, 'patterns': 3.0}"""
+    mix = {}
+    for part in raw.split(','):
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in ENDPOINTS:
+            raise ValueError(f"Unknown endpoint {name!r}; choose from {', '.join(ENDPOINTS)}")
+        mix[name] = float(weight or 1)
+    if not any(weight > 0 for weight in mix.values()):
+        raise ValueError("The mix needs at least one positive weight")
+    return mix
+
+
+def analyze_request(rng: random.Random, symbols: List[str], days: List[int]) -> Tuple[str, str, Dict[str, Any]]:
+    return 'POST', '/api/crypto/analyze', {'json': {'symbol': rng.choice(symbols), 'days': rng.choice(days)}}
+
+
+def patterns_request(rng: random.Random, symbols: List[str], days: List[int]) -> Tuple[str, str, Dict[str, Any]]:
+    return 'GET', f'/api/crypto/{rng.choice(symbols)}/patterns', {'params': {'limit': 50}}
+
+
+def status_request(rng: random.Random, symbols: List[str], days: List[int]) -> Tuple[str, str, Dict[str, Any]]:
+    return 'GET', '/api/status', {'params': {'limit': 20}}
+
+
+def status_write_request(rng: random.Random, symbols: List[str], days: List[int]) -> Tuple[str, str, Dict[str, Any]]:
+    return 'POST', '/api/status', {'json': {'client_name': f'loadtest-{rng.randrange(1000)}'}}
+
+
+ENDPOINTS = {
+    'analyze': analyze_request,
+    'patterns': patterns_request,
+    'status': status_request,
+    'status_write': status_write_request,
+}
+
+
+def summarize(samples: List[Tuple[str, float, Optional[int]]], elapsed: float) -> Dict[str, Any]:
+    """Throughput, latency percentiles (ms) and error rate of (endpoint, seconds, status) samples"""
+    def stats(group: List[Tuple[str, float, Optional[int]]]) -> Dict[str, Any]:
+        latencies = np.array([seconds for _, seconds, _ in group]) * 1000
+        errors = sum(1 for _, _, status in group if status is None or status >= 400)
+        statuses: Dict[str, int] = {}
+        for _, _, status in group:
+            label = str(status) if status is not None else 'exception'
+            statuses[label] = statuses.get(label, 0) + 1
+        return {
+            'requests': len(group),
+            'throughput_rps': len(group) / elapsed if elapsed else 0.0,
+            'errors': errors,
+            'error_rate': errors / len(group) if group else 0.0,
+            'latency_ms': {
+                'mean': float(latencies.mean()) if group else None,
+                'p50': float(np.percentile(latencies, 50)) if group else None,
+                'p95': float(np.percentile(latencies, 95)) if group else None,
+                'p99': float(np.percentile(latencies, 99)) if group else None,
+                'max': float(latencies.max()) if group else None,
+            },
+            'statuses': dict(sorted(statuses.items())),
+        }
+
+    by_endpoint: Dict[str, List[Tuple[str, float, Optional[int]]]] = {}
+    for sample in samples:
+        by_endpoint.setdefault(sample[0], []).append(sample)
+    return {
+        'elapsed_s': elapsed,
+        'overall': stats(samples),
+        'endpoints': {name: stats(group) for name, group in sorted(by_endpoint.items())},
+    }
+
+
+async def drive(
+    client: httpx.AsyncClient,
+    mix: Dict[str, float],
+    concurrency: int,
+    duration: Optional[float] = None,
+    total_requests: Optional[int] = None,
+    symbols: List[str] = SYMBOLS,
+    days: List[int] = DAYS,
+    seed: int = 0
+) -> Dict[str, Any]:
+    """Run `concurrency` virtual users until `duration` seconds or `total_requests` have passed"""
+    if duration is None and total_requests is None:
+        raise ValueError("Give a duration or a request count")
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    samples: List[Tuple[str, float, Optional[int]]] = []
+    remaining = [total_requests]
+    started = time.perf_counter()
+    deadline = started + duration if duration is not None else None
+
+    def claim() -> bool:
+        if deadline is not None and time.perf_counter() >= deadline:
+            return False
+        if remaining[0] is not None:
+            if remaining[0] <= 0:
+                return False
+            remaining[0] -= 1
+        return True
+
+    async def user(index: int):
+        rng = random.Random(seed * 1000 + index)
+        while claim():
+            name = rng.choices(names, weights)[0]
+            method, path, options = ENDPOINTS[name](rng, symbols, days)
+            request_started = time.perf_counter()
+            try:
+                response = await client.request(method, path, **options)
+                status = response.status_code
+            except httpx.HTTPError:
+                status = None
+            samples.append((name, time.perf_counter() - request_started, status))
+
+    await asyncio.gather(*(user(index) for index in range(concurrency)))
+    return summarize(samples, time.perf_counter() - started)
+
+
+@asynccontextmanager
+async def local_client(
+    latency: float = 0.0,
+    rate_limit_probability: float = 0.0,
+    retry_after: float = 0,
+    cache_ttl: float = 60.0,
+    latest_analysis: bool = False
+) -> AsyncIterator[Tuple[httpx.AsyncClient, Any]]:
+    """
+    (client, FakeCoinGecko) for the app started in this event loop and
+    wired to the stand-ins; startup and shutdown handlers run as in uvicorn.
+    With `latest_analysis` the scan scheduler runs and analyze requests are
+    answered from the latest-analysis store when it has a fresh result;
+    otherwise every analyze runs the full fetch and detection path.
+    """
+    from benchmarks.harness import patched_server
+    import server
+
+    scan_enabled = os.environ.get('SCAN_ENABLED')
+    os.environ['SCAN_ENABLED'] = 'true' if latest_analysis else 'false'
+    try:
+        with patched_server(
+            latency, rate_limit_probability, cache_ttl, retry_after, latest_analysis
+        ) as (upstream, _, upstream_service):
+            await server.app.router.startup()
+            try:
+                transport = httpx.ASGITransport(app=server.app)
+                async with httpx.AsyncClient(transport=transport, base_url='http://loadtest', timeout=None) as client:
+                    yield client, upstream
+            finally:
+                await server.app.router.shutdown()
+                await upstream_service.aclose()
+    finally:
+        if scan_enabled is None:
+            del os.environ['SCAN_ENABLED']
+        else:
+            os.environ['SCAN_ENABLED'] = scan_enabled
+
+
+async def run_load_test(args: argparse.Namespace) -> Dict[str, Any]:
+    mix = parse_mix(args.mix)
+    options = dict(
+        mix=mix, concurrency=args.concurrency, duration=args.duration, total_requests=args.requests,
+        symbols=args.symbols, days=args.days, seed=args.seed
+    )
+    config = {**options, 'url': args.url, 'latency': args.latency,
+              'rate_limit_probability': args.rate_limit_probability, 'cache_ttl': args.cache_ttl,
+              'latest_analysis': args.latest_analysis}
+
+    if args.url:
+        async with httpx.AsyncClient(base_url=args.url, timeout=args.timeout) as client:
+            report = await drive(client, **options)
+    else:
+        async with local_client(
+            args.latency, args.rate_limit_probability, args.retry_after, args.cache_ttl, args.latest_analysis
+        ) as (client, upstream):
+            report = await drive(client, **options)
+            report['upstream'] = {
+                'requests': len(upstream.requests),
+                'ohlc': upstream.count('/ohlc'),
+                'market_chart': upstream.count('/market_chart'),
+                'price': upstream.count('/simple/price'),
+            }
+    return {'environment': environment(), 'config': config, **report}
+
+
+def print_report(report: Dict[str, Any]):
+    print(f"{report['overall']['requests']} requests in {report['elapsed_s']:.2f}s", flush=True)
+    rows = [('overall', report['overall'])] + list(report['endpoints'].items())
+    print(f"{'endpoint':<14}{'requests':>10}{'rps':>10}{'errors':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for name, stats in rows:
+        latency = stats['latency_ms']
+        if not stats['requests']:
+            continue
+        print(
+            f"{name:<14}{stats['requests']:>10}{stats['throughput_rps']:>10.1f}{stats['error_rate']:>9.1%}"
+            f"{latency['p50']:>10.2f}{latency['p95']:>10.2f}{latency['p99']:>10.2f}{latency['max']:>10.2f}"
+        )
+    if 'upstream' in report:
+        print(f"upstream requests: {report['upstream']}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--concurrency', type=int, default=16, help='Concurrent virtual users')
+    parser.add_argument('--duration', type=float, help='Seconds to run (default 10 unless --requests is given)')
+    parser.add_argument('--requests', type=int, help='Total requests to send')
+    parser.add_argument('--mix', default=','.join(f'{name}={weight}' for name, weight in DEFAULT_MIX.items()),
+                        help=f"Endpoint weights, e.g. analyze=5,patterns=3,status=2 (endpoints: {', '.join(ENDPOINTS)})")
+    parser.add_argument('--symbols', nargs='+', default=SYMBOLS)
+    parser.add_argument('--days', type=int, nargs='+', default=DAYS, help='Analyze windows to draw from')
+    parser.add_argument('--latency', type=float, default=0.0, help='Injected upstream latency in seconds')
+    parser.add_argument('--rate-limit-probability', type=float, default=0.0, help='Share of upstream calls answered 429')
+    parser.add_argument('--retry-after', type=float, default=0, help='Retry-After seconds sent with injected 429s')
+    parser.add_argument('--cache-ttl', type=float, default=60.0,
+                        help='OHLCV cache TTL in seconds; stale series are still reused while no newer candle is due')
+    parser.add_argument('--latest-analysis', action='store_true',
+                        help='Run the scan scheduler and answer analyze from the latest-analysis store '
+                             '(off by default, so every analyze runs fetch and detection)')
+    parser.add_argument('--url', help='Target a running server instead of the in-process app')
+    parser.add_argument('--timeout', type=float, default=60.0, help='Per-request timeout with --url')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='Write the report to this JSON file')
+    args = parser.parse_args(argv)
+    if args.duration is None and args.requests is None:
+        args.duration = 10.0
+    try:
+        parse_mix(args.mix)
+    except ValueError as e:
+        parser.error(str(e))
+    # Per-request INFO logs from the server would drown the report
+    logging.disable(logging.INFO)
+
+    report = asyncio.run(run_load_test(args))
+    print_report(report)
+    if args.output:
+        with open(args.output, 'w') as handle:
+            json.dump(report, handle, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,246 @@
+"""
+Benchmark suite for pattern detection, upstream response formatting and the
+analyze endpoint.
+
+    python -m benchmarks.run --output results.json
+    python -m benchmarks.run --sizes 30 1000 --compare baseline.json
+
+Results are written as JSON; `--compare` reports the change in median time
+per benchmark against an earlier results file and exits non-zero when any
+benchmark slowed down by more than `--threshold`.
+
+The scalar reference implementation only runs up to `--scalar-max-size`.
+"""
+import argparse
+import json
+import logging
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+from benchmarks.synthetic import CANDLE_MS, coingecko_payloads, synthetic_series
+from services.backtest import backtest_chunk
+from services.candle_store import CandleStore
+from services.crypto_service import BaseCoinGeckoService
+from services.pattern_service import PatternDetectionService
+
+DEFAULT_SIZES = [30, 1000, 10000, 100000, 1000000]
+# The per-index scalar reference takes tens of seconds beyond this
+SCALAR_MAX_SIZE = 100000
+ANALYZE_DAYS = [7, 30, 90, 365]
+
+
+def measure(func: Callable[[], Any], repeat: int) -> Dict[str, float]:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return {
+        'min_s': min(timings),
+        'median_s': statistics.median(timings),
+        'mean_s': statistics.fmean(timings),
+        'repeat': repeat,
+    }
+
+
+def bench_detection(sizes: List[int], repeat: int, scalar_max_size: int = SCALAR_MAX_SIZE) -> List[Dict[str, Any]]:
+    service = PatternDetectionService()
+    results = []
+    for size in sizes:
+        series = synthetic_series(size)
+        candidates = service._detect_candidates_vectorized(series)
+        cases = [
+            ('_detect_candidates_vectorized', lambda: service._detect_candidates_vectorized(series)),
+            ('detect_head_and_shoulders', lambda: service.detect_head_and_shoulders(series)),
+            # Pruning sorts its input in place; time it on a fresh copy
+            ('_remove_overlapping_patterns', lambda: service._remove_overlapping_patterns(list(candidates))),
+            ('backtest_chunk', lambda: backtest_chunk(series, 0, size)),
+        ]
+        if size <= scalar_max_size:
+            cases.append((
+                'detect_head_and_shoulders_scalar',
+                lambda: service.detect_head_and_shoulders(series, vectorized=False)
+            ))
+        for name, func in cases:
+            results.append({'name': name, 'size': size, **measure(func, repeat)})
+    return results
+
+
+def bench_formatting(sizes: List[int], repeat: int) -> List[Dict[str, Any]]:
+    """Time the conversion of raw CoinGecko payloads into an OHLCVSeries"""
+    service = BaseCoinGeckoService()
+    results = []
+    for size in sizes:
+        ohlc, market_chart = coingecko_payloads(synthetic_series(size))
+        volumes = market_chart['total_volumes']
+        results.append({
+            'name': '_build_series',
+            'size': size,
+            **measure(lambda: service._build_series('SYN', ohlc, volumes, 365), repeat)
+        })
+    return results
+
+
+def bench_candle_store(sizes: List[int], repeat: int) -> List[Dict[str, Any]]:
+    """Read the newest half of a stored series and scan it for patterns"""
+    results = []
+    with tempfile.TemporaryDirectory() as root:
+        store = CandleStore(root)
+        for size in sizes:
+            series = synthetic_series(size, symbol=f'SYN{size}')
+            store.append(series)
+            middle = int(series.timestamp[size // 2])
+            results.append({
+                'name': 'candle_store_read',
+                'size': size,
+                **measure(lambda: store.read(series.symbol, CANDLE_MS, middle), repeat)
+            })
+            results.append({
+                'name': 'candle_store_scan',
+                'size': size,
+                **measure(lambda: PatternDetectionService().scan(store.read(series.symbol, CANDLE_MS, middle)), repeat)
+            })
+    return results
+
+
+def bench_analyze(days_windows: List[int], repeat: int, latency: float) -> List[Dict[str, Any]]:
+    """POST /api/crypto/analyze against local upstream and Mongo stand-ins; size is the days window"""
+    from benchmarks.harness import local_app
+    import server
+
+    results = []
+    for days in days_windows:
+        body = {'symbol': 'BTC', 'days': days}
+        with local_app(latency=latency, cache_ttl=0) as (client, upstream, _):
+            market_data = server.market_data
+            # Candles written back to Mongo by earlier requests would be
+            # served without going upstream
+            market_data.collection = None
+
+            def uncached():
+                market_data.series_cache.invalidate()
+                market_data.price_cache.invalidate()
+                client.post('/api/crypto/analyze', json=body).raise_for_status()
+
+            cold = measure(uncached, repeat)
+            # Anything less means some tier still answered the "uncached" requests
+            if upstream.count('/ohlc') != repeat:
+                raise RuntimeError(f"analyze_uncached made {upstream.count('/ohlc')} upstream calls for {repeat} requests")
+            results.append({'name': 'analyze_uncached', 'size': days, **cold})
+        with local_app(latency=latency) as (client, upstream, _):
+            client.post('/api/crypto/analyze', json=body).raise_for_status()
+            warm = measure(lambda: client.post('/api/crypto/analyze', json=body).raise_for_status(), repeat)
+            results.append({'name': 'analyze_cached', 'size': days, **warm})
+    return results
+
+
+def environment() -> Dict[str, Any]:
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'commit': commit,
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+    }
+
+
+def run_benchmarks(
+    sizes: List[int],
+    repeat: int = 5,
+    analyze_days: Optional[List[int]] = None,
+    latency: float = 0.0,
+    scalar_max_size: int = SCALAR_MAX_SIZE
+) -> Dict[str, Any]:
+    results = (
+        bench_detection(sizes, repeat, scalar_max_size)
+        + bench_formatting(sizes, repeat)
+        + bench_candle_store(sizes, repeat)
+    )
+    if analyze_days:
+        results += bench_analyze(analyze_days, repeat, latency)
+    return {'environment': environment(), 'results': results}
+
+
+def result_key(result: Dict[str, Any]) -> str:
+    return f"{result['name']}[{result['size']}]"
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[Dict[str, Any]]:
+    """Median-time ratio of every benchmark present in both result sets"""
+    previous = {result_key(result): result for result in baseline['results']}
+    rows = []
+    for result in current['results']:
+        before = previous.get(result_key(result))
+        if before is None or not before['median_s']:
+            continue
+        ratio = result['median_s'] / before['median_s']
+        rows.append({
+            'benchmark': result_key(result),
+            'baseline_s': before['median_s'],
+            'current_s': result['median_s'],
+            'ratio': ratio,
+            'regression': ratio > 1 + threshold,
+        })
+    return rows
+
+
+def print_results(results: List[Dict[str, Any]]):
+    for result in results:
+        print(f"{result_key(result):<50} median {result['median_s'] * 1000:10.3f} ms  min {result['min_s'] * 1000:10.3f} ms", flush=True)
+
+
+def print_comparison(rows: List[Dict[str, Any]]):
+    for row in rows:
+        flag = '  REGRESSION' if row['regression'] else ''
+        print(f"{row['benchmark']:<50} {row['baseline_s'] * 1000:10.3f} -> {row['current_s'] * 1000:10.3f} ms  x{row['ratio']:.2f}{flag}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help='Candle counts to benchmark')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--analyze-days', type=int, nargs='*', default=ANALYZE_DAYS,
+                        help='Windows for the end-to-end analyze benchmark (empty to skip)')
+    parser.add_argument('--scalar-max-size', type=int, default=SCALAR_MAX_SIZE,
+                        help='Largest size for the scalar reference implementation')
+    parser.add_argument('--latency', type=float, default=0.0, help='Injected upstream latency in seconds')
+    parser.add_argument('--output', help='Write results to this JSON file')
+    parser.add_argument('--compare', help='Compare against an earlier results file')
+    parser.add_argument('--threshold', type=float, default=0.1, help='Allowed slowdown before flagging, e.g. 0.1 = 10%%')
+    args = parser.parse_args(argv)
+    # Per-request INFO logs from the server would drown the results
+    logging.disable(logging.INFO)
+    
+    report = run_benchmarks(args.sizes, args.repeat, args.analyze_days, args.latency, args.scalar_max_size)
+    print_results(report['results'])
+    
+    if args.output:
+        with open(args.output, 'w') as handle:
+            json.dump(report, handle, indent=2)
+    
+    if args.compare:
+        with open(args.compare) as handle:
+            rows = compare(report, json.load(handle), args.threshold)
+        print()
+        print_comparison(rows)
+        if any(row['regression'] for row in rows):
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
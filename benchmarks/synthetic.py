@@ -0,0 +1,70 @@
+"""
+Deterministic synthetic OHLCV data for benchmarks.
+The same (size, seed) always yields the same candles, so timings from
+different runs are measured on identical inputs.
+"""
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from services.ohlcv import OHLCVSeries
+
+CANDLE_MS = 4 * 60 * 60 * 1000
+START_MS = 1577836800000  # 2020-01-01 00:00 UTC
+
+# Offsets and relative heights of a head-and-shoulders top the detector finds
+_SHAPE = [(-9, 0.06), (0, 0.12), (9, 0.065)]
+
+
+def synthetic_series(size: int, seed: int = 0, symbol: str = 'SYN', pattern_every: int = 200) -> OHLCVSeries:
+    """
+    Random-walk candles with a head-and-shoulders top planted every
+    `pattern_every` candles (0 disables planting).
+    """
+    rng = np.random.default_rng(seed)
+    closes = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, size)))
+    
+    if pattern_every:
+        for center in range(pattern_every // 2, size - 15, pattern_every):
+            if center < 15:
+                continue
+            base = closes[center - 15:center + 15].mean()
+            closes[center - 15:center + 15] = base * (1 + rng.normal(0, 0.002, 30))
+            for offset, height in _SHAPE:
+                closes[center + offset] = base * (1 + height)
+    
+    spread = np.abs(rng.normal(0, 0.005, size))
+    opens = np.r_[closes[0], closes[:-1]]
+    return OHLCVSeries(
+        symbol,
+        START_MS + np.arange(size, dtype=np.int64) * CANDLE_MS,
+        opens,
+        np.maximum(opens, closes) * (1 + spread),
+        np.minimum(opens, closes) * (1 - spread),
+        closes,
+        rng.integers(100000, 5000000, size).astype(np.float64),
+        interval_ms=CANDLE_MS
+    )
+
+
+def planted_centers(size: int, pattern_every: int = 200) -> List[int]:
+    if not pattern_every:
+        return []
+    return [center for center in range(pattern_every // 2, size - 15, pattern_every) if center >= 15]
+
+
+def coingecko_payloads(series: OHLCVSeries) -> Tuple[List[List[float]], Dict[str, List[List[float]]]]:
+    """The /ohlc rows and /market_chart document CoinGecko would return for `series`"""
+    timestamps = series.timestamp.tolist()
+    ohlc = [
+        [ts, o, h, l, c]
+        for ts, o, h, l, c in zip(
+            timestamps, series.open.tolist(), series.high.tolist(),
+            series.low.tolist(), series.close.tolist()
+        )
+    ]
+    market_chart = {
+        'prices': [[ts, c] for ts, c in zip(timestamps, series.close.tolist())],
+        'total_volumes': [[ts, v] for ts, v in zip(timestamps, series.volume.tolist())],
+    }
+    return ohlc, market_chart
@@ -0,0 +1,43 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+# The backend is run from its own directory (`from models import ...`),
+# so make its modules importable the same way for the tests
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'backend'))
+
+from benchmarks.fake_coingecko import FakeCoinGecko  # noqa: E402
+from services.ohlcv import OHLCVSeries  # noqa: E402
+
+
+@pytest.fixture
+def fake_coingecko():
+    with FakeCoinGecko() as server:
+        yield server
+
+
+@pytest.fixture
+def random_series():
+    """random_series(n, seed, symbol='BTC'): a random walk of 4h candles"""
+    def make(n, seed, symbol='BTC'):
+        rng = np.random.default_rng(seed)
+        closes = 100 * np.exp(np.cumsum(rng.normal(0, 0.03, n)))
+        volumes = rng.integers(0, 2000000, n)
+        return OHLCVSeries(
+            symbol, 1700000000000 + np.arange(n) * 14400000,
+            closes, closes, closes, closes, volumes
+        )
+    return make
+
+
+@pytest.fixture
+def apply_delta():
+    """apply_delta(current, delta): patterns by center index after a pattern delta"""
+    def apply(current, delta):
+        removed = {p['center_index'] for p in delta['removed']}
+        current = {center: p for center, p in current.items() if center not in removed}
+        current.update({p['center_index']: p for p in delta['added']})
+        return current
+    return apply
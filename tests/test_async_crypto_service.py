@@ -0,0 +1,142 @@
+import asyncio
+import time
+
+import pytest
+
+from services.async_crypto_service import AsyncCoinGeckoService
+from services.crypto_service import BaseCoinGeckoService
+from services.metrics import FALLBACK_DATA, UPSTREAM_RATE_LIMITED
+
+
+def run(fake, coro_factory, **options):
+    async def main():
+        service = AsyncCoinGeckoService(base_url=fake.base_url, timeout=2.0, backoff_base=0.01, **options)
+        try:
+            return await coro_factory(service)
+        finally:
+            await service.aclose()
+    return asyncio.run(main())
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    """Delays the client backs off for; the sleeps themselves are skipped"""
+    delays = []
+    real_sleep = asyncio.sleep
+
+    async def record(delay, *args, **kwargs):
+        delays.append(delay)
+        await real_sleep(0)
+
+    monkeypatch.setattr('services.async_crypto_service.asyncio.sleep', record)
+    return delays
+
+
+def test_market_snapshot_runs_sub_requests_concurrently(fake_coingecko):
+    fake = fake_coingecko
+    fake.latency = 0.3
+
+    started = time.perf_counter()
+    series, price = run(fake, lambda service: service.get_market_snapshot('BTC', 7))
+    elapsed = time.perf_counter() - started
+
+    assert len(series) == 42
+    assert series.symbol == 'BTC'
+    assert series.volume[0] == 1000000
+    assert price == {'current_price': price['current_price'], 'price_change_24h': 1.5}
+    assert price['current_price'] > 0
+    assert fake.count('/ohlc') == fake.count('/market_chart') == fake.count('/simple/price') == 1
+    # Three sequential round-trips would take at least 0.9s
+    assert elapsed < 0.8
+
+
+def test_rate_limited_request_is_retried(fake_coingecko, sleeps):
+    fake = fake_coingecko
+    # Both initial requests (/ohlc and /market_chart) are rate limited
+    fake.fail_first = 2
+    fake.retry_after = 5
+    before = sum(UPSTREAM_RATE_LIMITED.value(endpoint=endpoint) for endpoint in ('ohlc', 'market_chart'))
+
+    series = run(fake, lambda service: service.get_historical_data('ETH', 7))
+
+    assert len(series) == 42
+    assert not series.is_fallback
+    after = sum(UPSTREAM_RATE_LIMITED.value(endpoint=endpoint) for endpoint in ('ohlc', 'market_chart'))
+    assert after - before == 2
+    assert fake.count('/ohlc') == fake.count('/market_chart') == 2
+    # Retry-After is honored, plus at most backoff_base of jitter
+    assert len(sleeps) == 2
+    assert all(5 <= delay <= 5.01 for delay in sleeps)
+
+
+def test_falls_back_when_upstream_times_out(fake_coingecko):
+    fake = fake_coingecko
+    fake.latency = 3.0
+
+    series = run(fake, lambda service: service.get_historical_data('SOL', 10))
+
+    # Fallback data is one candle per day
+    assert len(series) == 10
+
+
+def test_fallback_metric_labels_only_supported_symbols():
+    service = BaseCoinGeckoService()
+    before_btc, before_other = FALLBACK_DATA.value(symbol='BTC'), FALLBACK_DATA.value(symbol='other')
+
+    service._get_fallback_data('btc', 3)
+    service._get_fallback_data('NOT-A-COIN-1', 3)
+    service._get_fallback_data('NOT-A-COIN-2', 3)
+
+    assert FALLBACK_DATA.value(symbol='BTC') - before_btc == 1
+    assert FALLBACK_DATA.value(symbol='other') - before_other == 2
+    assert FALLBACK_DATA.value(symbol='NOT-A-COIN-1') == 0
+
+
+def test_identical_concurrent_requests_are_coalesced(fake_coingecko):
+    fake = fake_coingecko
+    fake.latency = 0.2
+
+    async def fifty_clients(service):
+        return await asyncio.gather(*(service.get_market_snapshot('BTC', 30) for _ in range(50)))
+
+    results = run(fake, fifty_clients)
+
+    assert len(results) == 50
+    assert fake.count('/ohlc') == fake.count('/market_chart') == fake.count('/simple/price') == 1
+
+
+def test_rate_limit_without_retry_after_backs_off_exponentially(fake_coingecko, sleeps):
+    fake = fake_coingecko
+    fake.fail_first = 2
+
+    price = run(fake, lambda service: service.get_current_price('BTC'))
+
+    assert price['current_price'] > 0
+    assert fake.count('/simple/price') == 3
+    # Full jitter below backoff_base * 2 ** attempt
+    assert len(sleeps) == 2
+    assert 0 <= sleeps[0] <= 0.01 and 0 <= sleeps[1] <= 0.02
+
+
+def test_unavailable_upstream_gives_up_after_max_retries(fake_coingecko, sleeps):
+    fake = fake_coingecko
+    fake.fail_first = 100
+    fake.fail_status = 503
+
+    price = run(fake, lambda service: service.get_current_price('BTC'), max_retries=2)
+
+    assert price == {'current_price': 0, 'price_change_24h': 0}
+    assert fake.count('/simple/price') == 3
+    assert len(sleeps) == 2
+
+
+def test_other_server_errors_are_not_retried(fake_coingecko, sleeps):
+    fake = fake_coingecko
+    fake.fail_first = 100
+    fake.fail_status = 500
+
+    series = run(fake, lambda service: service.get_historical_data('SOL', 7))
+
+    assert series.is_fallback
+    assert fake.count('/ohlc') == fake.count('/market_chart') == 1
+    assert sleeps == []
@@ -0,0 +1,66 @@
+import pytest
+
+from services.backtest import (
+    backtest_chunk, confidence_bucket, forward_returns, plan_chunks, rolling_signals, summarize
+)
+from services.incremental_detector import IncrementalPatternDetector
+from services.pattern_service import PatternDetectionService
+
+
+@pytest.mark.parametrize('seed', range(4))
+def test_signals_match_a_candle_by_candle_detector(seed, random_series):
+    series = random_series(500, seed)
+    service = PatternDetectionService()
+    detector = IncrementalPatternDetector('BTC', service)
+
+    live = []
+    for index in range(len(series)):
+        live.extend((index, p['center_index']) for p in detector.append(series[index:index + 1])['added'])
+
+    replayed = [(s['signal_index'], s['center_index']) for s in rolling_signals(series, service)]
+    assert replayed and sorted(replayed) == sorted(live)
+
+
+def test_signals_never_read_candles_after_they_are_raised(random_series):
+    series = random_series(400, 2)
+    service = PatternDetectionService()
+    for signal in rolling_signals(series, service):
+        truncated = series[:signal['signal_index'] + 1]
+        assert any(
+            s['center_index'] == signal['center_index'] and s['signal_index'] == signal['signal_index']
+            for s in rolling_signals(truncated, service)
+        )
+
+
+def test_chunked_backtest_equals_single_pass(random_series):
+    series = random_series(900, 7)
+    whole = backtest_chunk(series, 0, len(series), (6, 30))
+
+    chunked = []
+    for slice_start, slice_stop, start, stop in plan_chunks(len(series), 128, max_horizon=30):
+        chunked.extend(backtest_chunk(series[slice_start:slice_stop], start, stop, (6, 30)))
+
+    key = lambda s: (s['signal_timestamp'], s['center_timestamp'])
+    assert sorted(chunked, key=key) == sorted(whole, key=key)
+
+
+def test_forward_returns_and_summary(random_series):
+    series = random_series(50, 1)
+    returns = forward_returns(series, 40, (5, 20))
+    assert returns[0] == pytest.approx(series.close[45] / series.close[40] - 1)
+    assert returns[1] is None
+
+    signals = [
+        {'signal': 'Bearish Reversal', 'strength': 'Strong', 'confidence': 95, 'returns': [-0.10, None]},
+        {'signal': 'Bullish Reversal', 'strength': 'Weak', 'confidence': 72, 'returns': [-0.02, 0.04]},
+        {'signal': 'Bullish Reversal', 'strength': 'Weak', 'confidence': 65, 'returns': [0.06, 0.01]},
+    ]
+    summary = summarize(signals, (5, 20))
+    overall = summary['overall']['horizons']
+    assert overall[0]['samples'] == 3
+    assert overall[0]['mean_return'] == pytest.approx((0.10 - 0.02 + 0.06) / 3)
+    assert overall[0]['hit_rate'] == pytest.approx(2 / 3)
+    assert overall[1]['samples'] == 2
+    assert [bucket['key'] for bucket in summary['by_confidence']] == ['60-69', '70-79', '90+']
+    assert [bucket['key'] for bucket in summary['by_strength']] == ['Weak', 'Strong']
+    assert confidence_bucket(80) == '80-89'
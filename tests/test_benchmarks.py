@@ -0,0 +1,87 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from benchmarks.loadtest import drive, local_client, parse_mix
+from benchmarks.run import compare, run_benchmarks
+from benchmarks.synthetic import coingecko_payloads, planted_centers, synthetic_series
+from services.crypto_service import BaseCoinGeckoService
+from services.pattern_service import PatternDetectionService
+
+
+def test_synthetic_series_is_deterministic():
+    first, second = synthetic_series(500, seed=3), synthetic_series(500, seed=3)
+    assert len(first) == 500
+    np.testing.assert_array_equal(first.close, second.close)
+    assert not np.array_equal(first.close, synthetic_series(500, seed=4).close)
+    assert (first.high >= first.close).all() and (first.low <= first.close).all()
+
+
+def test_planted_patterns_are_detected():
+    series = synthetic_series(2000)
+    centers = [p['center_index'] for p in PatternDetectionService().detect_head_and_shoulders(series)]
+    for planted in planted_centers(2000):
+        assert any(abs(center - planted) <= 3 for center in centers)
+
+
+def test_payloads_round_trip_through_build_series():
+    series = synthetic_series(100)
+    ohlc, market_chart = coingecko_payloads(series)
+    built = BaseCoinGeckoService()._build_series('SYN', ohlc, market_chart['total_volumes'], 30)
+    np.testing.assert_array_equal(built.close, series.close)
+    np.testing.assert_array_equal(built.volume, series.volume)
+
+
+def test_run_and_compare(monkeypatch):
+    monkeypatch.setenv('DETECTION_WORKERS', '1')
+    report = run_benchmarks([30, 300], repeat=1, analyze_days=[7])
+    names = {(result['name'], result['size']) for result in report['results']}
+    assert ('detect_head_and_shoulders', 300) in names
+    assert ('_remove_overlapping_patterns', 300) in names
+    assert ('_build_series', 30) in names
+    assert ('analyze_cached', 7) in names
+    
+    slower = {'results': [dict(result, median_s=result['median_s'] * 2) for result in report['results']]}
+    rows = compare(slower, report, threshold=0.1)
+    assert rows and all(row['regression'] for row in rows)
+    assert not any(row['regression'] for row in compare(report, report, threshold=0.1))
+
+
+def test_load_test_reports_every_endpoint(monkeypatch):
+    monkeypatch.setenv('DETECTION_WORKERS', '1')
+    mix = {'analyze': 1, 'patterns': 1, 'status': 1, 'status_write': 1}
+
+    async def run():
+        async with local_client() as (client, upstream):
+            report = await drive(client, mix, concurrency=3, total_requests=24, symbols=['BTC', 'ETH'], days=[7])
+            return report, len(upstream.requests)
+
+    report, upstream_requests = asyncio.run(run())
+    assert report['overall']['requests'] == 24
+    assert report['overall']['errors'] == 0
+    assert set(report['endpoints']) <= set(mix)
+    assert sum(stats['requests'] for stats in report['endpoints'].values()) == 24
+    latency = report['overall']['latency_ms']
+    assert latency['p50'] <= latency['p95'] <= latency['p99'] <= latency['max']
+    assert upstream_requests > 0
+
+
+def test_parse_mix_rejects_unknown_endpoints():
+    assert parse_mix('analyze=5,status') == {'analyze': 5.0, 'status': 1.0}
+    with pytest.raises(ValueError):
+        parse_mix('analyze=1,search=2')
+    with pytest.raises(ValueError):
+        parse_mix('analyze=0')
+
+
+def test_load_test_bypasses_latest_analysis_unless_asked():
+    import server
+
+    async def uses_store(latest_analysis):
+        async with local_client(latest_analysis=latest_analysis):
+            return server.uses_latest_analysis(server.CryptoAnalysisRequest(symbol='BTC', days=30))
+
+    assert asyncio.run(uses_store(False)) is False
+    assert asyncio.run(uses_store(True)) is True
+    assert not server.analysis_scheduler.running
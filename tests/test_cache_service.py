@@ -0,0 +1,158 @@
+import asyncio
+import time
+
+import numpy as np
+
+from benchmarks.fake_mongo import FakeDatabase
+from services.async_crypto_service import AsyncCoinGeckoService
+from services.cache_service import CachedMarketDataService, LRUCache, tail_days
+from services.candle_store import CandleStore
+from services.crypto_service import DAY_MS
+
+
+class FakeClock:
+    def __init__(self, now=0.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def test_lru_cache_expires_and_evicts_by_size():
+    clock = FakeClock()
+    cache = LRUCache(max_size=10, ttl=5.0, sizeof=len, clock=clock)
+
+    cache.set('a', 'xxxx')
+    cache.set('b', 'yyyy')
+    assert cache.get('a') == 'xxxx'
+    cache.set('c', 'zzzz')  # evicts 'b', the least recently used
+
+    assert cache.get('b') is None
+    assert cache.size == 8
+    assert cache.evictions == 1
+
+    clock.now = 6.0
+    assert cache.get('a') is None
+    assert cache.get_entry('a') == ('xxxx', 6.0)
+
+
+def test_tail_days_keeps_granularity():
+    assert tail_days(DAY_MS // 2, 30) == 7
+    assert tail_days(20 * DAY_MS, 30) is None
+    assert tail_days(40 * DAY_MS, 365) == 90
+    assert tail_days(DAY_MS, 90) is None
+
+
+def run(fake, scenario, collection=None, clock=time.time, candle_store=None, on_fetched=None):
+    async def main():
+        upstream = AsyncCoinGeckoService(base_url=fake.base_url)
+        cache = CachedMarketDataService(
+            upstream, collection, ttl=60.0, clock=clock, candle_store=candle_store, on_fetched=on_fetched
+        )
+        try:
+            return await scenario(cache)
+        finally:
+            await upstream.aclose()
+    return asyncio.run(main())
+
+
+def test_repeated_requests_are_served_from_memory(fake_coingecko):
+    async def scenario(cache):
+        first = await cache.get_historical_data('BTC', 30)
+        second = await cache.get_historical_data('btc', 14)
+        return first, second
+
+    first, second = run(fake_coingecko, scenario)
+
+    assert fake_coingecko.count('/ohlc') == 1
+    assert len(second) < len(first)
+    assert second.timestamp[-1] == first.timestamp[-1]
+
+
+def test_refresh_locks_are_dropped_once_idle(fake_coingecko):
+    fake_coingecko.latency = 0.1
+
+    async def scenario(cache):
+        symbols = ['BTC', 'ETH'] + [f'UNKNOWN{index}' for index in range(20)]
+        await asyncio.gather(*(cache.get_historical_data(symbol, 30) for symbol in symbols * 2))
+        return cache
+
+    cache = run(fake_coingecko, scenario)
+
+    assert cache._locks == {}
+    # Concurrent requests for one key still refreshed it once
+    assert fake_coingecko.count('/bitcoin/ohlc') == 1
+
+
+def test_stale_entry_fetches_only_the_tail(fake_coingecko):
+    clock = FakeClock(time.time())
+
+    async def scenario(cache):
+        first = await cache.get_historical_data('ETH', 30)
+        # Two days later the cached candles are stale and two days short
+        clock.now += 2 * 86400
+        fake_coingecko.requests.clear()
+        second = await cache.get_historical_data('ETH', 30)
+        return first, second
+
+    fetched = []
+
+    async def on_fetched(series):
+        fetched.append(len(series))
+
+    first, second = run(fake_coingecko, scenario, clock=clock, on_fetched=on_fetched)
+
+    assert fake_coingecko.count('/ohlc') == 1
+    # Only the fetched candles are handed on: the full window, then the tail
+    assert fetched[0] == len(first) and len(fetched) == 2 and fetched[1] < fetched[0]
+    # The stand-in upstream does not move forward in time, so the window
+    # just slides two days (12 four-hour candles) past its first candles
+    assert len(second) == len(first) - 12
+    assert second.timestamp[-1] == first.timestamp[-1]
+
+
+def test_collection_tier_serves_persisted_candles(fake_coingecko):
+    db = FakeDatabase()
+
+    async def scenario(cache):
+        series = await cache.upstream.get_historical_data('SOL', 30)
+        db.crypto_data.documents.extend(series.to_documents())
+        fake_coingecko.requests.clear()
+        return series, await cache.get_historical_data('SOL', 30)
+
+    persisted, cached = run(fake_coingecko, scenario, collection=db.crypto_data)
+
+    assert fake_coingecko.count('/ohlc') == 0
+    assert cached.close.tolist() == persisted.close.tolist()
+
+
+def test_candle_store_serves_a_fresh_process(fake_coingecko, tmp_path):
+    store = CandleStore(tmp_path)
+    first = run(fake_coingecko, lambda cache: cache.get_historical_data('SOL', 30), candle_store=store)
+    assert store.count('SOL', first.interval_ms) == 180
+
+    # New cache and no Mongo: the history comes from disk, not upstream
+    second = run(fake_coingecko, lambda cache: cache.get_historical_data('SOL', 30), candle_store=CandleStore(tmp_path))
+    assert fake_coingecko.count('/ohlc') == 1
+    assert np.array_equal(second.close, first.close)
+
+
+def test_windows_beyond_upstream_reach_are_cached(fake_coingecko, tmp_path):
+    async def scenario(cache):
+        return [await cache.get_historical_data('BTC', 1000) for _ in range(5)]
+
+    results = run(fake_coingecko, scenario, candle_store=CandleStore(tmp_path))
+
+    # Upstream only has 365 days; once those are cached the longer window is as covered as it gets
+    assert fake_coingecko.count('/ohlc') == 1
+    assert all(np.array_equal(series.close, results[0].close) for series in results)
+
+
+def test_symbols_the_candle_store_cannot_file_skip_it(fake_coingecko, tmp_path):
+    series = run(
+        fake_coingecko, lambda cache: cache.get_historical_data('BTC USD', 30), candle_store=CandleStore(tmp_path)
+    )
+
+    assert len(series) > 0
+    assert fake_coingecko.count('/ohlc') == 1
+    assert list(tmp_path.iterdir()) == []
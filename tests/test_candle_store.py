@@ -0,0 +1,97 @@
+import numpy as np
+import pytest
+
+from services.candle_store import CandleStore
+from services.pattern_service import PatternDetectionService
+
+INTERVAL = 14400000
+
+
+@pytest.fixture
+def stored_series(random_series):
+    def make(n, seed=0, symbol='BTC'):
+        series = random_series(n, seed, symbol)
+        series.interval_ms = INTERVAL
+        return series
+    return make
+
+
+def test_append_and_read_range(tmp_path, stored_series):
+    store = CandleStore(tmp_path)
+    series = stored_series(50)
+
+    assert store.append(series[:30]) == 30
+    assert store.append(series[20:]) == 20  # overlap is skipped
+    assert store.count('btc', INTERVAL) == 50
+    assert store.series_keys() == [('BTC', INTERVAL)]
+
+    window = store.read('BTC', INTERVAL, int(series.timestamp[10]), int(series.timestamp[40]))
+    assert np.array_equal(window.timestamp, series.timestamp[10:40])
+    assert np.array_equal(window.close, series.close[10:40])
+    assert window.interval_ms == INTERVAL
+    assert store.last_timestamp('BTC', INTERVAL) == series.timestamp[-1]
+
+
+def test_reads_are_views_of_the_mapped_files(tmp_path, stored_series):
+    store = CandleStore(tmp_path)
+    store.append(stored_series(100))
+
+    first = store.read('BTC', INTERVAL)
+    second = store.read('BTC', INTERVAL, int(first.timestamp[50]))
+    assert np.shares_memory(first.close, second.close)
+    assert isinstance(store._columns('BTC', INTERVAL)['close'], np.memmap)
+
+
+def test_last_candle_is_replaced_in_place(tmp_path, stored_series):
+    store = CandleStore(tmp_path)
+    series = stored_series(10)
+    store.append(series)
+
+    updated = series[9:]
+    updated.close = updated.close + 5
+    assert store.append(updated) == 0
+    assert store.read('BTC', INTERVAL).close[-1] == series.close[-1] + 5
+
+
+def test_uncommitted_rows_are_ignored_and_discarded(tmp_path, stored_series):
+    store = CandleStore(tmp_path)
+    series = stored_series(20)
+    store.append(series[:10])
+    # An append that died after writing prices but before timestamps
+    with open(tmp_path / 'BTC' / str(INTERVAL) / 'close.bin', 'ab') as handle:
+        handle.write(np.zeros(3).tobytes())
+
+    assert len(store.read('BTC', INTERVAL)) == 10
+    store.append(series[10:])
+    assert np.array_equal(store.read('BTC', INTERVAL).close, series.close)
+
+
+def test_fallback_unknown_interval_and_bad_symbols_are_rejected(tmp_path, random_series, stored_series):
+    store = CandleStore(tmp_path)
+    fallback = stored_series(10)
+    fallback.is_fallback = True
+    assert store.append(fallback) == 0
+    assert store.append(random_series(10, 0)) == 0
+    assert len(store.read('BTC', INTERVAL)) == 0
+    with pytest.raises(ValueError):
+        store.read('../etc', INTERVAL)
+
+
+@pytest.mark.parametrize('symbol', ['.', '..', '-', '_BTC', 'BTC/ETH', ''])
+def test_dot_only_and_path_like_symbols_are_rejected(tmp_path, symbol):
+    store = CandleStore(tmp_path)
+    assert not store.accepts(symbol)
+    with pytest.raises(ValueError):
+        store.read(symbol, INTERVAL)
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_scan_over_stored_history_matches_full_detection(tmp_path, stored_series):
+    store = CandleStore(tmp_path)
+    series = stored_series(3000, seed=5)
+    store.append(series)
+    service = PatternDetectionService()
+
+    scanned = service.scan(store.read('BTC', INTERVAL), chunk_size=257)
+    assert scanned
+    assert scanned == service.detect_head_and_shoulders(series)
@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+
+from services.incremental_detector import IncrementalPatternDetector
+from services.ohlcv import OHLCVSeries
+from services.pattern_service import PatternDetectionService
+
+
+@pytest.mark.parametrize('seed', range(8))
+def test_incremental_matches_full_scan(seed, random_series, apply_delta):
+    series = random_series(400, seed)
+    service = PatternDetectionService()
+    detector = IncrementalPatternDetector('BTC', service)
+    rng = np.random.default_rng(seed)
+
+    from_deltas = {}
+    position = 0
+    while position < len(series):
+        step = int(rng.integers(1, 12))
+        from_deltas = apply_delta(from_deltas, detector.append(series[position:position + step]))
+        position += step
+
+        expected = service.detect_head_and_shoulders(series[:position])
+        assert detector.patterns() == expected
+        assert sorted(from_deltas) == sorted(p['center_index'] for p in expected)
+
+
+def test_replacing_recent_candles_updates_patterns(random_series):
+    original = random_series(300, 1)
+    revised = random_series(300, 2)
+    # The last 40 candles get revised values with the same timestamps
+    revised_tail = OHLCVSeries(
+        'BTC', original.timestamp[260:], revised.open[260:], revised.high[260:],
+        revised.low[260:], revised.close[260:], revised.volume[260:]
+    )
+    service = PatternDetectionService()
+    detector = IncrementalPatternDetector('BTC', service)
+
+    detector.append(original)
+    detector.append(revised_tail)
+
+    expected = original[:260].merge(revised_tail)
+    assert detector.patterns() == service.detect_head_and_shoulders(expected)
+    assert len(detector) == 300
@@ -0,0 +1,98 @@
+import asyncio
+
+from benchmarks.fake_mongo import FakeDatabase
+from services.jobs import AnalysisJobQueue, JobFailed, job_key
+
+
+def params(symbol, days=30, **extra):
+    return {'symbol': symbol, 'days': days, 'pattern_types': None, 'timeframe': None, **extra}
+
+
+def test_jobs_run_by_priority_and_identical_pending_jobs_are_shared():
+    order = []
+    release = None
+
+    async def run(job_params):
+        await release.wait()
+        order.append(job_params['symbol'])
+        return {'symbol': job_params['symbol']}
+
+    async def main():
+        nonlocal release
+        release = asyncio.Event()
+        queue = AnalysisJobQueue(run, FakeDatabase().analysis_jobs, workers=1)
+        await queue.start()
+        blocker, _ = await queue.submit(params('AAA'), priority=0)
+        await asyncio.sleep(0)  # the single worker picks up AAA and blocks
+        low, _ = await queue.submit(params('LOW'), priority=9)
+        high, _ = await queue.submit(params('HIGH'), priority=1)
+        duplicate, created = await queue.submit(params('high'), priority=1)
+        release.set()
+        finished = await queue.get(low['id'], wait=5)
+        await queue.stop()
+        return queue, high, duplicate, created, finished
+
+    queue, high, duplicate, created, finished = asyncio.run(main())
+
+    assert order == ['AAA', 'HIGH', 'LOW']
+    assert (duplicate['id'], created) == (high['id'], False)
+    assert finished['status'] == 'done' and finished['result'] == {'symbol': 'LOW'}
+    assert (queue.submitted, queue.deduplicated, queue.completed) == (3, 1, 3)
+
+
+def test_failures_keep_their_status_code():
+    async def run(job_params):
+        if job_params['symbol'] == 'BAD':
+            raise JobFailed(404, 'No data found for BAD')
+        raise RuntimeError('upstream exploded')
+
+    async def main():
+        queue = AnalysisJobQueue(run, workers=2)
+        await queue.start()
+        bad, _ = await queue.submit(params('BAD'))
+        broken, _ = await queue.submit(params('BTC'))
+        results = [await queue.get(job['id'], wait=5) for job in (bad, broken)]
+        await queue.stop()
+        return results
+
+    bad, broken = asyncio.run(main())
+    assert (bad['status'], bad['status_code'], bad['error']) == ('failed', 404, 'No data found for BAD')
+    assert (broken['status_code'], broken['error']) == (500, 'Analysis failed: upstream exploded')
+
+
+def test_other_workers_serve_and_deduplicate_from_mongo():
+    db = FakeDatabase()
+    release = None
+
+    async def run(job_params):
+        await release.wait()
+        return {'ok': True}
+
+    async def main():
+        nonlocal release
+        release = asyncio.Event()
+        owner = AnalysisJobQueue(run, db.analysis_jobs)
+        other = AnalysisJobQueue(run, db.analysis_jobs, poll_interval=0.01)
+        await owner.start()
+        await other.start()
+        job, _ = await owner.submit(params('ETH'))
+        await asyncio.sleep(0.01)
+        duplicate, created = await other.submit(params('ETH'))
+        pending = await other.get(job['id'])
+
+        release.set()
+        done = await other.get(job['id'], wait=5)
+        await owner.stop()
+        await other.stop()
+        return job, duplicate, created, pending, done, other
+
+    job, duplicate, created, pending, done, other = asyncio.run(main())
+    assert (duplicate['id'], created) == (job['id'], False)
+    assert pending['status'] == 'running'
+    assert done['status'] == 'done' and done['result'] == {'ok': True}
+    assert other.submitted == 0
+
+
+def test_job_key_ignores_symbol_case_and_pattern_order():
+    assert job_key(params('btc', pattern_types=['b', 'a'])) == job_key(params('BTC', pattern_types=['a', 'b']))
+    assert job_key(params('BTC', 30)) != job_key(params('BTC', 90))
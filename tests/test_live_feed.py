@@ -0,0 +1,102 @@
+import asyncio
+
+import orjson
+import pytest
+
+from services.live_feed import LiveFeed, Subscription, format_sse, parse_symbols
+from services.pattern_service import PatternDetectionService
+
+
+class RollingMarketData:
+    """Reveals a fixed series a few candles per call, like a live upstream"""
+
+    def __init__(self, series, visible=100, step=7):
+        self.series = series
+        self.visible = visible
+        self.step = step
+        self.calls = 0
+
+    async def get_market_snapshot(self, symbol, days=30, timeframe=None):
+        self.calls += 1
+        visible = self.series[:self.visible]
+        self.visible = min(len(self.series), self.visible + self.step)
+        return visible, {'current_price': float(visible.close[-1]), 'price_change_24h': 1.5}
+
+
+def drain(subscription):
+    events = []
+    while not subscription.queue.empty():
+        events.append(subscription.queue.get_nowait())
+    return events
+
+
+def test_pattern_deltas_track_full_detection(random_series, apply_delta):
+    async def main():
+        series = random_series(400, seed=3)
+        feed = LiveFeed(RollingMarketData(series), interval=3600)
+        subscription = feed.subscribe(['btc'])
+        current = {}
+        for _ in range(45):
+            await feed.poll('BTC')
+            for event in drain(subscription):
+                if event['type'] == 'patterns':
+                    current = apply_delta(current, event)
+        await feed.stop()
+        return current
+
+    current = asyncio.run(main())
+    expected = PatternDetectionService().detect_head_and_shoulders(random_series(400, seed=3))
+    assert expected
+    assert sorted(current) == sorted(p['center_index'] for p in expected)
+
+
+def test_one_poller_fans_out_to_every_subscriber(random_series):
+    async def main():
+        market_data = RollingMarketData(random_series(300, seed=1))
+        feed = LiveFeed(market_data, interval=3600)
+        first = feed.subscribe(['BTC'])
+        second = feed.subscribe(['BTC', 'BTC'])
+        await asyncio.sleep(0.05)  # let the poller run once
+
+        assert market_data.calls == 1
+        assert feed.subscriber_count == 2
+        first_events, second_events = drain(first), drain(second)
+        assert [event['type'] for event in first_events] == [event['type'] for event in second_events]
+        assert first_events[0]['type'] == 'price'
+
+        # A late subscriber gets the current state without another poll
+        late = feed.subscribe(['BTC'])
+        snapshot = drain(late)[0]
+        assert snapshot['type'] == 'snapshot'
+        assert snapshot['current_price'] == first_events[0]['current_price']
+        assert market_data.calls == 1
+
+        for subscription in (first, second, late):
+            feed.unsubscribe(subscription)
+        assert not feed._pollers
+        await feed.stop()
+
+    asyncio.run(main())
+
+
+def test_slow_subscriber_drops_oldest_events():
+    async def main():
+        subscription = Subscription(['BTC'], max_queue=2)
+        for sequence in range(5):
+            subscription.offer({'type': 'price', 'sequence': sequence})
+        return [event['sequence'] for event in drain(subscription)], subscription.dropped
+
+    assert asyncio.run(main()) == ([3, 4], 3)
+
+
+def test_parse_symbols_and_sse_framing():
+    assert parse_symbols('btc, eth,BTC,,', 5) == ['BTC', 'ETH']
+    with pytest.raises(ValueError):
+        parse_symbols(' , ', 5)
+    with pytest.raises(ValueError):
+        parse_symbols('A,B,C', 2)
+
+    frame = format_sse({'type': 'price', 'symbol': 'BTC', 'current_price': 1.0})
+    name, data, blank, end = frame.split(b'\n')
+    assert name == b'event: price' and blank == end == b''
+    assert orjson.loads(data[len(b'data: '):])['symbol'] == 'BTC'
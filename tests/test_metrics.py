@@ -0,0 +1,61 @@
+import pytest
+
+from services.metrics import (
+    MetricsRegistry, server_timing_header, stage, start_request_timings, STAGE_SECONDS
+)
+
+
+def test_counter_renders_labelled_samples():
+    registry = MetricsRegistry()
+    calls = registry.counter('calls_total', 'Calls', ('endpoint', 'status'))
+    calls.inc(endpoint='ohlc', status='200')
+    calls.inc(2, endpoint='ohlc', status='200')
+    calls.inc(endpoint='price', status='429')
+
+    text = registry.render()
+    assert '# TYPE calls_total counter' in text
+    assert 'calls_total{endpoint="ohlc",status="200"} 3' in text
+    assert 'calls_total{endpoint="price",status="429"} 1' in text
+    assert calls.value(endpoint='ohlc', status='200') == 3
+
+
+def test_labels_must_match_declaration():
+    calls = MetricsRegistry().counter('calls_total', 'Calls', ('endpoint',))
+    with pytest.raises(ValueError):
+        calls.inc(status='200')
+
+
+def test_histogram_buckets_are_cumulative():
+    registry = MetricsRegistry()
+    latency = registry.histogram('latency_seconds', 'Latency', ('stage',), buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        latency.observe(value, stage='fetch')
+
+    lines = registry.render().splitlines()
+    assert 'latency_seconds_bucket{stage="fetch",le="0.1"} 2' in lines
+    assert 'latency_seconds_bucket{stage="fetch",le="1"} 3' in lines
+    assert 'latency_seconds_bucket{stage="fetch",le="+Inf"} 4' in lines
+    assert 'latency_seconds_count{stage="fetch"} 4' in lines
+    assert 'latency_seconds_sum{stage="fetch"} 3.65' in lines
+
+
+def test_callback_metrics_are_read_at_render_time():
+    registry = MetricsRegistry()
+    state = {'depth': 1}
+    registry.callback('queue_depth', 'Depth', lambda: {(): state['depth']})
+    state['depth'] = 7
+    assert 'queue_depth 7' in registry.render()
+
+
+def test_stage_records_histogram_and_request_timings():
+    before = STAGE_SECONDS.count(stage='unit_test_stage')
+    timings = start_request_timings()
+    with stage('unit_test_stage'):
+        pass
+    with stage('unit_test_stage'):
+        pass
+
+    assert STAGE_SECONDS.count(stage='unit_test_stage') == before + 2
+    assert [name for name, _ in timings] == ['unit_test_stage', 'unit_test_stage']
+    header = server_timing_header([('fetch', 0.010), ('detect', 0.002), ('fetch', 0.005)], 0.020)
+    assert header == 'fetch;dur=15.00, detect;dur=2.00, total;dur=20.00'
@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+
+from services.ohlcv import OHLCVSeries
+from services.pattern_detectors import HIGH, LOW, ExtremaIndex, get_detectors
+from services.pattern_service import PatternDetectionService
+
+
+def series_through(points, symbol='BTC', step=6):
+    """Piecewise-linear closes through `points`, `step` bars per leg"""
+    closes = np.concatenate([
+        np.linspace(start, end, step, endpoint=False)
+        for start, end in zip(points[:-1], points[1:])
+    ] + [[points[-1]]])
+    return OHLCVSeries(
+        symbol, 1700000000000 + np.arange(len(closes)) * 14400000,
+        closes, closes, closes, closes, np.zeros(len(closes))
+    )
+
+
+def test_extrema_index_alternates_highs_and_lows():
+    series = series_through([100, 110, 100, 120, 100, 111, 100])
+    extrema = ExtremaIndex.build(series.close, order=3)
+
+    assert extrema.pivot_kinds.tolist() == [HIGH, LOW, HIGH, LOW, HIGH]
+    assert extrema.pivot_prices.tolist() == [110, 100, 120, 100, 111]
+    assert extrema.highs.tolist() == [6, 18, 30]
+
+
+def test_run_of_same_kind_keeps_most_extreme():
+    prices = np.array([0, 1, 5, 4, 4, 4, 4, 4, 4, 7, 6, 6, 6, 6, 6], dtype=float)
+    extrema = ExtremaIndex.build(prices, order=2)
+
+    assert extrema.highs.tolist() == [2, 9]
+    assert extrema.pivots.tolist() == [9]
+
+
+@pytest.mark.parametrize('points, expected', [
+    ([90, 110, 100, 120, 100, 111, 90], 'Head & Shoulders Top'),
+    ([110, 90, 100, 80, 100, 91, 110], 'Inverse Head & Shoulders'),
+    ([90, 120, 100, 121, 90], 'Double Top'),
+    ([110, 80, 100, 81, 110], 'Double Bottom'),
+    ([90, 120, 100, 121, 100, 120.5, 90], 'Triple Top'),
+])
+def test_detectors_find_planted_shapes(points, expected):
+    service = PatternDetectionService()
+    found = service.detect_patterns(series_through(points))
+
+    assert expected in {pattern['pattern_type'] for pattern in found}
+
+
+def test_inverse_head_and_shoulders_reports_troughs():
+    service = PatternDetectionService()
+    found = service.detect_patterns(
+        series_through([110, 90, 100, 80, 100, 91, 110]), ['inverse_head_and_shoulders']
+    )
+
+    assert [(p['left_shoulder'], p['head'], p['right_shoulder']) for p in found] == [(90, 80, 91)]
+    assert found[0]['signal'] == 'Bullish Reversal'
+    assert found[0]['center_index'] == 18
+
+
+def test_unknown_pattern_type_is_rejected():
+    with pytest.raises(KeyError):
+        get_detectors(['cup_and_handle'])
@@ -0,0 +1,125 @@
+import numpy as np
+import pytest
+
+from services.ohlcv import OHLCVSeries
+from services.pattern_service import DetectionConfig, PatternDetectionService
+
+
+def make_candles(closes, symbol='BTC', volume=None):
+    rng = np.random.default_rng(len(closes))
+    volumes = rng.integers(0, 2000000, len(closes)) if volume is None else [volume] * len(closes)
+    return OHLCVSeries(
+        symbol,
+        1700000000000 + np.arange(len(closes)) * 14400000,
+        closes, closes, closes, closes, volumes
+    )
+
+
+def random_walk(n, seed, decimals=None):
+    rng = np.random.default_rng(seed)
+    closes = 100 * np.exp(np.cumsum(rng.normal(0, 0.03, n)))
+    if decimals is not None:
+        # Coarse rounding produces ties and plateaus inside the windows
+        closes = np.round(closes, decimals)
+    return closes
+
+
+@pytest.mark.parametrize('seed', range(20))
+@pytest.mark.parametrize('n', [20, 31, 45, 120, 500])
+def test_vectorized_matches_scalar_on_random_walks(n, seed):
+    service = PatternDetectionService()
+    data = make_candles(random_walk(n, seed))
+
+    assert service.detect_head_and_shoulders(data) == \
+        service.detect_head_and_shoulders(data, vectorized=False)
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_vectorized_matches_scalar_with_ties(seed):
+    service = PatternDetectionService()
+    data = make_candles(random_walk(300, seed, decimals=0))
+
+    assert service.detect_head_and_shoulders(data) == \
+        service.detect_head_and_shoulders(data, vectorized=False)
+
+
+def test_vectorized_matches_scalar_on_planted_pattern():
+    service = PatternDetectionService()
+    closes = np.full(60, 100.0)
+    closes[20] = 110.0  # left shoulder
+    closes[30] = 125.0  # head
+    closes[39] = 111.0  # right shoulder
+    data = make_candles(closes, volume=5000000)
+
+    vectorized = service.detect_head_and_shoulders(data)
+
+    assert vectorized == service.detect_head_and_shoulders(data, vectorized=False)
+    assert any(p['head'] == 125.0 and p['center_index'] == 28 for p in vectorized)
+
+
+def test_short_series_has_no_patterns():
+    service = PatternDetectionService()
+
+    assert service.detect_head_and_shoulders(make_candles(random_walk(19, 0))) == []
+    assert service.detect_head_and_shoulders(OHLCVSeries.empty('BTC')) == []
+
+
+CUSTOM_CONFIGS = [
+    DetectionConfig(left_window=(-20, -8), head_window=(-4, 4), right_window=(8, 20)),
+    DetectionConfig(left_window=(-9, -5), head_window=(-2, 3), right_window=(4, 9), overlap_radius=6),
+    DetectionConfig(min_confidence=75, shoulder_tight=0.01, shoulder_loose=0.08, prominence_low=0.01),
+]
+
+
+@pytest.mark.parametrize('seed', range(5))
+@pytest.mark.parametrize('config', CUSTOM_CONFIGS)
+def test_vectorized_matches_scalar_with_custom_config(config, seed):
+    service = PatternDetectionService(config)
+    data = make_candles(random_walk(400, seed, decimals=1 if seed % 2 else None))
+
+    assert service.detect_head_and_shoulders(data) == \
+        service.detect_head_and_shoulders(data, vectorized=False)
+
+
+def test_default_config_keeps_original_constants():
+    config = DetectionConfig()
+    assert config.margin == 15
+    assert config.windows == ((-12, -6), (-3, 3), (6, 12))
+
+
+@pytest.mark.parametrize('config', [DetectionConfig()] + CUSTOM_CONFIGS)
+def test_shared_window_peaks_match_per_call_tables(config):
+    service = PatternDetectionService(config)
+    data = make_candles(random_walk(600, 3))
+    tables = service.window_peak_tables(data)
+
+    for first_center, stop_center in [(0, None), (100, 300), (250, 590)]:
+        assert service._detect_candidates_vectorized(data, first_center, stop_center, window_peaks=tables) == \
+            service._detect_candidates_vectorized(data, first_center, stop_center)
+
+
+@pytest.mark.parametrize('changes', [
+    {'left_window': (-6, -12)},
+    {'shoulder_tight': 0.06},
+    {'prominence_low': 0.08},
+    {'overlap_radius': 0},
+    {'min_confidence': 101},
+    {'volume_threshold': -1.0},
+])
+def test_invalid_config_is_rejected(changes):
+    with pytest.raises(ValueError):
+        DetectionConfig(**changes)
+
+
+@pytest.mark.parametrize('changes', [
+    {'left_window': ('a', 'b')},
+    {'head_window': (-3.5, 3)},
+    {'right_window': 6},
+    {'min_confidence': 'abc'},
+    {'min_confidence': True},
+    {'shoulder_tight': None},
+    {'overlap_radius': 2.5},
+])
+def test_mistyped_config_is_rejected(changes):
+    with pytest.raises(TypeError):
+        DetectionConfig(**changes)
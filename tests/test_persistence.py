@@ -0,0 +1,81 @@
+import asyncio
+from datetime import datetime
+
+import numpy as np
+
+from benchmarks.fake_mongo import FakeDatabase
+from services.ohlcv import OHLCVSeries
+from services.persistence import PersistenceWriter, pattern_fingerprint, pattern_identity
+
+
+def make_series(symbol, count, is_fallback=False):
+    closes = np.linspace(100, 200, count)
+    return OHLCVSeries(
+        symbol, 1700000000000 + np.arange(count) * 14400000,
+        closes, closes, closes, closes, closes,
+        interval_ms=14400000, is_fallback=is_fallback
+    )
+
+
+def test_writer_batches_and_upserts():
+    db = FakeDatabase()
+
+    async def main():
+        writer = PersistenceWriter(db, max_queue=4)
+        await writer.start()
+        for _ in range(3):
+            await writer.enqueue_candles(make_series('BTC', 50))
+        await writer.enqueue_candles(make_series('ETH', 10, is_fallback=True))
+        await writer.enqueue_patterns([{'id': 'fingerprint-1', 'symbol': 'BTC', 'confidence': 80}])
+        await writer.stop()
+        return writer.metrics()
+
+    metrics = asyncio.run(main())
+
+    # Re-analyzing the same candles upserts them rather than duplicating
+    assert len(db.crypto_data.documents) == 50
+    assert {doc['symbol'] for doc in db.crypto_data.documents} == {'BTC'}
+    assert len(db.pattern_detections.documents) == 1
+    assert metrics['queue_depth'] == 0
+    assert metrics['documents_written'] == 151
+    assert metrics['flushes'] < 4
+
+
+def test_redetected_patterns_are_upserted_by_fingerprint():
+    db = FakeDatabase()
+    first_seen = datetime(2024, 1, 1)
+
+    async def main():
+        writer = PersistenceWriter(db)
+        await writer.start()
+        await writer.enqueue_patterns([{'id': 'abc', 'symbol': 'BTC', 'confidence': 70, 'detected_at': first_seen}])
+        await writer.stop()
+        await writer.start()
+        await writer.enqueue_patterns([
+            {'id': 'abc', 'symbol': 'BTC', 'confidence': 85, 'detected_at': datetime(2024, 2, 1)},
+            {'id': 'def', 'symbol': 'BTC', 'confidence': 60, 'detected_at': datetime(2024, 2, 1)},
+        ])
+        await writer.stop()
+
+    asyncio.run(main())
+
+    documents = {doc['id']: doc for doc in db.pattern_detections.documents}
+    assert len(db.pattern_detections.documents) == 2
+    assert documents['abc']['confidence'] == 85
+    assert documents['abc']['detected_at'] == first_seen
+    assert documents['abc']['last_seen_at'] > first_seen
+
+
+def test_fingerprint_follows_timestamps_not_indices():
+    series = make_series('btc', 60)
+    pattern = {'pattern_type': 'Head & Shoulders Top', 'start_index': 10, 'center_index': 22, 'end_index': 34}
+    # The same candles seen through a window that starts 5 candles later
+    shifted = {**pattern, **{key: pattern[key] - 5 for key in ('start_index', 'center_index', 'end_index')}}
+
+    identity = pattern_identity(series, pattern)
+    assert identity == pattern_identity(series[5:], shifted)
+    assert identity['center_timestamp'] == int(series.timestamp[22])
+    assert identity['id'] != pattern_fingerprint(
+        'BTC', series.interval_ms, identity['start_timestamp'], identity['center_timestamp'],
+        identity['end_timestamp'], 'Inverse Head & Shoulders'
+    )
@@ -0,0 +1,65 @@
+import asyncio
+import random
+from email.utils import format_datetime
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from services.rate_limit import TokenBucket, SingleFlight, backoff_delay, parse_retry_after
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_token_bucket_allows_burst_then_spaces_calls():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=2.0, burst=3, clock=clock)
+
+    assert [bucket.reserve() for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert bucket.reserve() == pytest.approx(0.5)
+    assert bucket.reserve() == pytest.approx(1.0)
+
+    clock.now = 10.0
+    # Refill is capped at the burst size
+    assert [bucket.reserve() for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert bucket.reserve() == pytest.approx(0.5)
+
+
+def test_backoff_honors_retry_after():
+    rng = random.Random(1)
+
+    assert 5.0 <= backoff_delay(0, '5', base=1.0, rng=rng) <= 6.0
+    assert backoff_delay(0, '500', cap=60.0, rng=rng) == 60.0
+    assert 0.0 <= backoff_delay(3, None, base=1.0, rng=rng) <= 8.0
+
+
+def test_parse_retry_after_http_date():
+    retry_at = datetime.now(timezone.utc) + timedelta(seconds=30)
+
+    assert 25 <= parse_retry_after(format_datetime(retry_at, usegmt=True)) <= 30
+    assert parse_retry_after('not a date') is None
+    assert parse_retry_after(None) is None
+
+
+def test_single_flight_shares_one_call_and_forgets_it_afterwards():
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return 'result'
+
+    async def main():
+        flight = SingleFlight()
+        results = await asyncio.gather(*(flight.do('key', fetch) for _ in range(10)))
+        assert len(flight) == 0
+        results.append(await flight.do('key', fetch))
+        return results
+
+    assert asyncio.run(main()) == ['result'] * 11
+    assert len(calls) == 2
@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+
+from services.crypto_service import DAY_MS
+from services.ohlcv import OHLCVSeries
+from services.resample import TIMEFRAMES, TimeframeError, resample
+
+HOUR_MS = 60 * 60 * 1000
+
+
+def four_hourly(count, start=1704067200000):  # 2024-01-01 00:00 UTC, a Monday
+    index = np.arange(count, dtype=float)
+    return OHLCVSeries(
+        'BTC', start + np.arange(count) * 4 * HOUR_MS,
+        100 + index, 101 + index, 99 - index, 100.5 + index, np.ones(count),
+        interval_ms=4 * HOUR_MS
+    )
+
+
+def test_daily_bars_aggregate_six_candles():
+    daily = resample(four_hourly(12), '1d')
+
+    assert daily.timestamp.tolist() == [1704067200000, 1704067200000 + DAY_MS]
+    assert daily.open.tolist() == [100, 106]
+    assert daily.high.tolist() == [106, 112]
+    assert daily.low.tolist() == [94, 88]
+    assert daily.close.tolist() == [105.5, 111.5]
+    assert daily.volume.tolist() == [6, 6]
+    assert daily.interval_ms == DAY_MS
+
+
+def test_weekly_bars_start_on_monday():
+    # Start on a Thursday: the first bar is the partial Monday-based week
+    weekly = resample(four_hourly(6 * 14, start=1704067200000 + 3 * DAY_MS), '1w')
+
+    assert weekly.timestamp.tolist() == [1704067200000, 1704067200000 + TIMEFRAMES['1w'], 1704067200000 + 2 * TIMEFRAMES['1w']]
+    assert weekly.volume.tolist() == [24, 42, 18]
+
+
+def test_cannot_resample_to_finer_bars():
+    series = four_hourly(12)
+    series.interval_ms = 4 * DAY_MS
+
+    with pytest.raises(TimeframeError):
+        resample(series, '1d')
+
+
+def test_timeframe_must_be_a_multiple_of_the_candles():
+    series = four_hourly(12)
+    series.interval_ms = 4 * DAY_MS
+
+    # 7 days would hold one or two 4-day candles per bar
+    with pytest.raises(TimeframeError):
+        resample(series, '1w')
@@ -0,0 +1,67 @@
+from services.response_cache import ResponseCache, not_modified
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1700000000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_unchanged_body_keeps_last_modified_across_invalidation():
+    clock = Clock()
+    cache = ResponseCache(ttl=0, clock=clock)
+    first = cache.put('key', b'[1]', tags=['patterns:BTC'])
+
+    clock.now += 100
+    assert cache.invalidate('patterns:BTC') == 1
+    assert cache.get('key') is None
+    same = cache.put('key', b'[1]', tags=['patterns:BTC'])
+    assert (same.etag, same.last_modified) == (first.etag, first.last_modified)
+
+    cache.invalidate('patterns:BTC')
+    changed = cache.put('key', b'[1, 2]')
+    assert changed.etag != first.etag
+    assert changed.last_modified == clock.now
+
+
+def test_entries_expire_and_are_evicted_least_recently_used():
+    clock = Clock()
+    cache = ResponseCache(max_entries=2, ttl=30, clock=clock)
+    cache.put('a', b'a')
+    cache.put('b', b'b')
+    cache.get('a')
+    cache.put('c', b'c')
+    assert cache.get('b') is None
+    assert cache.get('a') is not None
+
+    clock.now += 31
+    assert cache.get('a') is None
+    assert (cache.hits, cache.misses) == (2, 2)
+
+
+def test_tags_of_dropped_entries_do_not_accumulate():
+    cache = ResponseCache(max_entries=4, ttl=0, clock=Clock())
+    for i in range(100):
+        cache.put(('patterns', i), b'[]', tags=[f'patterns:SYM{i}', 'patterns'])
+    assert len(cache) == 4
+    assert set(cache._tags) == {f'patterns:SYM{i}' for i in range(96, 100)} | {'patterns'}
+    assert len(cache._key_tags) == 4
+
+    assert cache.invalidate('patterns') == 4
+    assert cache._tags == {}
+    assert cache._key_tags == {}
+
+
+def test_conditional_headers():
+    entry = ResponseCache(clock=Clock()).put('key', b'body')
+    last_modified = entry.validators()['Last-Modified']
+
+    assert not_modified(entry, {'if-none-match': f'"other", W/{entry.etag}'})
+    assert not_modified(entry, {'if-none-match': '*'})
+    assert not not_modified(entry, {'if-none-match': '"other"', 'if-modified-since': last_modified})
+    assert not_modified(entry, {'if-modified-since': last_modified})
+    assert not not_modified(entry, {'if-modified-since': 'Mon, 01 Jan 2001 00:00:00 GMT'})
+    assert not not_modified(entry, {'if-modified-since': 'garbage'})
+    assert not not_modified(entry, {})
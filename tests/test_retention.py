@@ -0,0 +1,55 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from benchmarks.fake_mongo import FakeDatabase
+from services.indexes import ensure_indexes
+from services.retention import DAY_SECONDS, StorageCompactor
+
+NOW = datetime(2024, 6, 1)
+
+
+def test_compaction_removes_expired_patterns_and_candles():
+    db = FakeDatabase()
+    db.pattern_detections.documents.extend([
+        {'id': 'fresh', 'detected_at': NOW - timedelta(days=90), 'last_seen_at': NOW - timedelta(days=1)},
+        {'id': 'stale', 'detected_at': NOW - timedelta(days=90), 'last_seen_at': NOW - timedelta(days=40)},
+        {'id': 'legacy-old', 'detected_at': NOW - timedelta(days=45)},
+        {'id': 'legacy-new', 'detected_at': NOW - timedelta(days=2)},
+    ])
+    now_ms = int(NOW.timestamp() * 1000)
+    db.crypto_data.documents.extend([
+        {'symbol': 'BTC', 'timestamp': now_ms - days * DAY_SECONDS * 1000} for days in (1, 100, 500)
+    ])
+
+    compactor = StorageCompactor(
+        db, pattern_retention=30 * DAY_SECONDS, candle_retention=400 * DAY_SECONDS, clock=NOW.timestamp
+    )
+    deleted = asyncio.run(compactor.run_once())
+
+    assert deleted == {'pattern_detections': 2, 'crypto_data': 1}
+    assert sorted(doc['id'] for doc in db.pattern_detections.documents) == ['fresh', 'legacy-new']
+    assert len(db.crypto_data.documents) == 2
+    assert compactor.deleted == deleted
+
+
+def test_zero_retention_keeps_everything():
+    db = FakeDatabase()
+    db.pattern_detections.documents.append({'id': 'old', 'detected_at': datetime(2000, 1, 1)})
+    db.crypto_data.documents.append({'symbol': 'BTC', 'timestamp': 0})
+
+    deleted = asyncio.run(StorageCompactor(db, pattern_retention=0, candle_retention=0).run_once())
+
+    assert deleted == {'pattern_detections': 0, 'crypto_data': 0}
+    assert len(db.pattern_detections.documents) == len(db.crypto_data.documents) == 1
+
+
+def test_ttl_indexes_follow_retention():
+    db = FakeDatabase()
+    asyncio.run(ensure_indexes(db, {'pattern_detections': 3600, 'crypto_data': 0}))
+
+    ttl = [options for _, options in db.pattern_detections.indexes if 'expireAfterSeconds' in options]
+    assert [(index['name'], index['expireAfterSeconds']) for index in ttl] == [('last_seen_at_ttl', 3600)]
+    assert not any('expireAfterSeconds' in options for _, options in db.crypto_data.indexes)
+
+    asyncio.run(ensure_indexes(db, {}))
+    assert not any('expireAfterSeconds' in options for _, options in db.pattern_detections.indexes)
@@ -0,0 +1,58 @@
+import asyncio
+
+from benchmarks.fake_mongo import FakeDatabase
+from services.scheduler import AnalysisScheduler, LatestAnalysisStore, estimated_upstream_calls
+
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def test_interval_is_stretched_to_fit_rate_budget():
+    scheduler = AnalysisScheduler(
+        None, None, symbols=['BTC', 'ETH', 'SOL', 'ADA'], days_windows=[7, 30, 90],
+        interval=60, calls_per_minute=30, budget_fraction=0.5
+    )
+
+    # Two granularities: 4 symbols * (2 * 2 + 1) calls per scan
+    assert estimated_upstream_calls(scheduler.symbols, scheduler.days_windows) == 20
+    assert scheduler.effective_interval() == 80
+
+
+def test_store_expires_results_and_reads_other_workers_results():
+    clock = FakeClock()
+    db = FakeDatabase()
+    writer = LatestAnalysisStore(db.latest_analysis, clock=clock)
+    reader = LatestAnalysisStore(db.latest_analysis, clock=clock)
+
+    async def main():
+        await writer.put('btc', 30, {'symbol': 'BTC'})
+        fresh = await reader.get('BTC', 30, max_age=60)
+        clock.now += 120
+        stale = await reader.get('BTC', 30, max_age=60)
+        return fresh, stale
+
+    fresh, stale = asyncio.run(main())
+
+    assert fresh == b'{"symbol": "BTC"}'
+    assert stale is None
+
+
+def test_failed_jobs_do_not_stop_the_cycle():
+    db = FakeDatabase()
+    store = LatestAnalysisStore(db.latest_analysis)
+
+    async def analyze(symbol, days):
+        if symbol == 'ETH':
+            raise RuntimeError('boom')
+        return {'symbol': symbol, 'days': days}
+
+    scheduler = AnalysisScheduler(analyze, store, symbols=['BTC', 'ETH', 'SOL'], days_windows=[30])
+    asyncio.run(scheduler.run_cycle(pace=False))
+
+    assert scheduler.failures == 1
+    assert sorted(doc['symbol'] for doc in db.latest_analysis.documents) == ['BTC', 'SOL']
@@ -0,0 +1,451 @@
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+
+from benchmarks.fake_coingecko import FakeCoinGecko
+from benchmarks.fake_mongo import FakeDatabase
+import server
+from services.async_crypto_service import AsyncCoinGeckoService
+from services.cache_service import CachedMarketDataService
+
+
+@pytest.fixture
+def db(monkeypatch):
+    fake_db = FakeDatabase()
+    monkeypatch.setattr(server, 'db', fake_db)
+    monkeypatch.setattr(server.persistence_writer, 'db', fake_db)
+    monkeypatch.setattr(server.storage_compactor, 'db', fake_db)
+    monkeypatch.setattr(server.analysis_jobs, 'collection', fake_db.analysis_jobs)
+    monkeypatch.setattr(server, 'response_cache', server.ResponseCache())
+    monkeypatch.setattr(server.market_data, 'collection', fake_db.crypto_data)
+    monkeypatch.setattr(server, 'latest_analysis', server.LatestAnalysisStore(fake_db.latest_analysis))
+    return fake_db
+
+
+@pytest.fixture
+def upstream(monkeypatch, db):
+    """Point the market data service at a local CoinGecko stand-in with empty caches"""
+    with FakeCoinGecko() as fake:
+        service = AsyncCoinGeckoService(base_url=fake.base_url, backoff_base=0.01)
+        monkeypatch.setattr(server, 'market_data', CachedMarketDataService(
+            service, db.crypto_data, on_fetched=server.persist_fetched_candles
+        ))
+        yield fake
+
+
+@pytest.fixture
+def client(db, monkeypatch):
+    monkeypatch.setenv('DETECTION_WORKERS', '2')
+    with TestClient(server.app) as test_client:
+        yield test_client
+
+
+def pattern_document(index, detected_at):
+    return {
+        'id': f'pattern-{index:02d}', 'symbol': 'BTC', 'pattern_type': 'Head & Shoulders Top',
+        'left_shoulder': 1.0, 'head': 2.0, 'right_shoulder': 1.0, 'confidence': 80,
+        'signal': 'Bearish Reversal', 'strength': 'Strong',
+        'start_index': 0, 'center_index': 10, 'end_index': 20, 'detected_at': detected_at
+    }
+
+
+def test_startup_creates_indexes(client, db):
+    assert db.crypto_data.indexes[0][1]['unique'] is True
+    assert db.pattern_detections.indexes[0][1]['name'] == 'symbol_detected_at_id'
+
+
+def test_patterns_are_paginated_newest_first(client, db):
+    start = datetime(2024, 1, 1)
+    # Two patterns share a timestamp so the id tie-breaker matters
+    for index in range(7):
+        db.pattern_detections.documents.append(
+            pattern_document(index, start + timedelta(minutes=min(index, 5)))
+        )
+
+    seen, cursor = [], None
+    while True:
+        params = {'limit': 3, **({'cursor': cursor} if cursor else {})}
+        response = client.get('/api/crypto/btc/patterns', params=params)
+        assert response.status_code == 200
+        seen.extend(pattern['id'] for pattern in response.json())
+        cursor = response.headers.get('X-Next-Cursor')
+        if not cursor:
+            break
+
+    assert seen == [f'pattern-{index:02d}' for index in reversed(range(7))]
+    assert '_id' not in response.json()[0]
+
+
+def test_invalid_cursor_is_rejected(client):
+    response = client.get('/api/status', params={'cursor': 'not-a-cursor'})
+
+    assert response.status_code == 400
+
+
+def test_analyze_queues_persistence_and_returns_rows(upstream, client, db):
+    response = client.post('/api/crypto/analyze', json={'symbol': 'BTC', 'days': 30})
+
+    assert response.status_code == 200
+    body = response.json()
+    assert len(body['data']) == 180
+    assert body['data'][0]['symbol'] == 'BTC'
+    assert body['current_price'] > 0
+
+    client.get('/api/')  # let the background writer run
+    assert len(db.crypto_data.documents) == 180
+
+
+def test_cached_analyses_do_not_rewrite_candles(upstream, client, monkeypatch):
+    enqueued = []
+
+    async def record(series):
+        enqueued.append(len(series))
+
+    monkeypatch.setattr(server.persistence_writer, 'enqueue_candles', record)
+    for days in (30, 30, 14, 30, 7):
+        assert client.post('/api/crypto/analyze', json={'symbol': 'BTC', 'days': days}).status_code == 200
+
+    assert upstream.count('/ohlc') == 1
+    assert enqueued == [180]
+
+
+def test_reanalysis_upserts_patterns_by_fingerprint(upstream, client, db):
+    bodies = []
+    for _ in range(2):
+        response = client.post('/api/crypto/analyze/batch', json={'requests': [{'symbol': 'ETH', 'days': 90}]})
+        bodies.append(response.json()['results'][0]['result'])
+        client.get('/api/')  # let the background writer run
+
+    patterns = bodies[0]['patterns']
+    assert patterns
+    assert [p['id'] for p in patterns] == [p['id'] for p in bodies[1]['patterns']]
+    assert all(p['center_timestamp'] == bodies[0]['data'][p['center_index']]['timestamp'] for p in patterns)
+    assert sorted(doc['id'] for doc in db.pattern_detections.documents) == sorted(p['id'] for p in patterns)
+
+
+def test_patterns_on_fallback_data_are_not_persisted(upstream, client, monkeypatch):
+    enqueued = []
+
+    async def record(documents):
+        enqueued.append(documents)
+
+    monkeypatch.setattr(server.persistence_writer, 'enqueue_patterns', record)
+    assert client.post('/api/crypto/analyze', json={'symbol': 'BTC', 'days': 30}).status_code == 200
+    assert len(enqueued) == 1
+
+    upstream.fail_first, upstream.fail_status = 1000, 500
+    response = client.post('/api/crypto/analyze', json={'symbol': 'ADA', 'days': 30})
+
+    assert response.status_code == 200
+    # One candle a day marks generated fallback data
+    assert len(response.json()['data']) == 30
+    assert len(enqueued) == 1
+
+
+def test_batch_analyze_reports_per_symbol_results(upstream, client, monkeypatch):
+    async def fail_for_doge(symbol, days, timeframe=None):
+        if symbol == 'DOGE':
+            raise RuntimeError('upstream exploded')
+        return await original(symbol, days, timeframe)
+
+    original = server.market_data.get_market_snapshot
+    monkeypatch.setattr(server.market_data, 'get_market_snapshot', fail_for_doge)
+
+    response = client.post('/api/crypto/analyze/batch', json={'requests': [
+        {'symbol': 'BTC', 'days': 30},
+        {'symbol': 'ETH', 'days': 90},
+        {'symbol': 'DOGE', 'days': 30},
+    ]})
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body['failed'] == 1
+    btc, eth, doge = body['results']
+    assert (btc['symbol'], len(btc['result']['data'])) == ('BTC', 180)
+    assert len(eth['result']['data']) == 540
+    assert eth['result']['patterns']
+    assert {pattern['symbol'] for pattern in eth['result']['patterns']} == {'ETH'}
+    assert doge['result'] is None
+    assert 'upstream exploded' in doge['error']
+
+
+def test_timeframes_are_resampled_from_one_fetch(upstream, client):
+    responses = [
+        client.post('/api/crypto/analyze', json={'symbol': 'BTC', 'days': days, 'timeframe': timeframe})
+        for days, timeframe in [(7, None), (14, '1d'), (30, '1w'), (30, '4h')]
+    ]
+
+    assert [response.status_code for response in responses] == [200] * 4
+    assert upstream.count('/ohlc') == 1
+    daily = responses[1].json()['data']
+    assert 14 <= len(daily) <= 15
+    assert len({row['date'] for row in daily}) == len(daily)
+
+
+def test_timeframe_finer_than_candles_is_rejected(upstream, client):
+    response = client.post('/api/crypto/analyze', json={'symbol': 'BTC', 'days': 90, 'timeframe': '1d'})
+
+    assert response.status_code == 400
+    # 4-day candles do not divide into weeks
+    response = client.post('/api/crypto/analyze', json={'symbol': 'BTC', 'days': 90, 'timeframe': '1w'})
+    assert response.status_code == 400
+
+
+def test_fresh_latest_analysis_is_served_without_upstream(upstream, client, db, monkeypatch):
+    monkeypatch.setattr(server.AnalysisScheduler, 'running', True)
+    scheduler = server.AnalysisScheduler(
+        server.scheduled_analysis, server.latest_analysis, symbols=['BTC', 'ETH'], days_windows=[30, 14]
+    )
+
+    client.portal.call(lambda: scheduler.run_cycle(pace=False))
+    upstream.requests.clear()
+    response = client.post('/api/crypto/analyze', json={'symbol': 'eth', 'days': 14})
+
+    assert response.status_code == 200
+    assert response.json()['symbol'] == 'ETH'
+    assert len(response.json()['data']) == 84
+    assert upstream.requests == []
+    assert {doc['symbol'] for doc in db.latest_analysis.documents} == {'BTC', 'ETH'}
+
+
+def test_latest_analysis_is_bypassed_without_the_scheduler(upstream, client):
+    stale = {'symbol': 'ETH', 'current_price': 1.0, 'price_change_24h': 0.0, 'data': [], 'patterns': []}
+    client.portal.call(lambda: server.latest_analysis.put('ETH', 14, stale, persist=False))
+
+    response = client.post('/api/crypto/analyze', json={'symbol': 'ETH', 'days': 14})
+
+    assert response.status_code == 200
+    assert len(response.json()['data']) == 84
+    assert upstream.count('/ohlc') == 1
+
+
+def test_on_demand_result_feeds_latest_analysis_while_scheduled(upstream, client, monkeypatch):
+    monkeypatch.setattr(server.AnalysisScheduler, 'running', True)
+
+    first = client.post('/api/crypto/analyze', json={'symbol': 'ADA', 'days': 14})
+    second = client.post('/api/crypto/analyze', json={'symbol': 'ADA', 'days': 14})
+
+    assert first.status_code == second.status_code == 200
+    assert first.content == second.content
+    assert len(first.json()['data']) == 84
+    assert client.portal.call(lambda: server.latest_analysis.get('ADA', 14, 60)) == first.content
+    assert upstream.count('/ohlc') == 1
+
+
+def test_windows_beyond_upstream_need_the_candle_store(upstream, client, monkeypatch, tmp_path):
+    monkeypatch.setattr(server, 'candle_store', None)
+    body = {'symbol': 'BTC', 'days': 1000}
+
+    assert client.post('/api/crypto/analyze', json=body).status_code == 400
+    assert client.post('/api/crypto/analyze', params={'mode': 'job'}, json=body).status_code == 400
+    assert client.post('/api/crypto/backtest', json={'symbols': ['BTC'], 'days': 1000}).status_code == 400
+    assert upstream.requests == []
+
+    monkeypatch.setattr(server, 'candle_store', server.CandleStore(tmp_path))
+    response = client.post('/api/crypto/analyze', json=body)
+
+    assert response.status_code == 200
+    # Upstream is asked for 365 days, not 1000 (the stand-in serves 6 candles a day)
+    assert upstream.count('/ohlc') == 1
+    assert len(response.json()['data']) == 365 * 6
+
+
+def test_columnar_response_uses_parallel_arrays(upstream, client):
+    rows = client.post('/api/crypto/analyze', json={'symbol': 'SOL', 'days': 30}).json()
+    response = client.post(
+        '/api/crypto/analyze', json={'symbol': 'SOL', 'days': 30},
+        headers={'Accept': 'application/vnd.cryptopatterns.columnar+json'}
+    )
+
+    assert response.headers['content-type'] == 'application/vnd.cryptopatterns.columnar+json'
+    body = response.json()
+    candles = body['candles']
+    assert candles['close'] == [row['close'] for row in rows['data']]
+    assert candles['date'] == [row['date'] for row in rows['data']]
+    assert body['current_price'] == rows['current_price']
+    assert len(body['patterns']) == len(rows['patterns'])
+
+
+def test_msgpack_response(upstream, client):
+    msgpack = pytest.importorskip('msgpack')
+
+    response = client.post('/api/crypto/analyze', params={'format': 'msgpack'}, json={'symbol': 'ADA', 'days': 30})
+
+    assert response.headers['content-type'] == 'application/msgpack'
+    assert len(msgpack.unpackb(response.content)['candles']['timestamp']) == 180
+
+
+def test_unknown_format_is_not_acceptable(client):
+    response = client.post('/api/crypto/analyze', params={'format': 'xml'}, json={'symbol': 'ADA', 'days': 30})
+
+    assert response.status_code == 406
+
+
+def test_metrics_endpoint_reports_stages_and_upstream_calls(upstream, client, monkeypatch):
+    monkeypatch.setattr(server, 'SERVER_TIMING_HEADERS', True)
+    response = client.post('/api/crypto/analyze', json={'symbol': 'ETH', 'days': 30})
+    assert response.status_code == 200
+    timing = response.headers['Server-Timing']
+    for name in ('fetch', 'detect', 'models', 'serialize', 'total'):
+        assert f'{name};dur=' in timing
+
+    metrics = client.get('/api/metrics')
+    assert metrics.headers['content-type'].startswith('text/plain')
+    text = metrics.text
+    assert 'stage_duration_seconds_count{stage="detect"}' in text
+    assert 'coingecko_requests_total{endpoint="ohlc",status="200"}' in text
+    assert 'ohlcv_cache_lookups_total{tier="upstream"}' in text
+    assert 'ohlcv_series_cache_requests_total{result="miss"}' in text
+    assert 'http_request_duration_seconds_count{method="POST",route="/api/crypto/analyze",status="200"}' in text
+
+
+def test_stream_rejects_empty_symbol_list(client):
+    assert client.get('/api/crypto/stream', params={'symbols': ' , '}).status_code == 400
+
+
+def test_backtest_reports_forward_returns(upstream, client):
+    response = client.post('/api/crypto/backtest', json={
+        'symbols': ['BTC', 'eth', 'BTC'], 'days': 30, 'horizons': [6, 12], 'chunk_size': 500
+    })
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body['symbols'] == ['BTC', 'ETH']
+    assert body['candles'] == 360
+    assert body['horizons'] == [6, 12]
+    assert body['overall']['count'] == body['signals']
+    assert sum(bucket['count'] for bucket in body['by_strength']) == body['signals']
+    assert [h['horizon'] for h in body['overall']['horizons']] == [6, 12]
+
+
+def test_sweep_ranks_parameter_sets(upstream, client):
+    response = client.post('/api/crypto/sweep', json={
+        'symbols': ['BTC'], 'days': 30, 'horizons': [6],
+        'grid': {'min_confidence': [60, 80], 'left_window': [[-12, -6], [-10, -5]]}
+    })
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body['evaluated'] == 4
+    assert [result['rank'] for result in body['results']] == [1, 2, 3, 4]
+    assert body['rank_horizon'] == 6
+
+    for grid in ({'nope': [1]}, {'min_confidence': ['abc']}, {'left_window': [['a', 'b']]}, {'overlap_radius': [None]}):
+        bad = client.post('/api/crypto/sweep', json={'symbols': ['BTC'], 'grid': grid})
+        assert bad.status_code == 400
+
+    # Each axis is bounded by the schema, their product before any set is built
+    too_long = client.post('/api/crypto/sweep', json={'symbols': ['BTC'], 'grid': {'min_confidence': list(range(501))}})
+    assert too_long.status_code == 422
+    too_many = client.post('/api/crypto/sweep', json={
+        'symbols': ['BTC'], 'grid': {name: list(range(100)) for name in ('min_confidence', 'overlap_radius', 'prominence_high')}
+    })
+    assert too_many.status_code == 400
+    assert upstream.count('/ohlc') == 1
+
+    # Windows wider than the history are rejected instead of failing in the pool
+    too_wide = client.post('/api/crypto/sweep', json={
+        'symbols': ['BTC'], 'days': 30, 'grid': {'left_window': [[-12, -6], [-400, -10]]}
+    })
+    assert too_wide.status_code == 400
+    assert 'candles' in too_wide.json()['detail']
+
+
+def test_analysis_jobs_are_queued_and_long_polled(upstream, client, db):
+    response = client.post('/api/crypto/analyze', params={'mode': 'job'}, json={'symbol': 'BTC', 'days': 30})
+    assert response.status_code == 202
+    job_id = response.json()['id']
+    assert response.headers['Location'] == f'/api/crypto/jobs/{job_id}'
+
+    job = client.get(f'/api/crypto/jobs/{job_id}', params={'wait': 10}).json()
+    assert job['status'] == 'done'
+    assert len(job['result']['data']) == 180
+    assert db.analysis_jobs.documents[0]['status'] == 'done'
+
+    assert client.get('/api/crypto/jobs/missing').status_code == 404
+    assert client.post('/api/crypto/analyze', params={'mode': 'later'}, json={'symbol': 'BTC'}).status_code == 400
+
+
+def test_failed_analysis_job_reports_error(upstream, client):
+    response = client.post('/api/crypto/analyze', params={'mode': 'job'},
+                           json={'symbol': 'BTC', 'days': 30, 'pattern_types': ['no_such_pattern']})
+    job = client.get(f"/api/crypto/jobs/{response.json()['id']}", params={'wait': 10}).json()
+
+    assert job['status'] == 'failed'
+    assert job['status_code'] == 400
+
+
+def test_read_endpoints_answer_conditional_requests(client, db):
+    first = client.get('/api/crypto/supported')
+    assert first.status_code == 200
+    assert first.headers['Cache-Control'] == 'no-cache'
+
+    again = client.get('/api/crypto/supported', headers={'If-None-Match': first.headers['ETag']})
+    assert again.status_code == 304
+    assert again.content == b''
+    since = client.get('/api/crypto/supported', headers={'If-Modified-Since': first.headers['Last-Modified']})
+    assert since.status_code == 304
+
+
+def test_pattern_cache_is_invalidated_by_writes_and_deletes(client, db):
+    db.pattern_detections.documents.append(pattern_document(0, datetime(2024, 1, 1)))
+    first = client.get('/api/crypto/btc/patterns')
+    etag = first.headers['ETag']
+    assert [p['id'] for p in first.json()] == ['pattern-00']
+
+    # Written behind the cache's back: still served from memory
+    db.pattern_detections.documents.append(pattern_document(1, datetime(2024, 1, 2)))
+    assert client.get('/api/crypto/btc/patterns', headers={'If-None-Match': etag}).status_code == 304
+
+    server.invalidate_patterns({'BTC'})
+    changed = client.get('/api/crypto/btc/patterns', headers={'If-None-Match': etag})
+    assert changed.status_code == 200
+    assert [p['id'] for p in changed.json()] == ['pattern-01', 'pattern-00']
+
+    assert client.delete('/api/crypto/btc/patterns').json() == {'deleted_count': 2}
+    assert client.get('/api/crypto/btc/patterns').json() == []
+
+
+def test_detection_pool_spawns_and_splits_cores_between_workers(db, monkeypatch):
+    monkeypatch.delenv('DETECTION_WORKERS', raising=False)
+    monkeypatch.setenv('WEB_CONCURRENCY', '64')
+    monkeypatch.setattr(server.os, 'cpu_count', lambda: 8)
+
+    with TestClient(server.app):
+        pool = server.detection_pool
+        assert pool._max_workers == 1
+        assert pool._mp_context.get_start_method() == 'spawn'
+
+
+def test_readiness_reports_warm_up(upstream, db, monkeypatch):
+    monkeypatch.setenv('DETECTION_WORKERS', '1')
+    monkeypatch.setattr(server, 'WARMUP_DAYS', [30])
+    monkeypatch.setattr(server, 'warm_up', server.WarmUp(server.market_data))
+
+    with TestClient(server.app) as client:
+        for _ in range(100):
+            response = client.get('/api/ready')
+            if response.status_code == 200:
+                break
+            assert response.status_code == 503
+            time.sleep(0.05)
+
+    status = response.json()
+    assert status['ready'] and status['loaded'] == status['total'] == len(server.market_data.get_supported_coins())
+
+
+def test_detection_results_are_shared_between_workers(upstream, client, db, tmp_path, monkeypatch):
+    monkeypatch.setattr(server, 'shared_cache', server.SharedCache(tmp_path))
+    first = client.post('/api/crypto/analyze/batch', json={'requests': [{'symbol': 'ETH', 'days': 90}]})
+
+    def fail(*args, **kwargs):
+        raise AssertionError('detection should have been reused')
+    monkeypatch.setattr(server.pattern_service, 'detect_head_and_shoulders', fail)
+    monkeypatch.setattr(server, 'detection_pool', None)
+    second = client.post('/api/crypto/analyze', json={'symbol': 'ETH', 'days': 90})
+
+    patterns = first.json()['results'][0]['result']['patterns']
+    assert patterns
+    assert [p['id'] for p in second.json()['patterns']] == [p['id'] for p in patterns]
@@ -0,0 +1,128 @@
+import asyncio
+import os
+
+import numpy as np
+
+from benchmarks.fake_coingecko import FakeCoinGecko
+from services.async_crypto_service import AsyncCoinGeckoService
+from services.cache_service import CachedMarketDataService
+from services.ohlcv import OHLCVSeries
+from services.shared_cache import SharedCache, series_digest
+from services.warmup import WarmUp
+
+
+class FakeClock:
+    def __init__(self, now=1700000000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def make_series(count=20, is_fallback=False):
+    closes = np.linspace(100, 120, count)
+    return OHLCVSeries(
+        'BTC', 1700000000000 + np.arange(count) * 14400000,
+        closes, closes + 1, closes - 1, closes, closes * 10,
+        interval_ms=14400000, is_fallback=is_fallback
+    )
+
+
+def test_series_and_json_round_trip(tmp_path):
+    clock = FakeClock()
+    cache = SharedCache(tmp_path, clock=clock)
+    series = make_series()
+    cache.put_series(('BTC', 14400000), series)
+    cache.put_json(('patterns', 'abc'), [{'confidence': np.int64(80), 'head': np.float64(1.5)}])
+    cache.put_series(('ETH', 14400000), make_series(is_fallback=True))
+
+    clock.now += 12
+    # A second worker reading the same directory
+    other = SharedCache(tmp_path, clock=clock)
+    loaded, age = other.get_series(('BTC', 14400000))
+    assert age == 12
+    assert loaded.interval_ms == series.interval_ms
+    assert all(np.array_equal(getattr(loaded, name), getattr(series, name)) for name in ('timestamp',) + series.PRICE_COLUMNS)
+    assert other.get_json(('patterns', 'abc'))[0] == [{'confidence': 80, 'head': 1.5}]
+    assert other.get_series(('ETH', 14400000)) is None
+    assert not [path for path in tmp_path.iterdir() if path.name.startswith('.tmp-')]
+
+
+def test_unreadable_and_old_entries_are_ignored_and_pruned(tmp_path):
+    cache = SharedCache(tmp_path, max_age=60)
+    cache.put_json('key', {'a': 1})
+    path = next(tmp_path.glob('*.bin'))
+    path.write_bytes(b'garbage')
+    assert cache.get_json('key') is None
+
+    cache.put_json('key', {'a': 1})
+    old = cache._clock() - 120
+    os.utime(path, (old, old))
+    assert cache.prune() == 1
+    assert cache.get_json('key') is None
+
+
+def test_old_lock_files_are_pruned_unless_held(tmp_path):
+    cache = SharedCache(tmp_path, max_age=60)
+    old = cache._clock() - 120
+
+    async def main():
+        for key in ('idle', 'held'):
+            async with cache.single_flight(key):
+                pass
+        for path in tmp_path.glob('*.lock'):
+            os.utime(path, (old, old))
+        async with cache.single_flight('held') as locked:
+            assert locked
+            os.utime(cache._path('held', '.lock'), (old, old))
+            assert cache.prune() == 1
+        assert [path.name for path in tmp_path.glob('*.lock')] == [cache._path('held', '.lock').name]
+        # A pruned key locks as before
+        async with cache.single_flight('idle') as locked:
+            assert locked
+
+    asyncio.run(main())
+
+
+def test_series_digest_tracks_content():
+    series = make_series()
+    assert series_digest(series) == series_digest(make_series())
+    assert series_digest(series) != series_digest(series[1:])
+
+
+def test_workers_sharing_a_cache_fetch_upstream_once(tmp_path):
+    with FakeCoinGecko(latency=0.2) as fake:
+        async def main():
+            workers = [
+                CachedMarketDataService(AsyncCoinGeckoService(base_url=fake.base_url), shared_cache=SharedCache(tmp_path))
+                for _ in range(3)
+            ]
+            try:
+                results = await asyncio.gather(*(worker.get_historical_data('BTC', 30) for worker in workers))
+            finally:
+                for worker in workers:
+                    await worker.upstream.aclose()
+            return results
+
+        results = asyncio.run(main())
+        assert fake.count('/ohlc') == 1
+        assert len({len(series) for series in results}) == 1
+
+
+def test_warm_up_preloads_history_and_reports_ready():
+    with FakeCoinGecko() as fake:
+        async def main():
+            market_data = CachedMarketDataService(AsyncCoinGeckoService(base_url=fake.base_url))
+            warm_up = WarmUp(market_data, concurrency=2)
+            assert not warm_up.status()['ready']
+            try:
+                await warm_up.run(['BTC', 'ETH'], [30, 90])
+                requests_after_warm_up = len(fake.requests)
+                await market_data.get_historical_data('ETH', 30)
+            finally:
+                await market_data.upstream.aclose()
+            return warm_up.status(), requests_after_warm_up
+
+        status, requests_after_warm_up = asyncio.run(main())
+        assert status['ready'] and (status['loaded'], status['failed'], status['total']) == (4, 0, 4)
+        assert len(fake.requests) == requests_after_warm_up
@@ -0,0 +1,69 @@
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+from services.backtest import backtest_chunk
+from services.pattern_service import DetectionConfig
+from services.sweep import group_by_windows, parameter_grid, rank_configs, run_sweep
+
+
+def test_parameter_grid_skips_invalid_and_duplicate_sets():
+    configs = parameter_grid(shoulder_tight=[0.02, 0.04, 0.02], shoulder_loose=[0.03, 0.05])
+    assert [(c.shoulder_tight, c.shoulder_loose) for c in configs] == [(0.02, 0.03), (0.02, 0.05), (0.04, 0.05)]
+
+    windows = parameter_grid(left_window=[[-12, -6], [-14, -7]])
+    assert [c.left_window for c in windows] == [(-12, -6), (-14, -7)]
+
+    with pytest.raises(ValueError):
+        parameter_grid(window_size=[3])
+    # Out-of-range values are skipped like invalid combinations...
+    assert [c.min_confidence for c in parameter_grid(min_confidence=[70, 150])] == [70]
+    # ...but a value of the wrong type rejects the grid
+    with pytest.raises(ValueError):
+        parameter_grid(min_confidence=[70, 'abc'])
+    with pytest.raises(ValueError):
+        parameter_grid(left_window=[['a', 'b']])
+
+    # A huge grid is rejected from its axis sizes, without enumerating it
+    with pytest.raises(ValueError, match='At most'):
+        parameter_grid(**{name: range(1000) for name in ('min_confidence', 'shoulder_tight', 'shoulder_loose', 'overlap_radius')})
+
+
+def test_configs_are_grouped_by_window_shape():
+    configs = parameter_grid(min_confidence=[60, 70], right_window=[(6, 12), (5, 12)])
+    groups = group_by_windows(configs)
+    assert sorted(len(group) for group in groups) == [2, 2]
+    for group in groups:
+        assert len({configs[position].windows for position in group}) == 1
+
+
+def test_default_config_reproduces_the_backtest(random_series):
+    series = random_series(600, 4)
+    configs = parameter_grid(min_confidence=[60, 80])
+    results = run_sweep([series], configs, horizons=(6, 30))
+
+    default = next(r for r in results if r['config']['min_confidence'] == 60)
+    assert default['signals'] == len(backtest_chunk(series, 0, len(series), (6, 30)))
+    stricter = next(r for r in results if r['config']['min_confidence'] == 80)
+    assert stricter['signals'] <= default['signals']
+
+
+def test_parallel_sweep_matches_serial(random_series):
+    series_list = [random_series(500, seed) for seed in range(2)]
+    configs = parameter_grid(left_window=[(-12, -6), (-10, -5)], overlap_radius=[5, 10])
+    with ProcessPoolExecutor(max_workers=2) as executor:
+        parallel = run_sweep(series_list, configs, horizons=(6,), executor=executor)
+    assert parallel == run_sweep(series_list, configs, horizons=(6,))
+    assert [r['rank'] for r in parallel] == [1, 2, 3, 4]
+
+
+def test_ranking_orders_by_mean_return_then_hit_rate():
+    configs = [DetectionConfig(min_confidence=value) for value in (60, 70, 80)]
+    bullish = lambda value: {'signal': 'Bullish Reversal', 'strength': 'Weak', 'confidence': 70, 'returns': [value]}
+    signals = [[bullish(0.01)], [bullish(0.05), bullish(-0.01)], []]
+    ranked = rank_configs(configs, signals, (6,))
+
+    assert [r['config']['min_confidence'] for r in ranked] == [70, 60, 80]
+    assert ranked[-1]['signals'] == 0
+    with pytest.raises(ValueError):
+        rank_configs(configs, signals, (6,), rank_horizon=30)